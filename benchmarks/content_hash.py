@@ -0,0 +1,91 @@
+"""content_hash versions: hashing throughput, and btree index size when a database is reachable.
+
+Run from the project root (with the service .env present): python -m benchmarks.content_hash
+The index part builds temporary tables in the configured database and drops them on exit.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from src.app.main import app  # noqa: F401 - wires up src.api before src.services
+from src.database.database import engine
+from src.schemas.content_hash import (
+  HASH_VERSION,
+  LEGACY_HASH_VERSION,
+  compute_content_hash,
+  content_hash_digest,
+  content_hash_key,
+)
+
+ROWS = 200_000
+INDEX_ROWS = 1_000_000
+ROUNDS = 3
+
+
+def sample_keys(count: int) -> list[str]:
+  started = datetime(2025, 1, 1)
+  return [
+    content_hash_key(
+      (started + timedelta(seconds=i)).isoformat(),
+      f"Рейс задержали на {i % 12} часов, никто ничего не объясняет #{i}",
+    )
+    for i in range(count)
+  ]
+
+
+def bench_hashing(keys: list[str], version: int) -> float:
+  timings = []
+  for _ in range(ROUNDS):
+    started = time.perf_counter()
+    for key in keys:
+      compute_content_hash(key, version)
+    timings.append(time.perf_counter() - started)
+  return min(timings)
+
+
+async def index_size(column_type: str, values: list) -> int:
+  async with engine.connect() as conn:
+    await conn.execute(text(f"CREATE TEMP TABLE hash_bench (content_hash {column_type})"))
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+      "hash_bench", records=[(value,) for value in values], columns=["content_hash"]
+    )
+    await conn.execute(text("CREATE UNIQUE INDEX hash_bench_idx ON hash_bench (content_hash)"))
+    size = (await conn.execute(text("SELECT pg_relation_size('hash_bench_idx')"))).scalar()
+    await conn.execute(text("DROP TABLE hash_bench"))
+    await conn.commit()
+    return size
+
+
+async def bench_index(keys: list[str]) -> dict[str, int]:
+  legacy = [compute_content_hash(key, LEGACY_HASH_VERSION) for key in keys]
+  current = [compute_content_hash(key) for key in keys]
+  return {
+    "varchar(64) sha256 hex": await index_size("varchar(64)", legacy),
+    "bytea(16) digest": await index_size("bytea", [content_hash_digest(h) for h in current]),
+  }
+
+
+def main():
+  keys = sample_keys(ROWS)
+  print(f"{'version':<12}{'ms':>10}{'rows/s':>14}   per {ROWS} rows")
+  for name, version in (("v1 sha256", LEGACY_HASH_VERSION), ("v2 xxh128", HASH_VERSION)):
+    elapsed = bench_hashing(keys, version)
+    print(f"{name:<12}{elapsed * 1000:>10.1f}{ROWS / elapsed:>14,.0f}")
+
+  try:
+    sizes = asyncio.run(bench_index(sample_keys(INDEX_ROWS)))
+  except Exception as e:
+    print(f"Skipping index sizes, database unavailable: {e}")
+    return
+
+  print(f"\n{'index':<26}{'MB':>10}   {INDEX_ROWS} rows")
+  for name, size in sizes.items():
+    print(f"{name:<26}{size / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,130 @@
+"""Throughput and latency of the upload -> Kafka -> consumer -> Postgres path.
+
+Kafka is replaced by the in-memory broker (BROKER=memory), so only Postgres from the service
+.env is needed. Stored rows are tagged with a per-run source and removed afterwards.
+
+Run from the project root: python -m benchmarks.ingest_pipeline --rows 100000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+os.environ["BROKER"] = "memory"
+
+import polars as pl  # noqa: E402
+from aiokafka import TopicPartition  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+from src.app.main import app  # noqa: E402,F401 - wires up src.api before src.services
+from src.api.files.service import FilesService  # noqa: E402
+from src.database.database import AsyncSessionLocal  # noqa: E402
+from src.database.models.message import Message  # noqa: E402
+from src.services import kafka_service, kafka_settings  # noqa: E402
+
+
+def write_upload(path: str, rows: int, run_id: str):
+  started = datetime(2025, 1, 1)
+  pl.DataFrame(
+    {
+      "text": [f"{run_id} обращение номер {i}" for i in range(rows)],
+      "user_id": [f"user-{i % 1000}" for i in range(rows)],
+      "external_id": [str(i) for i in range(rows)],
+      "timestamp": [(started + timedelta(seconds=i)).isoformat() for i in range(rows)],
+    }
+  ).write_csv(path)
+
+
+def classified_messages(rows: int, run_id: str) -> list[dict]:
+  started = datetime(2025, 1, 1)
+  return [
+    {
+      "external_id": str(i),
+      "event_date": (started + timedelta(seconds=i)).isoformat(),
+      "source": run_id,
+      "user_id": f"user-{i % 1000}",
+      "text": f"{run_id} обращение номер {i}",
+      "cleaned_text": f"обращение номер {i}",
+      "lang_code": "ru",
+      "lang_score": 0.99,
+      "sentiment_label": "neutral",
+      "sentiment_score": 0.8,
+      "emotion_label": "neutral",
+      "emotion_score": 0.7,
+      "category_level_1": "other",
+      "category_level_2": ["other"],
+      "content_hash": uuid.uuid4().hex * 2,
+    }
+    for i in range(rows)
+  ]
+
+
+async def bench_upload(rows: int, run_id: str):
+  with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, "upload.csv")
+    write_upload(path, rows, run_id)
+
+    started = time.perf_counter()
+    await FilesService.process_and_send_to_kafka(path)
+    elapsed = time.perf_counter() - started
+
+  print(f"upload -> kafka:     {rows} rows in {elapsed:.2f}s, {rows / elapsed:,.0f} rows/s")
+
+
+async def bench_consumer(rows: int, run_id: str):
+  broker = kafka_service.broker
+  topic = kafka_settings.topic_in
+  group = broker.group(kafka_settings.consumer_group_id)
+
+  partitions = broker.partitions(topic)
+  start_offsets = [len(log) for log in partitions]
+
+  started = time.perf_counter()
+  stats = await kafka_service.send_messages(topic, classified_messages(rows, run_id))
+  end_offsets = [len(log) for log in partitions]
+
+  latencies: list[float] = []
+  seen = list(start_offsets)
+  while seen != end_offsets:
+    await asyncio.sleep(0.005)
+    now_ms = time.time() * 1000
+    for partition, log in enumerate(partitions):
+      committed = group.committed.get(TopicPartition(topic, partition), start_offsets[partition])
+      latencies.extend(now_ms - record.timestamp for record in log[seen[partition] : committed])
+      seen[partition] = max(seen[partition], committed)
+  elapsed = time.perf_counter() - started
+
+  quantiles = statistics.quantiles(latencies, n=100)
+  print(
+    f"kafka -> postgres:   {stats.sent} rows in {elapsed:.2f}s, {stats.sent / elapsed:,.0f} rows/s, "
+    f"latency p50 {quantiles[49]:.0f}ms p99 {quantiles[98]:.0f}ms"
+  )
+
+
+async def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--rows", type=int, default=100_000)
+  args = parser.parse_args()
+
+  run_id = f"bench-{uuid.uuid4().hex[:8]}"
+
+  await kafka_service.start_producer()
+  await kafka_service.start_consumer([kafka_settings.topic_in])
+  kafka_service.start_ingest()
+  try:
+    await bench_upload(args.rows, run_id)
+    await bench_consumer(args.rows, run_id)
+  finally:
+    await kafka_service.close()
+    async with AsyncSessionLocal() as session:
+      await session.execute(delete(Message).where(Message.source == run_id))
+      await session.commit()
+
+
+if __name__ == "__main__":
+  asyncio.run(main())
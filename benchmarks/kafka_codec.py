@@ -0,0 +1,85 @@
+"""Encode/decode cost per 10k Kafka messages for every available codec.
+
+Run from the project root (with the service .env present): python -m benchmarks.kafka_codec
+"""
+
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from src.app.main import app  # noqa: F401 - wires up src.api before src.services
+from src.services.kafka.codec import MessageCodec, msgpack, orjson
+
+MESSAGES = 10_000
+ROUNDS = 5
+
+
+def sample_messages(count: int) -> list[dict]:
+  started = datetime(2025, 1, 1)
+  return [
+    {
+      "external_id": str(uuid.uuid4()),
+      "event_date": (started + timedelta(seconds=i)).isoformat(),
+      "source": "telegram",
+      "user_id": f"user-{i % 500}",
+      "text": f"Рейс задержали на {i % 12} часов, никто ничего не объясняет",
+      "cleaned_text": f"рейс задержали на {i % 12} часов никто ничего не объясняет",
+      "lang_code": "ru",
+      "lang_score": 0.98,
+      "sentiment_label": "negative",
+      "sentiment_score": 0.91,
+      "emotion_label": "anger",
+      "emotion_score": 0.87,
+      "category_level_1": "departure_arrival",
+      "category_level_2": ["flight_delay"],
+      "content_hash": uuid.uuid4().hex * 2,
+    }
+    for i in range(count)
+  ]
+
+
+def best_of(rounds: int, fn) -> float:
+  timings = []
+  for _ in range(rounds):
+    started = time.perf_counter()
+    fn()
+    timings.append(time.perf_counter() - started)
+  return min(timings)
+
+
+def bench_legacy(messages: list[dict]) -> tuple[float, float, int]:
+  """The previous path: string from model_dump_json, json.dumps serializer, two json.loads"""
+  strings = [json.dumps(message) for message in messages]
+  encoded = [json.dumps(s).encode("utf-8") for s in strings]
+
+  encode = best_of(ROUNDS, lambda: [json.dumps(s).encode("utf-8") for s in strings])
+  decode = best_of(ROUNDS, lambda: [json.loads(json.loads(v.decode("utf-8"))) for v in encoded])
+  return encode, decode, sum(len(v) for v in encoded)
+
+
+def bench_codec(message_format: str, messages: list[dict]) -> tuple[float, float, int]:
+  codec = MessageCodec(message_format)
+  encoded = [codec.encode(message) for message in messages]
+
+  encode = best_of(ROUNDS, lambda: [codec.encode(message) for message in messages])
+  decode = best_of(ROUNDS, lambda: [codec.decode(value, headers) for value, headers in encoded])
+  return encode, decode, sum(len(value) for value, _ in encoded)
+
+
+def main():
+  messages = sample_messages(MESSAGES)
+
+  results = {"legacy double json": bench_legacy(messages), "json": bench_codec("json", messages)}
+  if orjson is not None:
+    results["orjson"] = bench_codec("orjson", messages)
+  if msgpack is not None:
+    results["msgpack"] = bench_codec("msgpack", messages)
+
+  print(f"{'codec':<20}{'encode ms':>12}{'decode ms':>12}{'bytes':>12}   per {MESSAGES} messages")
+  for name, (encode, decode, size) in results.items():
+    print(f"{name:<20}{encode * 1000:>12.2f}{decode * 1000:>12.2f}{size:>12}")
+
+
+if __name__ == "__main__":
+  main()
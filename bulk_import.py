@@ -0,0 +1,42 @@
+"""Load files of classified messages straight into the messages table, bypassing Kafka.
+
+Usage: python bulk_import.py FILE [FILE ...]
+Accepts CSV, NDJSON and Parquet files (CSV and NDJSON optionally .gz / .zst) with the
+MessageCreate fields; rows whose content_hash is already stored are skipped.
+"""
+import argparse
+import asyncio
+from pathlib import Path
+
+from src.app.main import app  # noqa: F401 - wires up src.api before src.services
+from src.database.database import engine
+from src.services.bulk_import import BulkImportResult, import_file
+
+
+def print_progress(progress: BulkImportResult):
+  print(
+    f"  {progress.rows} rows, {progress.inserted} inserted, {progress.rejected} rejected"
+    f" - {progress.rows_per_second:,.0f} rows/s"
+  )
+
+
+async def main(paths: list[Path]):
+  try:
+    for path in paths:
+      print(f"Importing {path}")
+      result = await import_file(path, on_progress=print_progress)
+      for error in result.errors:
+        print(f"  {error}")
+      print(
+        f"Done in {result.seconds:.1f}s: {result.rows} rows, {result.inserted} inserted,"
+        f" {result.skipped} already stored, {result.rejected} rejected"
+        f" - {result.rows_per_second:,.0f} rows/s"
+      )
+  finally:
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("paths", nargs="+", type=Path, metavar="FILE")
+  asyncio.run(main(parser.parse_args().paths))
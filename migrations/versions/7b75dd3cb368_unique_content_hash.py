@@ -0,0 +1,41 @@
+"""unique content_hash
+
+Revision ID: 7b75dd3cb368
+Revises: 1690cfde70ef
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b75dd3cb368'
+down_revision: Union[str, Sequence[str], None] = '1690cfde70ef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep the oldest row of every content hash so the unique index can be built
+    op.execute(
+        sa.text(
+            """
+            DELETE FROM messages m
+            USING messages d
+            WHERE m.content_hash = d.content_hash
+              AND (m.created_at, m.id) > (d.created_at, d.id)
+            """
+        )
+    )
+    op.drop_index(op.f('ix_messages_content_hash'), table_name='messages')
+    op.create_index(op.f('ix_messages_content_hash'), 'messages', ['content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_messages_content_hash'), table_name='messages')
+    op.create_index(op.f('ix_messages_content_hash'), 'messages', ['content_hash'], unique=False)
@@ -0,0 +1,74 @@
+"""binary content_hash
+
+Revision ID: a8c3e1f4d602
+Revises: f2b6d4a9c517
+Create Date: 2026-10-18 19:26:10.842317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c3e1f4d602'
+down_revision: Union[str, Sequence[str], None] = 'f2b6d4a9c517'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 50000
+
+# Existing hashes are SHA-256 hex (hash version 1); keep their first 16 bytes
+BACKFILL_BATCH = sa.text(
+    """
+    WITH batch AS (
+        SELECT id FROM messages WHERE id > :after ORDER BY id LIMIT :batch_size
+    ), updated AS (
+        UPDATE messages m
+        SET content_digest = decode(substr(m.content_hash, 1, 32), 'hex'), hash_version = 1
+        FROM batch
+        WHERE m.id = batch.id AND m.content_hash IS NOT NULL
+    )
+    SELECT max(id) FROM batch
+    """
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('messages', sa.Column('content_digest', sa.LargeBinary(length=16), nullable=True))
+    op.add_column('messages', sa.Column('hash_version', sa.SmallInteger(), nullable=True))
+
+    # Walk the primary key committing every batch, so the backfill neither holds one huge
+    # transaction nor rescans rows it has already converted
+    with op.get_context().autocommit_block():
+        after = ''
+        while after is not None:
+            after = op.get_bind().execute(
+                BACKFILL_BATCH, {'after': after, 'batch_size': BACKFILL_BATCH_SIZE}
+            ).scalar()
+
+    # Rows written while the batches ran
+    op.execute(
+        """
+        UPDATE messages
+        SET content_digest = decode(substr(content_hash, 1, 32), 'hex'), hash_version = 1
+        WHERE content_hash IS NOT NULL AND content_digest IS NULL
+        """
+    )
+
+    op.drop_index(op.f('ix_messages_content_hash'), table_name='messages')
+    op.drop_column('messages', 'content_hash')
+    op.alter_column('messages', 'content_digest', new_column_name='content_hash')
+    op.create_index(op.f('ix_messages_content_hash'), 'messages', ['content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Version 1 hashes were cut to 16 bytes on upgrade and version 2 ones mean nothing to the
+    # earlier code, so no stored hash could be matched again after going back
+    raise NotImplementedError(
+        'a8c3e1f4d602 is irreversible: the full SHA-256 content hashes are gone. '
+        'Restore messages from a backup taken before the upgrade instead.'
+    )
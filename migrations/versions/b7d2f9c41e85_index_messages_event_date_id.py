@@ -0,0 +1,42 @@
+"""index messages (event_date, id)
+
+Revision ID: b7d2f9c41e85
+Revises: a8c3e1f4d602
+Create Date: 2026-10-18 21:04:37.516209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2f9c41e85'
+down_revision: Union[str, Sequence[str], None] = 'a8c3e1f4d602'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination index; it also serves every event_date range the old index did
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_event_date_id', 'messages', ['event_date', 'id'], unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            op.f('ix_messages_event_date'), table_name='messages', postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_messages_event_date'), 'messages', ['event_date'], unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_messages_event_date_id', table_name='messages', postgresql_concurrently=True
+        )
@@ -0,0 +1,56 @@
+"""add upload_jobs
+
+Revision ID: c41d9a0e2f53
+Revises: 7b75dd3cb368
+Create Date: 2026-10-18 17:02:14.225911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d9a0e2f53'
+down_revision: Union[str, Sequence[str], None] = '7b75dd3cb368'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'upload_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('filename', sa.String(), nullable=False),
+        sa.Column('file_path', sa.String(), nullable=False),
+        sa.Column('staged_path', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('worker_id', sa.String(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('next_offset', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('total_rows', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('invalid_rows', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('duplicate_rows', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('sent_rows', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('failed_rows', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column(
+            'errors', postgresql.ARRAY(sa.String()), server_default=sa.text("'{}'"), nullable=False
+        ),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_upload_jobs_status'), 'upload_jobs', ['status'], unique=False)
+    op.create_index(op.f('ix_upload_jobs_created_at'), 'upload_jobs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_upload_jobs_created_at'), table_name='upload_jobs')
+    op.drop_index(op.f('ix_upload_jobs_status'), table_name='upload_jobs')
+    op.drop_table('upload_jobs')
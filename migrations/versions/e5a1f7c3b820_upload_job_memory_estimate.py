@@ -0,0 +1,28 @@
+"""upload job memory estimate
+
+Revision ID: e5a1f7c3b820
+Revises: c41d9a0e2f53
+Create Date: 2026-10-18 17:41:06.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1f7c3b820'
+down_revision: Union[str, Sequence[str], None] = 'c41d9a0e2f53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('upload_jobs', sa.Column('estimated_memory_bytes', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('upload_jobs', 'estimated_memory_bytes')
@@ -0,0 +1,35 @@
+"""index messages created_at
+
+Revision ID: f2b6d4a9c517
+Revises: e5a1f7c3b820
+Create Date: 2026-10-18 18:52:44.310925
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d4a9c517'
+down_revision: Union[str, Sequence[str], None] = 'e5a1f7c3b820'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # messages is large; build without blocking ingest writes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_messages_created_at'), 'messages', ['created_at'], unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f('ix_messages_created_at'), table_name='messages', postgresql_concurrently=True
+        )
@@ -0,0 +1,50 @@
+"""Rebuild the messages table from the topic_in history, e.g. after a classification fix.
+
+Usage: python rebuild.py [--from-offset N | --from-timestamp ISO8601] [--keep-old]
+Reads every partition up to its end offset at startup into an unindexed shadow table, then
+indexes it and swaps it in for messages. Stored messages the topic does not have, such as bulk
+imports, are kept. The API can keep running; it only waits for the swap.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+
+from src.app.main import app  # noqa: F401 - wires up src.api before src.services
+from src.database.database import engine
+from src.services.rebuild import TableRebuild
+
+
+async def main(args: argparse.Namespace):
+  try:
+    result = await TableRebuild().run(
+      from_offset=args.from_offset, from_timestamp=args.from_timestamp, keep_old=args.keep_old
+    )
+  finally:
+    await engine.dispose()
+
+  for error in result.errors:
+    print(f"  {error}")
+  print(
+    f"Rebuilt in {result.seconds:.0f}s: {result.records} records, {result.loaded} rows loaded,"
+    f" {result.duplicates} duplicates dropped, {result.rejected} rejected,"
+    f" {result.preserved} stored rows not in the topic kept,"
+    f" {result.carried_over} rows carried over from the live table"
+  )
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  start = parser.add_mutually_exclusive_group()
+  start.add_argument("--from-offset", type=int, help="Offset to start every partition from")
+  start.add_argument(
+    "--from-timestamp",
+    type=datetime.fromisoformat,
+    help="Start at the first record at or after this time (UTC if naive)",
+  )
+  parser.add_argument(
+    "--keep-old", action="store_true", help="Keep the replaced table as messages_old"
+  )
+  args = parser.parse_args()
+  logging.basicConfig(level=logging.INFO, format="%(message)s")
+  asyncio.run(main(args))
@@ -4,6 +4,7 @@ from src.api.batch_data.router import batch_router
 from src.api.dashboard.router import dashboard_router
 from src.api.message.router import messages_router
 from src.api.filters.router import filters_router
+from src.api.admin.router import admin_router
 
 main_router = APIRouter()
 
@@ -12,3 +13,4 @@ main_router.include_router(batch_router)
 main_router.include_router(dashboard_router)
 main_router.include_router(messages_router)
 main_router.include_router(filters_router)
+main_router.include_router(admin_router)
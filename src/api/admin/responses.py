@@ -0,0 +1,77 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class DLQReplayResponse(BaseModel):
+  topic: str = Field(..., description="Dead-letter topic the records were read from")
+  replayed: int = Field(..., description="Number of records re-published to the ingest pipeline")
+
+
+class PoolState(BaseModel):
+  size: int
+  checked_out: int
+  overflow: int
+
+
+class PartitionFlowState(BaseModel):
+  topic: str
+  partition: int
+  queue_depth: int = Field(..., description="Records fetched but not yet written")
+  queue_full: bool = Field(..., description="Paused because the worker queue is full")
+  paused: bool
+
+
+class IngestFlowState(BaseModel):
+  throttled: bool = Field(..., description="Ingest paused to protect database latency")
+  throttled_for_ms: float
+  throttle_count: int
+  insert_latency_ms: Optional[float] = Field(None, description="Smoothed batch insert latency")
+  pool_wait_ms: Optional[float] = Field(None, description="Smoothed pool checkout wait")
+  target_latency_ms: int
+  max_pool_wait_ms: int
+  pool: PoolState
+  partitions: List[PartitionFlowState]
+
+
+class UploadMemoryState(BaseModel):
+  budget_bytes: int = Field(..., description="Memory upload jobs may reserve in this process")
+  reserved_bytes: int = Field(..., description="Estimated footprint of the running jobs")
+  waiting_jobs: int = Field(..., description="Jobs held back until their estimate fits")
+  rss_bytes: Optional[int] = Field(None, description="Resident memory of the API process")
+  worker_rss_bytes: List[Optional[int]] = Field(
+    ..., description="Resident memory of each processing worker"
+  )
+
+
+class UploadQueueState(BaseModel):
+  worker_id: str = Field(..., description="Identifies this process in upload_jobs.worker_id")
+  concurrency: int = Field(..., description="Upload jobs this process runs at once")
+  queued: int = Field(..., description="Jobs waiting for a free worker")
+  running: List[str] = Field(..., description="IDs of the jobs being processed")
+  memory: UploadMemoryState
+
+
+class DedupIndexState(BaseModel):
+  enabled: bool
+  ready: bool = Field(..., description="Loaded; until then every hash is looked up in the database")
+  watermark: Optional[datetime] = Field(
+    None, description="Rows created after this are rescanned on refresh"
+  )
+  items: int = Field(..., description="Content hashes in the filter")
+  stages: int
+  size_bytes: int
+  lookups: int = Field(..., description="Hashes checked since startup")
+  candidates: int = Field(..., description="Hashes looked up in the database")
+  confirmed: int = Field(..., description="Hashes found in the database")
+
+
+class BulkImportResponse(BaseModel):
+  file: str
+  rows: int = Field(..., description="Rows read from the file")
+  inserted: int
+  skipped: int = Field(..., description="Valid rows whose content_hash was already stored")
+  rejected: int = Field(..., description="Rows that failed validation")
+  errors: List[str] = Field(..., description="The first rejected rows and why")
+  seconds: float
+  rows_per_second: float
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Query
+from .responses import (
+  BulkImportResponse,
+  DedupIndexState,
+  DLQReplayResponse,
+  IngestFlowState,
+  UploadQueueState,
+)
+from .service import AdminService
+
+admin_router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@admin_router.post(path="/dlq/replay", response_model=DLQReplayResponse)
+async def replay_dlq(limit: int = Query(10000, ge=1, le=1000000)):
+  return await AdminService.replay_dlq(limit)
+
+
+@admin_router.get(path="/ingest/flow", response_model=IngestFlowState)
+def get_ingest_flow_state():
+  return AdminService.get_ingest_flow_state()
+
+
+@admin_router.get(path="/uploads", response_model=UploadQueueState)
+def get_upload_queue_state():
+  return AdminService.get_upload_queue_state()
+
+
+@admin_router.put(path="/uploads/concurrency", response_model=UploadQueueState)
+def set_upload_concurrency(concurrency: int = Query(..., ge=0, le=64)):
+  """Throttle or pause (0) upload processing in this process; running jobs finish their file"""
+  return AdminService.set_upload_concurrency(concurrency)
+
+
+@admin_router.get(path="/dedup", response_model=DedupIndexState)
+def get_dedup_index_state():
+  return AdminService.get_dedup_index_state()
+
+
+@admin_router.post(path="/import", response_model=BulkImportResponse)
+async def bulk_import(path: str = Query(..., description="File under the import directory")):
+  """COPY a file of classified messages straight into the database, bypassing Kafka.
+
+  For large backfills prefer the bulk_import.py CLI, which does not hold a request open.
+  """
+  return await AdminService.bulk_import(path)
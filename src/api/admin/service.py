@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from src.app.exceptions import BAD_REQUEST_EXCEPTION, NOT_FOUND_EXCEPTION
+from src.services import kafka_service
+from src.services.bulk_import import import_file
+from src.services.bulk_import.config import bulk_import_settings
+from src.services.dedup import dedup_index
+from src.services.file_upload.jobs import upload_queue
+from .responses import (
+  BulkImportResponse,
+  DedupIndexState,
+  DLQReplayResponse,
+  IngestFlowState,
+  UploadQueueState,
+)
+
+
+class AdminService:
+  @classmethod
+  async def replay_dlq(cls, limit: int) -> DLQReplayResponse:
+    replayed = await kafka_service.dlq.replay(limit)
+    return DLQReplayResponse(topic=kafka_service.dlq.topic, replayed=replayed)
+
+  @classmethod
+  def get_ingest_flow_state(cls) -> IngestFlowState:
+    return IngestFlowState.model_validate(kafka_service.get_flow_state())
+
+  @classmethod
+  def get_upload_queue_state(cls) -> UploadQueueState:
+    return UploadQueueState.model_validate(upload_queue.state())
+
+  @classmethod
+  def set_upload_concurrency(cls, concurrency: int) -> UploadQueueState:
+    upload_queue.resize(concurrency)
+    return cls.get_upload_queue_state()
+
+  @classmethod
+  def get_dedup_index_state(cls) -> DedupIndexState:
+    return DedupIndexState.model_validate(dedup_index.state())
+
+  @classmethod
+  async def bulk_import(cls, path: str) -> BulkImportResponse:
+    root = Path(bulk_import_settings.bulk_import_dir).resolve()
+    file_path = (root / path).resolve()
+    if not file_path.is_relative_to(root) or not file_path.is_file():
+      raise NOT_FOUND_EXCEPTION(f"No file {path} in the import directory")
+
+    try:
+      result = await import_file(file_path)
+    except ValueError as e:
+      raise BAD_REQUEST_EXCEPTION(str(e))
+    return BulkImportResponse(file=path, rows_per_second=result.rows_per_second, **result._asdict())
@@ -1,3 +1,17 @@
-from src.app.exceptions import CONTENT_TOO_LARGE_EXCEPTION
+from src.app.exceptions import (
+  BAD_REQUEST_EXCEPTION,
+  CONTENT_TOO_LARGE_EXCEPTION,
+  UNSUPPORTED_MEDIA_TYPE_EXCEPTION,
+)
 
 BATCH_TOO_LARGE_TO_PROCESSING = CONTENT_TOO_LARGE_EXCEPTION("Batch is to large to processing")
+UNSUPPORTED_STREAM_FORMAT = UNSUPPORTED_MEDIA_TYPE_EXCEPTION(
+  "Send application/x-ndjson or application/vnd.apache.arrow.stream"
+)
+ARROW_NOT_AVAILABLE = UNSUPPORTED_MEDIA_TYPE_EXCEPTION(
+  "Arrow IPC streams are not supported: pyarrow is not installed on the server"
+)
+
+
+def INVALID_ARROW_STREAM(records: int, error: Exception):
+  return BAD_REQUEST_EXCEPTION(f"Invalid Arrow IPC stream after {records} records: {error}")
@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class StreamIngestResponse(BaseModel):
+  accepted: int = Field(..., description="Records delivered to Kafka")
+  rejected: int = Field(..., description="Records that failed validation")
+  failed: int = Field(..., description="Valid records Kafka did not acknowledge")
+  errors: List[str] = Field(..., description="Why the first rejected records were rejected")
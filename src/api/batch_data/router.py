@@ -1,9 +1,10 @@
-from fastapi import APIRouter, BackgroundTasks, status
+from fastapi import APIRouter, BackgroundTasks, Request, status
 from src.api.batch_data.exceptions import BATCH_TOO_LARGE_TO_PROCESSING
+from src.api.batch_data.responses import StreamIngestResponse
 from src.api.batch_data.schemas import AppealItem
 from typing import List
 from src.services.kafka.config import kafka_settings
-from src.api.batch_data.service import send_batch_to_kafka
+from src.api.batch_data.service import send_batch_to_kafka, stream_ingest
 
 batch_router = APIRouter(prefix="/batch-data", tags=["Batch Data"])
 
@@ -15,7 +16,20 @@ async def process_batch_data(data: List[AppealItem], background_tasks: Backgroun
   if len(data) > BATCH_MAX_SIZE:
     raise BATCH_TOO_LARGE_TO_PROCESSING
 
-  json_data = [item.model_dump_json() for item in data]
+  json_data = [item.model_dump_json().encode() for item in data]
+  keys = [item.user_id for item in data]
 
-  background_tasks.add_task(send_batch_to_kafka, topic=kafka_settings.topic_out, data=json_data)
+  background_tasks.add_task(
+    send_batch_to_kafka, topic=kafka_settings.topic_out, data=json_data, keys=keys
+  )
   return {"status": "accepted", "count": len(data)}
+
+
+@batch_router.post("/stream", response_model=StreamIngestResponse)
+async def stream_batch_data(request: Request):
+  """Ingest an application/x-ndjson or Arrow IPC stream body of any size.
+
+  Records are validated and forwarded in chunks while the body is still arriving; the reply
+  comes once every valid record has been delivered or has failed.
+  """
+  return await stream_ingest(request, kafka_settings.topic_out)
@@ -1,7 +1,237 @@
+import asyncio
+import io
+from collections import deque
+from typing import AsyncIterator, List, Optional
+
+from fastapi import Request
+from pydantic import ValidationError
+
+from src.api.batch_data.exceptions import (
+  ARROW_NOT_AVAILABLE,
+  INVALID_ARROW_STREAM,
+  UNSUPPORTED_STREAM_FORMAT,
+)
+from src.api.batch_data.responses import StreamIngestResponse
+from src.api.batch_data.schemas import AppealItem
 from src.services import kafka_service
-from typing import List
 
+try:
+  import pyarrow.ipc
+except ImportError:  # a project dependency, but the module still loads without it
+  pyarrow = None
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl")
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+STREAM_CHUNK_ROWS = 1000
+STREAM_MAX_IN_FLIGHT = 4
+STREAM_MAX_LINE_BYTES = 1048576  # 1MB
+STREAM_MAX_ERRORS = 100
+
+_DONE = object()
+
+
+async def send_batch_to_kafka(*, data: List[bytes], topic: str, keys: Optional[List[str]] = None):
+  stats = await kafka_service.send_messages(topic, data, keys=keys)
+  if not stats.ok:
+    print(
+      f"Batch delivery to '{topic}': {stats.sent} sent, {stats.failed} failed: {stats.errors[:5]}"
+    )
+
+
+class StreamIngest:
+  """Validates the records of one streamed request and forwards them to Kafka in chunks.
+
+  At most STREAM_MAX_IN_FLIGHT chunks wait for delivery at a time. While the window is full
+  the request body is not read any further, so a slow broker pushes back on the client
+  through TCP flow control instead of piling records up in memory.
+  """
+
+  def __init__(self, topic: str):
+    self.topic = topic
+    self.records = 0
+    self.accepted = 0
+    self.rejected = 0
+    self.failed = 0
+    self.errors: List[str] = []
+    self.data: List[bytes] = []
+    self.keys: List[str] = []
+    self.in_flight: deque[asyncio.Task] = deque()
+
+  def reject(self, message: str):
+    self.rejected += 1
+    if len(self.errors) < STREAM_MAX_ERRORS:
+      self.errors.append(f"Record {self.records}: {message}")
+
+  def reject_invalid(self, error: ValidationError):
+    details = error.errors()[0]
+    field = ".".join(str(part) for part in details["loc"]) or "record"
+    self.reject(f"{field}: {details['msg']}")
+
+  async def add(self, item: AppealItem):
+    self.data.append(item.model_dump_json().encode())
+    self.keys.append(item.user_id)
+    if len(self.data) >= STREAM_CHUNK_ROWS:
+      await self.flush()
+
+  async def flush(self):
+    if not self.data:
+      return
+    while len(self.in_flight) >= STREAM_MAX_IN_FLIGHT:
+      await self._collect(self.in_flight.popleft())
+
+    self.in_flight.append(
+      asyncio.create_task(kafka_service.send_messages(self.topic, self.data, keys=self.keys))
+    )
+    self.data, self.keys = [], []
+
+  async def finish(self) -> StreamIngestResponse:
+    await self.flush()
+    while self.in_flight:
+      await self._collect(self.in_flight.popleft())
+    return StreamIngestResponse(
+      accepted=self.accepted, rejected=self.rejected, failed=self.failed, errors=self.errors
+    )
+
+  async def abort(self):
+    """Wait for the chunks already handed to the producer, their records are on their way"""
+    await asyncio.gather(*self.in_flight, return_exceptions=True)
+    self.in_flight.clear()
+
+  async def _collect(self, delivery: asyncio.Task):
+    stats = await delivery
+    self.accepted += stats.sent
+    self.failed += stats.failed
+    if not stats.ok:
+      print(
+        f"Stream delivery to '{self.topic}': {stats.sent} sent, {stats.failed} failed: "
+        f"{stats.errors[:5]}"
+      )
+
+
+async def _ingest_ndjson(body: AsyncIterator[bytes], ingest: StreamIngest):
+  buffer = b""
+  skipping = False
+
+  async def add_line(line: bytes):
+    if not line.strip():
+      return
+    ingest.records += 1
+    if len(line) > STREAM_MAX_LINE_BYTES:
+      ingest.reject(f"line longer than {STREAM_MAX_LINE_BYTES} bytes")
+      return
+    try:
+      item = AppealItem.model_validate_json(line)
+    except ValidationError as e:
+      ingest.reject_invalid(e)
+      return
+    await ingest.add(item)
+
+  async for chunk in body:
+    lines = (buffer + chunk).split(b"\n")
+    buffer = lines.pop()
+    if skipping and lines:
+      # Rest of an overlong line
+      lines.pop(0)
+      skipping = False
+
+    for line in lines:
+      await add_line(line)
+
+    if len(buffer) > STREAM_MAX_LINE_BYTES:
+      if not skipping:
+        ingest.records += 1
+        ingest.reject(f"line longer than {STREAM_MAX_LINE_BYTES} bytes")
+      buffer = b""
+      skipping = True
+
+  if not skipping:
+    await add_line(buffer)
+
+
+class _BodyReader(io.RawIOBase):
+  """Blocking file over the request body, for pyarrow running in a worker thread"""
+
+  def __init__(self, body: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop):
+    self.body = body
+    self.loop = loop
+    self.pending = b""
+
+  def readable(self) -> bool:
+    return True
+
+  async def _next_chunk(self) -> bytes:
+    return await anext(self.body)
+
+  def readinto(self, buffer) -> int:
+    while not self.pending:
+      try:
+        self.pending = asyncio.run_coroutine_threadsafe(self._next_chunk(), self.loop).result()
+      except StopAsyncIteration:
+        return 0
+    size = min(len(buffer), len(self.pending))
+    buffer[:size] = self.pending[:size]
+    self.pending = self.pending[size:]
+    return size
+
+
+async def _ingest_arrow(body: AsyncIterator[bytes], ingest: StreamIngest):
+  """Decode record batches in a thread as the body arrives, validate and send them here"""
+  loop = asyncio.get_running_loop()
+  batches: asyncio.Queue = asyncio.Queue(maxsize=2)
+  stopped = False
+
+  def hand_over(item):
+    asyncio.run_coroutine_threadsafe(batches.put(item), loop).result()
+
+  def read_batches():
+    try:
+      reader = pyarrow.ipc.open_stream(io.BufferedReader(_BodyReader(body, loop)))
+      for batch in reader:
+        if stopped:
+          return
+        hand_over(batch.to_pylist())
+      hand_over(_DONE)
+    except Exception as e:
+      if not stopped:
+        hand_over(e)
+
+  reading = asyncio.create_task(asyncio.to_thread(read_batches))
+  try:
+    while (rows := await batches.get()) is not _DONE:
+      if isinstance(rows, Exception):
+        raise INVALID_ARROW_STREAM(ingest.records, rows)
+      for row in rows:
+        ingest.records += 1
+        try:
+          item = AppealItem.model_validate(row)
+        except ValidationError as e:
+          ingest.reject_invalid(e)
+          continue
+        await ingest.add(item)
+  finally:
+    # Unblock the reader thread if it is waiting to hand over a batch
+    stopped = True
+    while not batches.empty():
+      batches.get_nowait()
+    await reading
+
+
+async def stream_ingest(request: Request, topic: str) -> StreamIngestResponse:
+  media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+  if media_type in NDJSON_MEDIA_TYPES:
+    read = _ingest_ndjson
+  elif media_type == ARROW_STREAM_MEDIA_TYPE:
+    if pyarrow is None:
+      raise ARROW_NOT_AVAILABLE
+    read = _ingest_arrow
+  else:
+    raise UNSUPPORTED_STREAM_FORMAT
 
-async def send_batch_to_kafka(*, data: List[str], topic: str):
-  for item in data:
-    await kafka_service.send_message(topic=topic, message=item)
+  ingest = StreamIngest(topic)
+  try:
+    await read(request.stream(), ingest)
+  except BaseException:
+    await ingest.abort()
+    raise
+  return await ingest.finish()
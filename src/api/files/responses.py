@@ -0,0 +1,34 @@
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime
+from typing import List, Literal, Optional
+
+
+class UploadAcceptedResponse(BaseModel):
+  status: Literal["processing"] = "processing"
+  job_id: str = Field(..., description="Poll /files/jobs/{job_id} for progress")
+  size: int = Field(..., description="Number of bytes received")
+  checksum: str = Field(..., description="SHA-256 of the file contents")
+
+
+class MultipleUploadAcceptedResponse(BaseModel):
+  status: Literal["processing"] = "processing"
+  jobs: List[UploadAcceptedResponse]
+
+
+class UploadJobResponse(BaseModel):
+  id: str
+  filename: str
+  status: Literal["queued", "processing", "completed", "failed"]
+  total_rows: int = Field(..., description="Rows processed so far")
+  next_offset: int = Field(..., description="Row the job resumes from after a restart")
+  invalid_rows: int = Field(..., description="Rows that failed validation and were skipped")
+  duplicate_rows: int = Field(..., description="Rows already in the file or in the database")
+  sent_rows: int = Field(..., description="Rows delivered to Kafka")
+  failed_rows: int = Field(..., description="Rows Kafka did not acknowledge")
+  errors: List[str] = Field(..., description="Validation errors of the first invalid rows")
+  error: Optional[str] = Field(None, description="Why the job failed as a whole")
+  created_at: datetime
+  started_at: Optional[datetime] = None
+  finished_at: Optional[datetime] = None
+
+  model_config = ConfigDict(from_attributes=True)
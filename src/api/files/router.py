@@ -1,29 +1,49 @@
-from fastapi import APIRouter, UploadFile, BackgroundTasks, status
+from fastapi import APIRouter, Depends, UploadFile, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.files.utils import validate_file, save_file
 from src.api.files.service import FilesService
+from src.api.files.responses import (
+  MultipleUploadAcceptedResponse,
+  UploadAcceptedResponse,
+  UploadJobResponse,
+)
+from src.database import get_db
 
 files_router = APIRouter(prefix="/files", tags=["File"])
 
 
-@files_router.post("/upload", status_code=status.HTTP_202_ACCEPTED)
-async def upload_file(file: UploadFile, background_tasks: BackgroundTasks):
+async def accept_upload(file: UploadFile, db: AsyncSession) -> UploadAcceptedResponse:
   validate_file(file=file)
 
-  saved_path = save_file(file=file)
+  saved_file = await save_file(file=file)
 
-  await FilesService.validate_file(saved_path)
+  await FilesService.validate_file_sample(saved_file.path)
 
-  background_tasks.add_task(FilesService.process_and_send_to_kafka, saved_path)
+  job = await FilesService.create_job(db, file.filename, saved_file.path)
 
-  return {"status": "processing"}
+  return UploadAcceptedResponse(job_id=job.id, size=saved_file.size, checksum=saved_file.checksum)
 
 
-@files_router.post("/multiple-upload", status_code=status.HTTP_202_ACCEPTED)
-async def upload_files(files: list[UploadFile], background_tasks: BackgroundTasks):
-  for file in files:
-    validate_file(file=file)
-    saved_path = save_file(file=file)
-    await FilesService.validate_file(saved_path)
-    background_tasks.add_task(FilesService.process_and_send_to_kafka, saved_path)
-  return {"status": "processing"}
+@files_router.post(
+  "/upload", status_code=status.HTTP_202_ACCEPTED, response_model=UploadAcceptedResponse
+)
+async def upload_file(file: UploadFile, db=Depends(get_db)):
+  return await accept_upload(file, db)
+
+
+@files_router.post(
+  "/multiple-upload",
+  status_code=status.HTTP_202_ACCEPTED,
+  response_model=MultipleUploadAcceptedResponse,
+)
+async def upload_files(files: list[UploadFile], db=Depends(get_db)):
+  return MultipleUploadAcceptedResponse(jobs=[await accept_upload(file, db) for file in files])
+
+
+@files_router.get("/jobs/{job_id}", response_model=UploadJobResponse)
+async def get_upload_job(job_id: str, db=Depends(get_db)):
+  job = await FilesService.get_job(db, job_id)
+  if not job:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload job not found")
+  return job
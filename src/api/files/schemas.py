@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class SavedFile(BaseModel):
+  path: str = Field(..., description="Location of the stored upload")
+  size: int = Field(..., description="Number of bytes received")
+  checksum: str = Field(..., description="SHA-256 of the file contents")
@@ -1,72 +1,181 @@
 import asyncio
 import os
+from collections import deque
+
+import numpy as np
+import polars as pl
 
 from src.services import (
   kafka_service,
-  process_file as process_file_sync,
   kafka_settings,
-  validate_file_structure as validate_file_structure_sync,
+  stage_file as stage_file_sync,
+  validate_file_sample as validate_file_sample_sync,
+)
+from src.services.dedup import dedup_index
+from src.services.file_upload.config import file_upload_settings
+from src.services.file_upload.dedup import SeenHashes
+from src.services.file_upload.executor import concurrency, run_cpu_bound
+from src.services.file_upload.jobs import upload_queue
+from src.services.file_upload.service import (
+  BATCH_SIZE,
+  StagedBatch,
+  count_staged_rows,
+  estimate_memory,
+  prepare_staged_batch,
 )
-from src.services.file_upload.service import FileProcessorFactory
-from pathlib import Path
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.app.exceptions import BAD_REQUEST_EXCEPTION
-from src.database.database import AsyncSessionLocal
+from src.database.models.upload_job import UploadJob
 from src.database.repositories.message import MessageRepository
+from src.database.repositories.upload_job import UploadJobRepository
 
 
 class FilesService:
   @staticmethod
-  async def validate_file(file_path: str):
+  async def validate_file_sample(file_path: str):
     try:
-      await asyncio.to_thread(validate_file_structure_sync, file_path)
+      await run_cpu_bound(
+        validate_file_sample_sync, file_path, file_upload_settings.upload_sample_rows
+      )
     except ValueError as e:
+      os.remove(file_path)
       raise BAD_REQUEST_EXCEPTION(detail=str(e))
 
   @staticmethod
-  async def process_file(file_path: str) -> dict:
-    return await asyncio.to_thread(process_file_sync, file_path)
+  async def create_job(db: AsyncSession, filename: str, file_path: str) -> UploadJob:
+    estimated_memory = await run_cpu_bound(estimate_memory, file_path)
+    job = await UploadJobRepository(db).create_job(filename, file_path, estimated_memory)
+    upload_queue.submit(job.id)
+    return job
+
+  @staticmethod
+  async def get_job(db: AsyncSession, job_id: str) -> UploadJob | None:
+    return await UploadJobRepository(db).get_job(job_id)
+
+  @staticmethod
+  async def run_upload_job(job: UploadJob, repo: UploadJobRepository):
+    """Stage, fully validate and send the file, committing progress after every batch.
+
+    Files are removed only once the job has finished. A cancelled job keeps them and its
+    offset, so it can resume.
+    """
+    try:
+      if not job.staged_path:
+        job.staged_path = await run_cpu_bound(stage_file_sync, job.file_path)
+        await repo.save_progress(job)
+      await FilesService._send_staged_file(job, repo)
+    except Exception as e:
+      print(f"Upload job {job.id} ({job.filename}) failed: {e}")
+      await repo.db.rollback()
+      await repo.finish_job(job, error=str(e))
+    else:
+      await repo.finish_job(job)
+
+    for path in (job.file_path, job.staged_path):
+      if path and os.path.exists(path):
+        os.remove(path)
 
   @staticmethod
-  async def process_and_send_to_kafka(file_path: str):
-    processor = await asyncio.to_thread(FileProcessorFactory.create, Path(file_path))
-    
-    df = await asyncio.to_thread(processor.read_data)
-
-    await asyncio.to_thread(processor.validate_structure, df)
-    
-    total_rows = df.height
-    batch_size = 2000
-    local_seen_hashes = set()
-    
-    async with AsyncSessionLocal() as session:
-      repo = MessageRepository(session)
-      
-      for i in range(0, total_rows, batch_size):
-        chunk_df = df.slice(i, batch_size)
-        
-        batch_data = await asyncio.to_thread(processor.process_batch, chunk_df)
-        
-        if not batch_data:
-          continue
-
-        unique_batch = []
-        for record in batch_data:
-          if record.content_hash and record.content_hash not in local_seen_hashes:
-            local_seen_hashes.add(record.content_hash)
-            unique_batch.append(record)
-        
-        if not unique_batch:
-          continue
-
-        hashes_to_check = [r.content_hash for r in unique_batch if r.content_hash]
-        existing_hashes = await repo.get_existing_hashes(hashes_to_check)
-        
-        final_batch = [r for r in unique_batch if r.content_hash not in existing_hashes]
-        
-        if not final_batch:
-          continue
-
-        messages = [record.model_dump() for record in final_batch]
-        await kafka_service.send_messages(kafka_settings.topic_out, messages)
-
-    os.remove(file_path)
+  async def _send_staged_file(job: UploadJob, repo: UploadJobRepository):
+    """Prepare slices of the staged file in parallel, then dedup and send them in file order"""
+    total_rows = await asyncio.to_thread(count_staged_rows, job.staged_path)
+    offsets = iter(range(job.next_offset, total_rows, BATCH_SIZE))
+    in_flight: deque[asyncio.Future] = deque()
+    max_errors = file_upload_settings.upload_max_reported_errors
+
+    def submit_next() -> None:
+      offset = next(offsets, None)
+      if offset is not None:
+        in_flight.append(
+          asyncio.ensure_future(
+            run_cpu_bound(
+              prepare_staged_batch,
+              job.staged_path,
+              offset,
+              BATCH_SIZE,
+              max(max_errors - len(job.errors), 0),
+            )
+          )
+        )
+
+    for _ in range(concurrency() * 2):
+      submit_next()
+
+    message_repo = MessageRepository(repo.db)
+    seen_hashes = SeenHashes(
+      file_upload_settings.upload_dedup_memory_bytes, file_upload_settings.upload_dedup_spill_dir
+    )
+
+    try:
+      while in_flight:
+        batch = await in_flight.popleft()
+        submit_next()
+
+        await FilesService._send_batch(job, batch, message_repo, seen_hashes)
+
+        job.total_rows += batch.rows
+        job.invalid_rows += batch.invalid
+        if batch.errors and len(job.errors) < max_errors:
+          job.errors = [*job.errors, *(error.message for error in batch.errors)][:max_errors]
+        job.next_offset += batch.rows
+        await repo.save_progress(job)
+    finally:
+      for future in in_flight:
+        future.cancel()
+      seen_hashes.close()
+
+  @staticmethod
+  async def _send_batch(
+    job: UploadJob, batch: StagedBatch, message_repo: MessageRepository, seen_hashes: SeenHashes
+  ):
+    records = pl.read_ipc(batch.records)
+    if records.is_empty():
+      return
+
+    hashes = records["content_hash"].to_list()
+    legacy_hashes = records["legacy_hash"].to_list()
+    unique_rows = np.flatnonzero(seen_hashes.add_new(hashes)).tolist()
+
+    # Rows stored before version 2 hashes only match the version 1 hash of the same content
+    existing_hashes = await dedup_index.find_existing(
+      [hashes[i] for i in unique_rows] + [legacy_hashes[i] for i in unique_rows],
+      message_repo.get_existing_hashes,
+    )
+
+    final_rows = [
+      i for i in unique_rows
+      if hashes[i] not in existing_hashes and legacy_hashes[i] not in existing_hashes
+    ]
+    job.duplicate_rows += len(hashes) - len(final_rows)
+
+    if not final_rows:
+      return
+
+    final = records[final_rows]
+    await FilesService._deliver(job, final["message"].to_list(), final["user_id"].to_list())
+
+  @staticmethod
+  async def _deliver(job: UploadJob, messages: list, keys: list):
+    """Send a batch, resending undelivered rows with backoff.
+
+    Rows still undelivered after retry_max_attempts fail the job before its offset moves past
+    the batch, rather than being skipped.
+    """
+    delay = kafka_settings.retry_backoff_initial_ms / 1000
+    for attempt in range(1, kafka_settings.retry_max_attempts + 1):
+      stats = await kafka_service.send_messages(kafka_settings.topic_out, messages, keys=keys)
+      job.sent_rows += stats.sent
+      if stats.ok:
+        return
+      print(
+        f"Failed to deliver {stats.failed} of {len(messages)} rows from {job.filename} "
+        f"(attempt {attempt}/{kafka_settings.retry_max_attempts}): {stats.errors[:5]}"
+      )
+      messages = [messages[i] for i in stats.failed_indexes]
+      keys = [keys[i] for i in stats.failed_indexes]
+      if attempt < kafka_settings.retry_max_attempts:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, kafka_settings.retry_backoff_max_ms / 1000)
+
+    job.failed_rows += len(messages)
+    raise RuntimeError(f"Failed to deliver {len(messages)} rows to '{kafka_settings.topic_out}'")
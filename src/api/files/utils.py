@@ -1,35 +1,46 @@
 from fastapi import UploadFile, HTTPException
 from .exceptions import INVALID_FILE_EXTENTION, INVALID_FILE_SIZE
+from .schemas import SavedFile
 from time import time_ns
 
+import anyio
+import hashlib
 import os
 
+MAX_FILE_SIZE = 104857600  # 100MB - 1024 * 1024 * 100
+UPLOAD_CHUNK_SIZE = 1048576  # 1MB
+
 
 def validate_file(*, file: UploadFile):
   try:
     validate_file_extention(filename=file.filename)
-    validate_file_size(size=file.size)
+    if file.size is not None:
+      validate_file_size(size=file.size)
   except HTTPException as e:
     raise e
 
 
 def validate_file_extention(*, filename: str):
-  VALID_EXTENTIONS = ["xlsx", "csv", "json", "parquet", "xls"]
-
-  file_extention = filename.split(".")[-1]
+  VALID_EXTENTIONS = [
+    "xlsx", "csv", "json", "parquet", "xls", "csv.gz", "csv.zst", "ndjson.gz", "jsonl.zst"
+  ]
 
-  if file_extention not in VALID_EXTENTIONS:
+  if not any(filename.endswith(f".{extention}") for extention in VALID_EXTENTIONS):
     raise INVALID_FILE_EXTENTION
 
 
 def validate_file_size(*, size: int):
-  MAX_FILE_SIZE = 104857600  # 100MB - 1024 * 1024 * 100
-
   if size > MAX_FILE_SIZE:
     raise INVALID_FILE_SIZE
 
 
-def save_file(*, file: UploadFile) -> str:
+async def save_file(*, file: UploadFile) -> SavedFile:
+  """Copy the upload to disk chunk by chunk, enforcing the size limit and hashing on the way.
+
+  Starlette has spooled the whole multipart body to its temporary file before the endpoint
+  runs, so an oversized upload is rejected only after the client has sent all of it; the
+  chunked copy keeps the API's own memory flat, it does not cut the transfer short.
+  """
   directory = "uploaded_files"
   filename = f"{time_ns()}_{file.filename}"
 
@@ -38,7 +49,19 @@ def save_file(*, file: UploadFile) -> str:
   if not os.path.exists(directory):
     os.makedirs(directory)
 
-  with open(file=full_path, mode="wb") as f:
-    f.write(file.file.read())
+  checksum = hashlib.sha256()
+  size = 0
 
-  return full_path
+  try:
+    async with await anyio.open_file(full_path, mode="wb") as f:
+      while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        validate_file_size(size=size)
+        checksum.update(chunk)
+        await f.write(chunk)
+  except BaseException:
+    if os.path.exists(full_path):
+      os.remove(full_path)
+    raise
+
+  return SavedFile(path=full_path, size=size, checksum=checksum.hexdigest())
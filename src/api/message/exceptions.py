@@ -0,0 +1,6 @@
+from src.app.exceptions import BAD_REQUEST_EXCEPTION
+
+INVALID_CURSOR = BAD_REQUEST_EXCEPTION("Invalid cursor was provided")
+PARQUET_NOT_AVAILABLE = BAD_REQUEST_EXCEPTION(
+  "Parquet export is not supported: pyarrow is not installed on the server"
+)
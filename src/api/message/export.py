@@ -0,0 +1,142 @@
+"""Streaming export of filtered messages as NDJSON, CSV or Parquet.
+
+Rows are read from a server-side cursor a batch at a time and each batch is encoded and sent
+before the next one is fetched, so an export of any size holds one batch in memory.
+"""
+import io
+from typing import AsyncIterator, List
+
+import polars as pl
+from sqlalchemy import String, cast
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from src.database.database import AsyncSessionLocal
+from src.database.models.message import Message
+from src.database.repositories.message import MessageRepository
+from src.schemas import ExportFormatEnum
+from .schemas import MessageQueryFilter
+
+try:
+  import pyarrow.parquet
+except ImportError:  # a project dependency, but the module still loads without it
+  pyarrow = None
+
+EXPORT_BATCH_SIZE = 5000
+ISO_DATETIME = "%Y-%m-%dT%H:%M:%S%.f"
+
+MEDIA_TYPES = {
+  ExportFormatEnum.NDJSON: "application/x-ndjson",
+  ExportFormatEnum.CSV: "text/csv",
+  ExportFormatEnum.PARQUET: "application/vnd.apache.parquet",
+}
+
+EXPORT_SCHEMA = {
+  "id": pl.String,
+  "external_id": pl.String,
+  "created_at": pl.Datetime("us"),
+  "event_date": pl.Datetime("us"),
+  "source": pl.String,
+  "user_id": pl.String,
+  "text": pl.String,
+  "cleaned_text": pl.String,
+  "lang_code": pl.String,
+  "lang_score": pl.Float64,
+  "sentiment_label": pl.String,
+  "sentiment_score": pl.Float64,
+  "emotion_label": pl.String,
+  "emotion_score": pl.Float64,
+  "category_level_1": pl.String,
+  "category_level_2": pl.List(pl.String),
+}
+_ENUM_COLUMNS = ("sentiment_label", "emotion_label", "category_level_1")
+
+
+def _export_columns() -> list:
+  """Enums are read as their labels, the member names, and lowercased to the values here"""
+  columns = []
+  for name in EXPORT_SCHEMA:
+    column = Message.__table__.c[name]
+    if name in _ENUM_COLUMNS:
+      column = cast(column, String).label(name)
+    elif name == "category_level_2":
+      column = cast(column, ARRAY(String)).label(name)
+    columns.append(column)
+  return columns
+
+
+def _frame(rows: List) -> pl.DataFrame:
+  return pl.DataFrame(rows, schema=EXPORT_SCHEMA, orient="row").with_columns(
+    *(pl.col(name).str.to_lowercase() for name in _ENUM_COLUMNS),
+    pl.col("category_level_2").list.eval(pl.element().str.to_lowercase()),
+  )
+
+
+class _ChunkSink(io.RawIOBase):
+  """Write-only file whose contents are handed out and dropped after every row group"""
+
+  def __init__(self):
+    self.chunks: List[bytes] = []
+    self.size = 0
+
+  def writable(self) -> bool:
+    return True
+
+  def write(self, data) -> int:
+    self.chunks.append(bytes(data))
+    self.size += len(data)
+    return len(data)
+
+  def tell(self) -> int:
+    return self.size
+
+  def drain(self) -> bytes:
+    data = b"".join(self.chunks)
+    self.chunks.clear()
+    return data
+
+
+async def _batches(params: MessageQueryFilter) -> AsyncIterator[pl.DataFrame]:
+  # The body is sent after the endpoint has returned, so the export opens its own session
+  async with AsyncSessionLocal() as session:
+    rows = MessageRepository(session).stream_messages(params, _export_columns(), EXPORT_BATCH_SIZE)
+    async for batch in rows:
+      yield _frame(batch)
+
+
+async def export_ndjson(params: MessageQueryFilter) -> AsyncIterator[bytes]:
+  async for df in _batches(params):
+    buffer = io.BytesIO()
+    df.with_columns(pl.col(pl.Datetime).dt.strftime(ISO_DATETIME)).write_ndjson(buffer)
+    yield buffer.getvalue()
+
+
+async def export_csv(params: MessageQueryFilter) -> AsyncIterator[bytes]:
+  header = True
+  async for df in _batches(params):
+    buffer = io.BytesIO()
+    df.with_columns(pl.col("category_level_2").list.join(",")).write_csv(
+      buffer, include_header=header, datetime_format=ISO_DATETIME
+    )
+    header = False
+    yield buffer.getvalue()
+
+  if header:
+    yield ",".join(EXPORT_SCHEMA).encode() + b"\n"
+
+
+async def export_parquet(params: MessageQueryFilter) -> AsyncIterator[bytes]:
+  """One row group per batch, written out as soon as it is complete"""
+  sink = _ChunkSink()
+  schema = pl.DataFrame(schema=EXPORT_SCHEMA).to_arrow().schema
+  with pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd") as writer:
+    async for df in _batches(params):
+      writer.write_table(df.to_arrow())
+      yield sink.drain()
+  yield sink.drain()
+
+
+EXPORTERS = {
+  ExportFormatEnum.NDJSON: export_ndjson,
+  ExportFormatEnum.CSV: export_csv,
+  ExportFormatEnum.PARQUET: export_parquet,
+}
@@ -1,16 +1,32 @@
-from fastapi import APIRouter, Depends, status, HTTPException, Query
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Response
 from typing import List, Annotated
 from .responses import MessageResponse
-from .schemas import MessageCreate, MessageQueryFilter
+from .schemas import MessageCreate, MessageExportQuery, MessagePageQuery
 from .service import MessageService
+from .utils import NEXT_CURSOR_HEADER
 from src.database import get_db
 
 messages_router = APIRouter(prefix="/messages", tags=["messages"])
 
 
 @messages_router.get("/", response_model=List[MessageResponse])
-async def get_messages(params: Annotated[MessageQueryFilter, Query()], db=Depends(get_db)):
-  return await MessageService.get_messages(db, params)
+async def get_messages(
+  params: Annotated[MessagePageQuery, Query()], response: Response, db=Depends(get_db)
+):
+  """Messages newest first, a page at a time.
+
+  Unless this is the last page, the X-Next-Cursor header holds the cursor of the next one.
+  """
+  messages, next_cursor = await MessageService.get_messages(db, params)
+  if next_cursor:
+    response.headers[NEXT_CURSOR_HEADER] = next_cursor
+  return messages
+
+
+@messages_router.get("/export")
+def export_messages(params: Annotated[MessageExportQuery, Query()]):
+  """Stream every message matching the filter as NDJSON, CSV or Parquet"""
+  return MessageService.export_messages(params)
 
 
 @messages_router.get("/{id}", response_model=MessageResponse)
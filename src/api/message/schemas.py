@@ -1,12 +1,15 @@
+import re
 from pydantic import BaseModel, Field, field_validator
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 from src.schemas import (
+  ExportFormatEnum,
   EmotionEnum,
   SentimentEnum,
   CategoryLevel1Enum,
   CategoryLevel2Enum,
 )
+from src.schemas.content_hash import HEX_HASH_PATTERN
 
 
 def to_naive_utc(dt: datetime) -> datetime:
@@ -44,6 +47,18 @@ class MessageCreate(BaseModel):
     ..., description="Secondary category classifications"
   )
 
+  content_hash: Optional[str] = Field(
+    None, description="Hash of the original timestamp and text, used for deduplication"
+  )
+
+  @field_validator("content_hash")
+  @classmethod
+  def validate_content_hash(cls, v: Optional[str]) -> Optional[str]:
+    # Stored as a 16-byte digest tagged with the version its length implies
+    if v is not None and not re.fullmatch(HEX_HASH_PATTERN, v):
+      raise ValueError("content_hash must be a 32 or 64 character lowercase hex digest")
+    return v
+
   @field_validator("event_date", mode="before")
   @classmethod
   def normalize_event_date(cls, v):
@@ -101,3 +116,12 @@ class MessageQueryFilter(BaseModel):
   source: Optional[str] = Field(None, description="Source to filter by")
 
   search: Optional[str] = Field(None, description="Search string")
+
+
+class MessagePageQuery(MessageQueryFilter):
+  cursor: Optional[str] = Field(None, description="X-Next-Cursor header of the previous page")
+  limit: int = Field(100, ge=1, le=1000, description="Maximum number of messages in the page")
+
+
+class MessageExportQuery(MessageQueryFilter):
+  format: ExportFormatEnum = Field(ExportFormatEnum.NDJSON, description="Export file format")
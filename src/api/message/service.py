@@ -1,7 +1,13 @@
+from typing import List, Optional, Tuple
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncConnection
+from src.schemas import ExportFormatEnum
+from . import export
+from .exceptions import PARQUET_NOT_AVAILABLE
 from .responses import MessageResponse
-from src.database.repositories.message import MessageRepository
-from .schemas import MessageCreate, MessageQueryFilter
+from src.database.repositories.message import MessageRepository, BulkInsertResult
+from .schemas import MessageCreate, MessageExportQuery, MessagePageQuery
+from .utils import decode_cursor, encode_cursor
 
 
 class MessageService:
@@ -16,12 +22,38 @@ class MessageService:
     created_message = await MessageRepository(db).create_message(message_dict)
     return MessageResponse.model_validate(created_message)
 
+  @classmethod
+  async def create_messages(
+    cls, db: AsyncConnection, messages: list[MessageCreate]
+  ) -> BulkInsertResult:
+    messages_data = [message.model_dump() for message in messages]
+    return await MessageRepository(db).create_messages(messages_data)
+
   @classmethod
   async def get_messages(
-    self, db: AsyncConnection, params: MessageQueryFilter
-  ) -> list[MessageResponse]:
-    messages = await MessageRepository(db).get_messages(params)
-    return [MessageResponse.model_validate(msg) for msg in messages]
+    self, db: AsyncConnection, params: MessagePageQuery
+  ) -> Tuple[List[MessageResponse], Optional[str]]:
+    """A page of messages and the cursor of the next one, None on the last page"""
+    after = decode_cursor(params.cursor) if params.cursor else None
+    # One extra row tells whether there is a next page
+    messages = await MessageRepository(db).get_messages(params, params.limit + 1, after)
+    items = [MessageResponse.model_validate(msg) for msg in messages[: params.limit]]
+
+    next_cursor = None
+    if len(messages) > params.limit:
+      next_cursor = encode_cursor(items[-1].event_date, items[-1].id)
+    return items, next_cursor
+
+  @classmethod
+  def export_messages(cls, params: MessageExportQuery) -> StreamingResponse:
+    format = params.format
+    if format == ExportFormatEnum.PARQUET and export.pyarrow is None:
+      raise PARQUET_NOT_AVAILABLE
+    return StreamingResponse(
+      export.EXPORTERS[format](params),
+      media_type=export.MEDIA_TYPES[format],
+      headers={"Content-Disposition": f'attachment; filename="messages.{format.value}"'},
+    )
 
   @classmethod
   async def delete_message(self, db: AsyncConnection, id: str) -> None:
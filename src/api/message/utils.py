@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Tuple
+
+import base64
+import json
+
+from .exceptions import INVALID_CURSOR
+from .schemas import to_naive_utc
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(event_date: datetime, id: str) -> str:
+  """Opaque token for the (event_date, id) key of the last message of a page"""
+  data = json.dumps([event_date.isoformat(), id], separators=(",", ":")).encode()
+  return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+  try:
+    data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    event_date, id = json.loads(data)
+    return to_naive_utc(datetime.fromisoformat(event_date)), str(id)
+  except (ValueError, TypeError):
+    raise INVALID_CURSOR
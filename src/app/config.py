@@ -12,6 +12,10 @@ class Configs(BaseSettings):
   db_port: int
   db_name: SecretStr
 
+  db_pool_size: int = 5
+  db_max_overflow: int = 10
+  db_pool_timeout: float = 30
+
   def get_db_url(self):
     return (
       f"postgresql+asyncpg://{self.db_user.get_secret_value()}:{self.db_password.get_secret_value()}@"
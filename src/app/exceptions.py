@@ -17,9 +17,17 @@ def UNAUTHORIZED_EXCEPTION(detail: str) -> HTTPException:
   return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
 
 
+def NOT_FOUND_EXCEPTION(detail: str) -> HTTPException:
+  return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+
 def CONTENT_TOO_LARGE_EXCEPTION(detail: str) -> HTTPException:
   return HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=detail)
 
 
+def UNSUPPORTED_MEDIA_TYPE_EXCEPTION(detail: str) -> HTTPException:
+  return HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=detail)
+
+
 def RAISE_ERROR_EXCEPTION(detail: str) -> RuntimeError:
   return RuntimeError(detail)
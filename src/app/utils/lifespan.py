@@ -1,7 +1,10 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from src.services import kafka_service, kafka_settings
-import asyncio
+from src.services.dedup import dedup_index
+from src.services.file_upload.executor import shutdown_executor
+from src.services.file_upload.jobs import upload_queue
+from src.api.files.service import FilesService
 
 
 @asynccontextmanager
@@ -11,10 +14,15 @@ async def lifespan(app: FastAPI):
   await kafka_service.start_producer()
   await kafka_service.start_consumer([kafka_settings.topic_in])
 
-  asyncio.create_task(kafka_service.consume_and_save_messages())
+  dedup_index.start()
+  kafka_service.start_ingest()
+  upload_queue.start(FilesService.run_upload_job)
 
   print("Kafka connect succesfully")
 
   yield
 
+  await upload_queue.stop()
+  shutdown_executor()
   await kafka_service.close()
+  await dedup_index.stop()
@@ -1,4 +1,5 @@
 from .database import Base, get_db, configs
 from .models.message import Message
+from .models.upload_job import UploadJob
 
-__all__ = ["Base", "get_db", "configs", "Message"]
+__all__ = ["Base", "get_db", "configs", "Message", "UploadJob"]
@@ -7,7 +7,13 @@ class Base(DeclarativeBase):
   pass
 
 
-engine = create_async_engine(configs.get_db_url(), echo=False)
+engine = create_async_engine(
+  configs.get_db_url(),
+  echo=False,
+  pool_size=configs.db_pool_size,
+  max_overflow=configs.db_max_overflow,
+  pool_timeout=configs.db_pool_timeout,
+)
 
 AsyncSessionLocal = async_sessionmaker(
   bind=engine, autoflush=True, class_=AsyncSession, expire_on_commit=False
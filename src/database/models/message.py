@@ -1,7 +1,8 @@
-from sqlalchemy import String, DateTime, Float, Index, text as sql_text
+from sqlalchemy import String, DateTime, Float, Index, LargeBinary, SmallInteger, text as sql_text
 from sqlalchemy import Enum
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
 from src.database import Base
 import uuid
@@ -11,6 +12,7 @@ from src.schemas import (
   CategoryLevel1Enum,
   CategoryLevel2Enum,
 )
+from src.schemas.content_hash import DIGEST_SIZE, content_hash_digest
 
 
 sentiment_enum = Enum(SentimentEnum, name="sentiment_enum")
@@ -19,14 +21,27 @@ category_level_1_enum = Enum(CategoryLevel1Enum, name="category_level_1_enum")
 category_level_2_enum = Enum(CategoryLevel2Enum, name="category_level_2_enum")
 
 
+class ContentHash(TypeDecorator):
+  """Hex content hash in Python, its 16-byte digest in the database"""
+
+  impl = LargeBinary(DIGEST_SIZE)
+  cache_ok = True
+
+  def process_bind_param(self, value, dialect):
+    return None if value is None else content_hash_digest(value)
+
+  def process_result_value(self, value, dialect):
+    return None if value is None else value.hex()
+
+
 class Message(Base):
   __tablename__ = "messages"
 
   id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
   external_id: Mapped[str] = mapped_column(String, index=True)
 
-  created_at: Mapped[datetime] = mapped_column(DateTime)
-  event_date: Mapped[datetime] = mapped_column(DateTime, index=True)
+  created_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+  event_date: Mapped[datetime] = mapped_column(DateTime)
 
   source: Mapped[str] = mapped_column(String)
   user_id: Mapped[str] = mapped_column(String, index=True)
@@ -47,9 +62,12 @@ class Message(Base):
 
   category_level_2: Mapped[list[CategoryLevel2Enum]] = mapped_column(ARRAY(category_level_2_enum))
 
-  content_hash: Mapped[str] = mapped_column(String(64), index=True, nullable=True)
+  content_hash: Mapped[str] = mapped_column(ContentHash, index=True, unique=True, nullable=True)
+  hash_version: Mapped[int] = mapped_column(SmallInteger, nullable=True)
 
   __table_args__ = (
+    # Keyset pagination order; also the index for event_date ranges
+    Index("ix_messages_event_date_id", event_date, id),
     Index("ix_messages_cat_level_2", category_level_2, postgresql_using="gin"),
     Index(
       "ix_messages_content_search",
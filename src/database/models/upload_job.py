@@ -0,0 +1,37 @@
+from sqlalchemy import BigInteger, String, DateTime, Integer, text as sql_text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Optional
+from src.database import Base
+import uuid
+
+
+class UploadJob(Base):
+  __tablename__ = "upload_jobs"
+
+  id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: uuid.uuid4().hex)
+  filename: Mapped[str] = mapped_column(String)
+  file_path: Mapped[str] = mapped_column(String)
+  staged_path: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+  estimated_memory_bytes: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+
+  status: Mapped[str] = mapped_column(String, index=True, default="queued")
+  worker_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+  heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+  next_offset: Mapped[int] = mapped_column(Integer, default=0, server_default=sql_text("0"))
+  total_rows: Mapped[int] = mapped_column(Integer, default=0, server_default=sql_text("0"))
+  invalid_rows: Mapped[int] = mapped_column(Integer, default=0, server_default=sql_text("0"))
+  duplicate_rows: Mapped[int] = mapped_column(Integer, default=0, server_default=sql_text("0"))
+  sent_rows: Mapped[int] = mapped_column(Integer, default=0, server_default=sql_text("0"))
+  failed_rows: Mapped[int] = mapped_column(Integer, default=0, server_default=sql_text("0"))
+
+  errors: Mapped[list[str]] = mapped_column(
+    ARRAY(String), default=list, server_default=sql_text("'{}'")
+  )
+  error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+  created_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+  started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+  finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -1,9 +1,10 @@
 from src.database.models.message import Message
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, func, between, case
+from sqlalchemy import select, delete, func, between, case, tuple_
+from sqlalchemy.dialects.postgresql import insert
 import sqlalchemy
 from src.schemas.order_enum import OrderEnum
-from src.schemas import SentimentEnum, EmotionEnum
+from src.schemas import SentimentEnum, EmotionEnum, content_hash_digest, content_hash_version
 from src.api.message.schemas import MessageQueryFilter
 from src.api.dashboard.schemas import (
   EmotionsAggregationQeury,
@@ -13,8 +14,20 @@ from src.api.dashboard.schemas import (
   EmotionDynamicsQuery
 )
 from datetime import datetime
+from typing import NamedTuple
 import logging
 
+
+class BulkInsertResult(NamedTuple):
+  inserted: int
+  skipped: int
+
+
+def set_hash_version(message_data: dict) -> None:
+  content_hash = message_data.get("content_hash")
+  message_data["hash_version"] = content_hash_version(content_hash) if content_hash else None
+
+
 class MessageRepository:
   def __init__(self, db: AsyncSession):
     self.db = db
@@ -23,23 +36,59 @@ class MessageRepository:
     """Create a new message in the database"""
     if "created_at" not in message_data or message_data["created_at"] is None:
       message_data["created_at"] = datetime.utcnow()
+    set_hash_version(message_data)
     message = Message(**message_data)
     self.db.add(message)
     await self.db.commit()
     return message
 
+  async def create_messages(self, messages_data: list[dict]) -> BulkInsertResult:
+    """Insert a batch of messages in one multi-row INSERT, skipping already stored content hashes"""
+    if not messages_data:
+      return BulkInsertResult(inserted=0, skipped=0)
+
+    created_at = datetime.utcnow()
+    for message_data in messages_data:
+      if message_data.get("created_at") is None:
+        message_data["created_at"] = created_at
+      set_hash_version(message_data)
+
+    query = (
+      insert(Message)
+      .on_conflict_do_nothing(index_elements=[Message.content_hash])
+      .returning(Message.id)
+    )
+    result = await self.db.execute(query, messages_data)
+    inserted = len(result.scalars().all())
+    await self.db.commit()
+    return BulkInsertResult(inserted=inserted, skipped=len(messages_data) - inserted)
+
   async def get_message(self, message_id: str) -> Message | None:
     """Get a message by ID"""
     result = await self.db.execute(select(Message.__table__.columns).where(Message.id == message_id))
     return result.scalar_one_or_none()
 
-  async def get_messages(self, params: MessageQueryFilter) -> list[Message]:
-    """Get messages with pagination"""
+  async def get_messages(
+    self, params: MessageQueryFilter, limit: int, after: tuple[datetime, str] | None = None
+  ) -> list[Message]:
+    """Get a page of messages, newest first, continuing after the (event_date, id) key.
+
+    The row comparison and ORDER BY match ix_messages_event_date_id, so each page is one
+    backward range scan of the index however deep it is.
+    """
+    query = self._filter_messages(select(Message.__table__.columns), params)
+    if after is not None:
+      query = query.filter(tuple_(Message.event_date, Message.id) < tuple_(*after))
+    query = query.order_by(Message.event_date.desc(), Message.id.desc()).limit(limit)
+
+    result = await self.db.execute(query)
+
+    return result.mappings().all()
+
+  def _filter_messages(self, query, params: MessageQueryFilter):
+    """Apply the MessageQueryFilter conditions to a query over messages"""
+    query = query.filter(between(Message.event_date, params.start_date, params.end_date))
 
-    query = select(Message.__table__.columns).filter(
-      between(Message.event_date, params.start_date, params.end_date)
-    )
-    
     logging.info(f"Category level 2 {params.category_level_2}")
 
     if params.category_level_1 is not None:
@@ -58,9 +107,7 @@ class MessageRepository:
     if params.sentiment_label is not None:
       query = query.filter(Message.sentiment_label.in_(params.sentiment_label))
 
-    result = await self.db.execute(query)
-
-    return result.mappings().all()
+    return query
 
   async def get_aggregated_messages_by_emotion(self, params: EmotionsAggregationQeury):
     """Get count of messages grouped by emotion for a given period"""
@@ -177,7 +224,32 @@ class MessageRepository:
     
     query = select(Message.content_hash).where(Message.content_hash.in_(hashes))
     result = await self.db.execute(query)
-    return set(result.scalars().all())
+    # Stored hashes come back as their 16-byte digest in hex, a version 1 hash is longer
+    stored = set(result.scalars().all())
+    return {
+      content_hash for content_hash in hashes if content_hash_digest(content_hash).hex() in stored
+    }
+
+  async def stream_content_hashes(self, since: datetime | None = None, batch_size: int = 50000):
+    """Yield the content hashes of messages created since the given time, batch_size at a time"""
+    query = select(Message.content_hash).where(Message.content_hash.is_not(None))
+    if since is not None:
+      query = query.where(Message.created_at >= since)
+
+    result = await self.db.stream(query.execution_options(yield_per=batch_size))
+    async for hashes in result.scalars().partitions():
+      yield hashes
+
+  async def stream_messages(self, params: MessageQueryFilter, columns: list, batch_size: int = 5000):
+    """Yield the given columns of the filtered messages, batch_size rows at a time.
+
+    Rows come from a server-side cursor, unordered, so the first batch is ready as soon as the
+    scan finds it and memory stays bounded by one batch.
+    """
+    query = self._filter_messages(select(*columns), params)
+    result = await self.db.stream(query.execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+      yield rows
 
   async def get_emotion_dynamics(self, params: EmotionDynamicsQuery):
     """Get aggregated emotion data grouped by time intervals"""
@@ -0,0 +1,93 @@
+from src.database.models.upload_job import UploadJob
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, or_, and_
+from datetime import datetime
+from typing import Optional
+
+
+class UploadJobRepository:
+  def __init__(self, db: AsyncSession):
+    self.db = db
+
+  async def create_job(self, filename: str, file_path: str, estimated_memory_bytes: int) -> UploadJob:
+    job = UploadJob(
+      filename=filename,
+      file_path=file_path,
+      estimated_memory_bytes=estimated_memory_bytes,
+      status="queued",
+      created_at=datetime.utcnow(),
+    )
+    self.db.add(job)
+    await self.db.commit()
+    return job
+
+  async def get_job(self, job_id: str) -> UploadJob | None:
+    return await self.db.get(UploadJob, job_id)
+
+  async def get_claimable_job_ids(self, stale_before: datetime) -> list[str]:
+    """Queued jobs plus processing jobs whose worker stopped sending heartbeats, oldest first"""
+    query = (
+      select(UploadJob.id)
+      .where(self._claimable(stale_before))
+      .order_by(UploadJob.created_at)
+    )
+    result = await self.db.execute(query)
+    return list(result.scalars().all())
+
+  async def claim_job(
+    self, job_id: str, worker_id: str, stale_before: datetime
+  ) -> Optional[UploadJob]:
+    """Take ownership of a job unless another live worker holds it"""
+    now = datetime.utcnow()
+    query = (
+      update(UploadJob)
+      .where(UploadJob.id == job_id, self._claimable(stale_before))
+      .values(status="processing", worker_id=worker_id, heartbeat_at=now)
+      .returning(UploadJob.id)
+    )
+    result = await self.db.execute(query)
+    claimed = result.scalar_one_or_none()
+    await self.db.commit()
+    if claimed is None:
+      return None
+
+    job = await self.db.get(UploadJob, job_id, populate_existing=True)
+    if job.started_at is None:
+      job.started_at = now
+      await self.db.commit()
+    return job
+
+  async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+    """Refresh the heartbeat of a job this worker holds; False once the claim is lost"""
+    query = (
+      update(UploadJob)
+      .where(
+        UploadJob.id == job_id,
+        UploadJob.worker_id == worker_id,
+        UploadJob.status == "processing",
+      )
+      .values(heartbeat_at=datetime.utcnow())
+      .returning(UploadJob.id)
+    )
+    result = await self.db.execute(query)
+    held = result.scalar_one_or_none() is not None
+    await self.db.commit()
+    return held
+
+  async def save_progress(self, job: UploadJob) -> None:
+    job.heartbeat_at = datetime.utcnow()
+    await self.db.commit()
+
+  async def finish_job(self, job: UploadJob, error: Optional[str] = None) -> None:
+    job.status = "failed" if error else "completed"
+    job.error = error
+    job.finished_at = datetime.utcnow()
+    job.worker_id = None
+    await self.db.commit()
+
+  @staticmethod
+  def _claimable(stale_before: datetime):
+    return or_(
+      UploadJob.status == "queued",
+      and_(UploadJob.status == "processing", UploadJob.heartbeat_at < stale_before),
+    )
@@ -3,7 +3,15 @@ from .sentiment_enum import SentimentEnum, SENTIMENT_TRANSLATIONS
 from .category_level_1_enum import CategoryLevel1Enum, CATEGORY_LEVEL_1_TRANSLATIONS
 from .category_level_2_enum import CategoryLevel2Enum, CATEGORY_LEVEL_2_TRANSLATIONS
 from .granularity_enum import GranularityEnum
+from .export_format_enum import ExportFormatEnum
 from .message import MessageSchema
+from .content_hash import (
+  HASH_VERSION,
+  compute_content_hash,
+  content_hash_digest,
+  content_hash_key,
+  content_hash_version,
+)
 
 __all__ = [
   "EmotionEnum",
@@ -15,5 +23,11 @@ __all__ = [
   "CategoryLevel2Enum",
   "CATEGORY_LEVEL_2_TRANSLATIONS",
   "GranularityEnum",
+  "ExportFormatEnum",
   "MessageSchema",
+  "HASH_VERSION",
+  "compute_content_hash",
+  "content_hash_digest",
+  "content_hash_key",
+  "content_hash_version",
 ]
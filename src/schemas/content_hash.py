@@ -0,0 +1,46 @@
+"""Versioned content_hash scheme.
+
+Both versions hash "{timestamp}_{text lowercased}" and travel as hex strings. In the database
+every hash is kept as a 16-byte digest next to the version that produced it:
+
+1: SHA-256, 64 hex chars; stored as its first 16 bytes.
+2: XXH3-128, 32 hex chars; stored whole. Several times faster than SHA-256, and dedup does
+   not need a cryptographic hash.
+
+The two are not comparable: a row stored under version 1 is not matched by the version 2 hash
+of the same content. Until every stored row has been re-hashed, the upload and bulk import
+paths therefore also look up the version 1 digest of each new row before treating it as new.
+"""
+from hashlib import sha256
+
+from xxhash import xxh3_128_hexdigest
+
+LEGACY_HASH_VERSION = 1
+HASH_VERSION = 2
+DIGEST_SIZE = 16
+# A hex content hash of either version, as clients must send it
+HEX_HASH_PATTERN = r"^(?:[0-9a-f]{32}|[0-9a-f]{64})$"
+
+
+def content_hash_key(timestamp: str, text: str) -> str:
+  return f"{timestamp}_{text.lower()}"
+
+
+# Hex digest of a UTF-8 encoded key, by version
+HEXDIGESTS = {
+  LEGACY_HASH_VERSION: lambda key: sha256(key).hexdigest(),
+  HASH_VERSION: xxh3_128_hexdigest,
+}
+
+
+def compute_content_hash(key: str, version: int = HASH_VERSION) -> str:
+  return HEXDIGESTS[version](key.encode())
+
+
+def content_hash_version(content_hash: str) -> int:
+  return LEGACY_HASH_VERSION if len(content_hash) == 64 else HASH_VERSION
+
+
+def content_hash_digest(content_hash: str) -> bytes:
+  """The stored form of a hex content hash of either version"""
+  return bytes.fromhex(content_hash[: DIGEST_SIZE * 2])
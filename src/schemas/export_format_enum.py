@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class ExportFormatEnum(str, Enum):
+  NDJSON = "ndjson"
+  CSV = "csv"
+  PARQUET = "parquet"
@@ -1,5 +1,5 @@
-from .file_upload.service import process_file, validate_file_structure
+from .file_upload.service import stage_file, validate_file_sample
 from .kafka.config import kafka_settings
 from .kafka.service import kafka_service
 
-__all__ = ["process_file", "validate_file_structure", "kafka_settings", "kafka_service"]
+__all__ = ["stage_file", "validate_file_sample", "kafka_settings", "kafka_service"]
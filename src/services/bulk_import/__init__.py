@@ -0,0 +1,3 @@
+from .service import BulkImportResult, import_file
+
+__all__ = ["BulkImportResult", "import_file"]
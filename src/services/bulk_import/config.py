@@ -0,0 +1,22 @@
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class BulkImportSettings(BaseSettings):
+  # The admin endpoint only imports files from under this directory
+  bulk_import_dir: str = "imports"
+  bulk_import_batch_rows: int = 100000
+  bulk_import_max_reported_errors: int = 100
+  bulk_import_progress_seconds: int = 5
+
+  # .gz / .zst files are decompressed to a temporary file first, in bulk_import_temp_dir or
+  # the system default. Backfills are far larger than uploads, hence limits of their own.
+  bulk_import_max_decompressed_bytes: int = 549755813888  # 512GB
+  bulk_import_max_compression_ratio: int = 1000
+  bulk_import_temp_dir: Optional[str] = None
+
+  model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+bulk_import_settings = BulkImportSettings()
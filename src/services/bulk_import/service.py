@@ -0,0 +1,168 @@
+"""Bulk import of already classified messages straight into the messages table.
+
+Each slice of the file is validated column-wise, written as CSV and loaded with COPY into a
+temporary staging table, then moved into messages by one INSERT ... SELECT that anti-joins on
+content_hash. Reading and validating the next slice runs in a thread while the current one is
+in the database. Neither Kafka nor the dedup index is involved: the index picks the new rows up
+on its next refresh.
+"""
+import asyncio
+import io
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+import polars as pl
+
+from src.database.database import engine
+from src.database.models.message import Message
+from src.services.bulk_import.config import bulk_import_settings
+from src.services.bulk_import.validation import (
+  STAGED_FIELDS,
+  ImportBatch,
+  missing_fields,
+  prepare_import_batch,
+)
+from src.services.file_upload.service import CompressedProcessor, FileProcessorFactory
+
+STAGING_TABLE = "bulk_import_staging"
+
+_STAGING_TYPES = {
+  "event_date": "timestamp",
+  "lang_score": "double precision",
+  "sentiment_score": "double precision",
+  "emotion_score": "double precision",
+  "content_hash": "bytea",
+  "hash_version": "smallint",
+}
+_ENUM_COLUMNS = ("sentiment_label", "emotion_label", "category_level_1")
+
+
+class BulkImportResult(NamedTuple):
+  rows: int
+  inserted: int
+  skipped: int
+  rejected: int
+  errors: List[str]
+  seconds: float
+
+  @property
+  def rows_per_second(self) -> float:
+    return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _create_staging_sql() -> str:
+  columns = ", ".join(f"{field} {_STAGING_TYPES.get(field, 'text')}" for field in STAGED_FIELDS)
+  return (
+    f"CREATE TEMPORARY TABLE {STAGING_TABLE} ({columns}, legacy_hash bytea) ON COMMIT DELETE ROWS"
+  )
+
+
+def _insert_sql() -> str:
+  table = Message.__table__
+  values = [
+    f"s.{field}::{table.c[field].type.name}" if field in _ENUM_COLUMNS else f"s.{field}"
+    for field in STAGED_FIELDS
+  ]
+  values[STAGED_FIELDS.index("category_level_2")] = (
+    f"s.category_level_2::{table.c.category_level_2.type.item_type.name}[]"
+  )
+  return (
+    f"INSERT INTO {table.name} (id, created_at, {', '.join(STAGED_FIELDS)}) "
+    f"SELECT gen_random_uuid()::text, now() AT TIME ZONE 'utc', {', '.join(values)} "
+    f"FROM {STAGING_TABLE} s "
+    f"WHERE NOT EXISTS (SELECT 1 FROM {table.name} m WHERE m.content_hash = s.content_hash) "
+    # Rows stored before version 2 hashes only match the version 1 hash of the same content
+    f"AND (s.legacy_hash IS NULL OR NOT EXISTS "
+    f"(SELECT 1 FROM {table.name} m WHERE m.content_hash = s.legacy_hash)) "
+    "ON CONFLICT (content_hash) DO NOTHING"
+  )
+
+
+def _next_batch(
+  batches: Iterator[pl.DataFrame], row_offset: int, max_errors: int
+) -> Optional[ImportBatch]:
+  df = next(batches, None)
+  if df is None:
+    return None
+  missing = missing_fields(df.columns)
+  if missing:
+    raise ValueError(f"Missing columns: {', '.join(missing)}")
+  return prepare_import_batch(df, row_offset, max_errors, legacy_hashes=True)
+
+
+async def import_file(
+  path: Path, on_progress: Optional[Callable[[BulkImportResult], None]] = None
+) -> BulkImportResult:
+  """Import a CSV, NDJSON or Parquet file (optionally .gz / .zst) of MessageCreate records.
+
+  Rows already stored, by content_hash, are skipped; invalid rows are counted and reported.
+  Each slice is committed on its own, so an interrupted import can simply be run again.
+  """
+  settings = bulk_import_settings
+  processor = FileProcessorFactory.create(Path(path))
+  if isinstance(processor, CompressedProcessor):
+    processor.set_limits(
+      settings.bulk_import_max_decompressed_bytes,
+      settings.bulk_import_max_compression_ratio,
+      settings.bulk_import_temp_dir or tempfile.gettempdir(),
+    )
+  batches = processor.iter_batches(settings.bulk_import_batch_rows)
+
+  started = time.monotonic()
+  reported = started
+  rows = inserted = rejected = 0
+  errors: List[str] = []
+
+  def result() -> BulkImportResult:
+    return BulkImportResult(
+      rows=rows,
+      inserted=inserted,
+      skipped=rows - rejected - inserted,
+      rejected=rejected,
+      errors=errors,
+      seconds=time.monotonic() - started,
+    )
+
+  def prepare() -> asyncio.Task:
+    max_errors = settings.bulk_import_max_reported_errors - len(errors)
+    return asyncio.create_task(asyncio.to_thread(_next_batch, batches, rows, max_errors))
+
+  async with engine.connect() as conn:
+    raw = await conn.get_raw_connection()
+    pg = raw.driver_connection
+    await pg.execute(_create_staging_sql())
+    insert_sql = _insert_sql()
+
+    pending = prepare()
+    try:
+      while (batch := await pending) is not None:
+        rows += batch.rows
+        rejected += batch.rejected
+        errors.extend(batch.errors)
+        pending = prepare()
+
+        async with pg.transaction():
+          await pg.copy_to_table(
+            STAGING_TABLE,
+            source=io.BytesIO(batch.csv),
+            columns=[*STAGED_FIELDS, "legacy_hash"],
+            format="csv",
+            # Every value is quoted, so an empty legacy_hash would otherwise be an empty bytea
+            force_null=["legacy_hash"],
+          )
+          status = await pg.execute(insert_sql)
+        inserted += int(status.split()[-1])
+
+        if on_progress and time.monotonic() - reported >= settings.bulk_import_progress_seconds:
+          reported = time.monotonic()
+          on_progress(result())
+    finally:
+      # Let a read in progress finish, so the reader can be closed and its temporary copy of a
+      # compressed file removed
+      await asyncio.gather(pending, return_exceptions=True)
+      batches.close()
+      await pg.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+
+  return result()
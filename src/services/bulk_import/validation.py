@@ -0,0 +1,208 @@
+"""Columnar equivalent of MessageCreate validation for bulk imports.
+
+prepare_import_batch turns a slice of an import file into the staging table's columns in the
+text form COPY ... (FORMAT csv) reads: enums as their database labels, category_level_2 as an
+array literal and content_hash as a bytea hex literal. Rows without a content_hash get the
+current-version hash of their event_date and text, as the upload pipeline computes it, and
+optionally its version 1 counterpart as legacy_hash.
+"""
+import io
+from enum import Enum
+from typing import List, NamedTuple, Sequence, Type
+
+import polars as pl
+
+from src.schemas import CategoryLevel1Enum, CategoryLevel2Enum, EmotionEnum, SentimentEnum
+from src.schemas.content_hash import (
+  DIGEST_SIZE,
+  HASH_VERSION,
+  HEX_HASH_PATTERN,
+  LEGACY_HASH_VERSION,
+)
+from src.services.file_upload.validation import content_hashes, isoformat
+
+STRING_FIELDS = ("external_id", "source", "user_id", "text", "cleaned_text", "lang_code")
+SCORE_FIELDS = ("lang_score", "sentiment_score", "emotion_score")
+ENUM_FIELDS = {
+  "sentiment_label": SentimentEnum,
+  "emotion_label": EmotionEnum,
+  "category_level_1": CategoryLevel1Enum,
+}
+REQUIRED_FIELDS = (
+  *STRING_FIELDS, "event_date", *SCORE_FIELDS, *ENUM_FIELDS, "category_level_2"
+)
+# Column order of the staging table and of the CSV written for it
+STAGED_FIELDS = (*REQUIRED_FIELDS, "content_hash", "hash_version")
+
+_EVENT_DATE_FORMATS = (
+  ("%Y-%m-%dT%H:%M:%S%.f%#z", True),
+  ("%Y-%m-%d %H:%M:%S%.f%#z", True),
+  ("%Y-%m-%dT%H:%M:%S%.f", False),
+  ("%Y-%m-%d %H:%M:%S%.f", False),
+  ("%Y-%m-%d", False),
+)
+
+
+class ImportBatch(NamedTuple):
+  rows: int
+  rejected: int
+  errors: List[str]
+  csv: bytes
+
+
+def missing_fields(columns: List[str]) -> List[str]:
+  return [field for field in REQUIRED_FIELDS if field not in columns]
+
+
+def _labels(enum: Type[Enum]) -> dict:
+  """Enum values as sent by clients to the labels of the database enum, its member names"""
+  return {member.value: member.name for member in enum}
+
+
+def _as_string(column: pl.Series) -> pl.Series:
+  if column.dtype == pl.String:
+    return column
+  if column.dtype.is_nested():
+    return pl.Series(column.name, [None] * len(column), dtype=pl.String)
+  return column.cast(pl.String)
+
+
+def _event_date(column: pl.Series) -> pl.Series:
+  """Naive UTC datetimes, as MessageCreate.normalize_event_date produces"""
+  if isinstance(column.dtype, pl.Datetime):
+    if column.dtype.time_zone:
+      column = column.dt.convert_time_zone("UTC").dt.replace_time_zone(None)
+    return column.dt.cast_time_unit("us")
+  if column.dtype == pl.Date:
+    return column.cast(pl.Datetime("us"))
+  if column.dtype != pl.String:
+    return pl.Series(column.name, [None] * len(column), dtype=pl.Datetime("us"))
+
+  value = pl.col(column.name)
+  parsed = [
+    value.str.to_datetime(fmt, time_zone="UTC", strict=False) if aware
+    else value.str.to_datetime(fmt, time_unit="us", strict=False).dt.replace_time_zone("UTC")
+    for fmt, aware in _EVENT_DATE_FORMATS
+  ]
+  return column.to_frame().select(
+    pl.coalesce(parsed).dt.replace_time_zone(None).dt.cast_time_unit("us")
+  ).to_series()
+
+
+def _category_level_2(column: pl.Series) -> pl.Series:
+  """Database array literal of the labels, null unless every item is a known category"""
+  if column.dtype == pl.String:
+    # CSV cells: "a,b", "[a, b]", '["a", "b"]' or a Postgres "{a,b}"
+    column = (
+      column.str.replace_all(r"[\[\]{}\"' ]", "")
+      .str.split(",")
+      .list.eval(pl.element().filter(pl.element() != ""))
+    )
+  elif not isinstance(column.dtype, pl.List) or column.dtype.inner not in (pl.String, pl.Null):
+    return pl.Series(column.name, [None] * len(column), dtype=pl.String)
+
+  labels = column.list.eval(
+    pl.element().cast(pl.String).str.to_lowercase()
+    .replace_strict(_labels(CategoryLevel2Enum), default=None)
+  )
+  complete = labels.list.eval(pl.element().is_null().any()).list.first().not_()
+  return pl.select(
+    pl.when(complete | (labels.list.len() == 0))
+    .then(pl.concat_str(pl.lit("{"), labels.list.join(","), pl.lit("}")))
+  ).to_series()
+
+
+def _bytea(content_hash: pl.Expr) -> pl.Expr:
+  """bytea hex literal of the stored digest of a hex content hash"""
+  return pl.concat_str(pl.lit("\\x"), content_hash.str.slice(0, DIGEST_SIZE * 2))
+
+
+def prepare_import_batch(
+  df: pl.DataFrame,
+  row_offset: int = 0,
+  max_errors: int = 0,
+  extra: Sequence[pl.Series] = (),
+  legacy_hashes: bool = False,
+) -> ImportBatch:
+  """Staging rows of the valid records, the number of invalid ones and up to max_errors reports.
+
+  With legacy_hashes a legacy_hash column follows STAGED_FIELDS: the version 1 digest of rows
+  whose content_hash is computed here, empty for rows that brought their own. extra columns,
+  one value per row of df, are written last as they are.
+  """
+  columns = {}
+  errors = {}
+  for field in STRING_FIELDS:
+    columns[field] = _as_string(df[field])
+    errors[field] = columns[field].is_null()
+  for field in SCORE_FIELDS:
+    columns[field] = df[field].cast(pl.Float64, strict=False)
+    errors[field] = ~columns[field].is_between(0.0, 1.0).fill_null(False)
+  for field, enum in ENUM_FIELDS.items():
+    columns[field] = _as_string(df[field]).str.to_lowercase().replace_strict(
+      _labels(enum), default=None, return_dtype=pl.String
+    )
+    errors[field] = columns[field].is_null()
+  columns["event_date"] = _event_date(df["event_date"])
+  errors["event_date"] = columns["event_date"].is_null()
+  columns["category_level_2"] = _category_level_2(df["category_level_2"])
+  errors["category_level_2"] = columns["category_level_2"].is_null()
+
+  given = (
+    _as_string(df["content_hash"]).str.to_lowercase() if "content_hash" in df.columns
+    else pl.Series([None] * df.height, dtype=pl.String)
+  )
+  errors["content_hash"] = (
+    given.is_not_null() & ~given.str.contains(HEX_HASH_PATTERN).fill_null(False)
+  )
+
+  checked = pl.DataFrame(columns).with_columns(
+    *extra,
+    pl.Series("content_hash", given),
+    pl.Series("error", pl.select(
+      pl.coalesce(pl.when(error).then(pl.lit(field)) for field, error in errors.items())
+    ).to_series()),
+    # The hash is built from event_date as it appears in the file
+    pl.Series("timestamp", df["event_date"] if df["event_date"].dtype == pl.String
+              else isoformat(columns["event_date"])),
+  ).with_row_index("row", offset=row_offset + 1)
+
+  failed = checked.filter(pl.col("error").is_not_null())
+  reports = [
+    f"Row {row}: invalid or missing {field}"
+    for row, field in failed.head(max_errors).select("row", "error").iter_rows()
+  ]
+  valid = checked.filter(pl.col("error").is_null())
+
+  missing = valid["content_hash"].is_null()
+  legacy = pl.Series("legacy_hash", [None] * valid.height, dtype=pl.String)
+  if missing.any():
+    timestamps, texts = valid["timestamp"].filter(missing), valid["text"].filter(missing)
+    valid = valid.with_columns(
+      pl.Series(
+        "content_hash",
+        valid["content_hash"].scatter(missing.arg_true(), content_hashes(timestamps, texts)),
+      )
+    )
+    if legacy_hashes:
+      legacy = legacy.scatter(
+        missing.arg_true(), content_hashes(timestamps, texts, LEGACY_HASH_VERSION)
+      )
+
+  staged = valid.with_columns(
+    pl.when(pl.col("content_hash").str.len_chars() == 64)
+    .then(pl.lit(LEGACY_HASH_VERSION)).otherwise(pl.lit(HASH_VERSION))
+    .alias("hash_version"),
+    _bytea(pl.col("content_hash")).alias("content_hash"),
+    _bytea(pl.lit(legacy)).alias("legacy_hash"),
+  ).select(
+    *STAGED_FIELDS,
+    *(["legacy_hash"] if legacy_hashes else []),
+    *(column.name for column in extra),
+  )
+
+  buffer = io.BytesIO()
+  staged.write_csv(
+    buffer, include_header=False, quote_style="always", datetime_format="%Y-%m-%d %H:%M:%S%.6f"
+  )
+  return ImportBatch(df.height, failed.height, reports, buffer.getvalue())
@@ -0,0 +1,3 @@
+from .index import dedup_index
+
+__all__ = ["dedup_index"]
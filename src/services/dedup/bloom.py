@@ -0,0 +1,201 @@
+import json
+import math
+import struct
+from typing import BinaryIO, Iterable, Optional, Self
+
+import numpy as np
+
+SNAPSHOT_MAGIC = b"BLOOM002"
+
+
+def key_hash(key: bytes) -> tuple[int, int]:
+  """The two 64-bit halves of a 16-byte digest, the second forced odd"""
+  return int.from_bytes(key[:8], "little"), int.from_bytes(key[8:16], "little") | 1
+
+
+def keys_hash(keys: bytes) -> tuple[np.ndarray, np.ndarray]:
+  """key_hash of every 16-byte digest in a concatenation of them, as two uint64 arrays"""
+  words = np.frombuffer(keys, dtype="<u8").reshape(-1, 2)
+  return words[:, 0], words[:, 1] | np.uint64(1)
+
+
+class BloomFilter:
+  """Fixed-size Bloom filter over 16-byte content hash digests.
+
+  The digests are already uniformly distributed, so the bit positions are derived from the key
+  itself by double hashing instead of hashing it again.
+  """
+
+  def __init__(
+    self: Self, capacity: int, error_rate: float, bits: Optional[bytearray] = None, count: int = 0
+  ):
+    self.capacity = capacity
+    self.error_rate = error_rate
+    self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+    self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+    self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+    self.count = count
+
+  def _positions(self: Self, hashed: tuple[int, int]) -> range:
+    h1, h2 = hashed
+    start = h1 % self.size
+    return range(start, start + self.hashes * h2, h2)
+
+  def add_hashed(self: Self, hashed: tuple[int, int]) -> bool:
+    """Set the key's bits; returns False if they were all set already"""
+    bits, size = self.bits, self.size
+    added = False
+    for position in self._positions(hashed):
+      position %= size
+      byte, mask = position >> 3, 1 << (position & 7)
+      if not bits[byte] & mask:
+        bits[byte] |= mask
+        added = True
+    if added:
+      self.count += 1
+    return added
+
+  def contains_hashed(self: Self, hashed: tuple[int, int]) -> bool:
+    bits, size = self.bits, self.size
+    for position in self._positions(hashed):
+      position %= size
+      if not bits[position >> 3] & (1 << (position & 7)):
+        return False
+    return True
+
+  def _positions_many(self: Self, h1: np.ndarray, h2: np.ndarray) -> np.ndarray:
+    """Bit positions of many keys, (keys, hashes), the same as _positions gives one by one.
+
+    (h1 + i * h2) % size is taken as (h1 % size + i * (h2 % size)) % size, which stays well
+    inside uint64.
+    """
+    size = np.uint64(self.size)
+    steps = np.arange(self.hashes, dtype=np.uint64)
+    return ((h1 % size)[:, None] + steps[None, :] * (h2 % size)[:, None]) % size
+
+  def contains_many(self: Self, h1: np.ndarray, h2: np.ndarray) -> np.ndarray:
+    positions = self._positions_many(h1, h2)
+    bytes_ = np.frombuffer(self.bits, dtype=np.uint8)[positions >> np.uint64(3)]
+    masks = np.left_shift(np.uint8(1), (positions & np.uint64(7)).astype(np.uint8))
+    return (bytes_ & masks).all(axis=1)
+
+  def add_many(self: Self, h1: np.ndarray, h2: np.ndarray) -> None:
+    """Set the bits of keys known to be new and distinct, counting each of them"""
+    positions = self._positions_many(h1, h2).ravel()
+    bits = np.frombuffer(self.bits, dtype=np.uint8)
+    offsets = (positions & np.uint64(7)).astype(np.uint8)
+    # One pass per bit of the byte: positions sharing a byte then write the same value, where a
+    # single fancy-indexed |= would keep only one of their bits
+    for bit in range(8):
+      selected = positions[offsets == bit] >> np.uint64(3)
+      bits[selected] |= np.uint8(1 << bit)
+    self.count += len(h1)
+
+
+class ScalableBloomFilter:
+  """Chain of Bloom filters that grows as items are added.
+
+  Each new stage doubles the capacity and halves the error rate, so the overall false
+  positive rate stays below twice the configured one however large the table gets.
+  """
+
+  def __init__(
+    self: Self, capacity: int, error_rate: float, stages: Optional[list[BloomFilter]] = None
+  ):
+    self.capacity = capacity
+    self.error_rate = error_rate
+    self.stages = stages or [BloomFilter(capacity, error_rate / 2)]
+
+  @property
+  def count(self: Self) -> int:
+    return sum(stage.count for stage in self.stages)
+
+  @property
+  def nbytes(self: Self) -> int:
+    return sum(len(stage.bits) for stage in self.stages)
+
+  def _contains_hashed(self: Self, hashed: tuple[int, int]) -> bool:
+    for stage in reversed(self.stages):
+      if stage.contains_hashed(hashed):
+        return True
+    return False
+
+  def __contains__(self: Self, key: bytes) -> bool:
+    return self._contains_hashed(key_hash(key))
+
+  def add(self: Self, key: bytes) -> None:
+    hashed = key_hash(key)
+    if self._contains_hashed(hashed):
+      return
+    stage = self.stages[-1]
+    if stage.count >= stage.capacity:
+      stage = BloomFilter(stage.capacity * 2, stage.error_rate / 2)
+      self.stages.append(stage)
+    stage.add_hashed(hashed)
+
+  def update(self: Self, keys: Iterable[bytes]) -> None:
+    """Add many keys at once with array operations, setting the same bits as add does.
+
+    Unlike adding them one by one, a key that only looks present because of keys earlier in
+    the same batch is still counted, so a stage may fill marginally sooner.
+    """
+    h1, h2 = keys_hash(b"".join(keys))
+    if not len(h1):
+      return
+    # Keys repeated within the batch are added once
+    order = np.argsort(h1, kind="stable")
+    repeated = (h1[order][1:] == h1[order][:-1]) & (h2[order][1:] == h2[order][:-1])
+    first = np.sort(order[np.concatenate(([True], ~repeated))])
+    h1, h2 = h1[first], h2[first]
+
+    new = np.ones(len(h1), dtype=bool)
+    for stage in self.stages:
+      new &= ~stage.contains_many(h1, h2)
+    h1, h2 = h1[new], h2[new]
+
+    while len(h1):
+      stage = self.stages[-1]
+      if stage.count >= stage.capacity:
+        stage = BloomFilter(stage.capacity * 2, stage.error_rate / 2)
+        self.stages.append(stage)
+      room = stage.capacity - stage.count
+      stage.add_many(h1[:room], h2[:room])
+      h1, h2 = h1[room:], h2[room:]
+
+  def dump(self: Self, f: BinaryIO, metadata: dict) -> None:
+    """Write a snapshot; stages appended while it is being written are left for the next one"""
+    stages = list(self.stages)
+    header = json.dumps(
+      {
+        "capacity": self.capacity,
+        "error_rate": self.error_rate,
+        "stages": [
+          {"capacity": stage.capacity, "error_rate": stage.error_rate, "count": stage.count}
+          for stage in stages
+        ],
+        "metadata": metadata,
+      }
+    ).encode()
+    f.write(SNAPSHOT_MAGIC)
+    f.write(struct.pack("<I", len(header)))
+    f.write(header)
+    for stage in stages:
+      f.write(stage.bits)
+
+  @classmethod
+  def load(cls, f: BinaryIO) -> tuple["ScalableBloomFilter", dict]:
+    if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+      raise ValueError("Not a Bloom filter snapshot")
+    (header_size,) = struct.unpack("<I", f.read(4))
+    header = json.loads(f.read(header_size))
+
+    stages = []
+    for spec in header["stages"]:
+      stage = BloomFilter(spec["capacity"], spec["error_rate"], count=spec["count"])
+      bits = bytearray(f.read(len(stage.bits)))
+      if len(bits) != len(stage.bits):
+        raise ValueError("Truncated Bloom filter snapshot")
+      stage.bits = bits
+      stages.append(stage)
+
+    return cls(header["capacity"], header["error_rate"], stages), header["metadata"]
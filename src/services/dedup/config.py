@@ -0,0 +1,19 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class DedupSettings(BaseSettings):
+  dedup_enabled: bool = True
+  dedup_expected_items: int = 10000000
+  dedup_error_rate: float = 0.001
+
+  dedup_snapshot_path: str = "dedup/content_hash.bloom"
+  dedup_snapshot_seconds: int = 600
+  dedup_refresh_seconds: int = 60
+  # Rows committed late with an older created_at are still picked up by the next refresh
+  dedup_watermark_margin_seconds: int = 300
+  dedup_scan_batch_size: int = 50000
+
+  model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+dedup_settings = DedupSettings()
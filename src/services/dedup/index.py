@@ -0,0 +1,151 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Iterable, Optional, Self
+
+from src.database.database import AsyncSessionLocal
+from src.database.repositories.message import MessageRepository
+from src.schemas import content_hash_digest
+from src.services.dedup.bloom import ScalableBloomFilter
+from src.services.dedup.config import dedup_settings
+
+UPDATE_CHUNK = 5000
+
+HashLookup = Callable[[list[str]], Awaitable[set[str]]]
+
+
+class DedupIndex:
+  """In-process Bloom filter of the content hashes stored in messages.
+
+  A hash the filter has never seen is certainly new, so only the filter's hits are looked up in
+  the database. The filter is loaded from its last snapshot on startup and caught up by scanning
+  the rows created since the snapshot's watermark; until then every hash is looked up. Hashes
+  inserted by this process are added as they are written, rows written by other processes are
+  picked up by the periodic refresh. A hash missed in between only costs a duplicate send, which
+  the unique index on content_hash still rejects.
+  """
+
+  def __init__(self: Self):
+    self.filter = ScalableBloomFilter(
+      dedup_settings.dedup_expected_items, dedup_settings.dedup_error_rate
+    )
+    self.ready = False
+    self.watermark: Optional[datetime] = None
+    self.snapshot_at: Optional[float] = None
+    self.task: Optional[asyncio.Task] = None
+    self.lookups = 0
+    self.candidates = 0
+    self.confirmed = 0
+
+  def start(self: Self):
+    if dedup_settings.dedup_enabled:
+      self.task = asyncio.create_task(self._run(), name="dedup-index")
+
+  async def stop(self: Self):
+    if not self.task:
+      return
+    self.task.cancel()
+    await asyncio.gather(self.task, return_exceptions=True)
+    self.task = None
+    if self.ready:
+      await asyncio.to_thread(self._save_snapshot)
+
+  def add(self: Self, hashes: Iterable[Optional[str]]):
+    """Record hashes that are now stored in messages"""
+    if dedup_settings.dedup_enabled:
+      self.filter.update(content_hash_digest(content_hash) for content_hash in hashes if content_hash)
+
+  async def find_existing(self: Self, hashes: list[str], lookup: HashLookup) -> set[str]:
+    """Hashes already stored, looking up in the database only those the filter may contain"""
+    self.lookups += len(hashes)
+    if self.ready:
+      hashes = [
+        content_hash for content_hash in hashes if content_hash_digest(content_hash) in self.filter
+      ]
+    self.candidates += len(hashes)
+
+    existing = await lookup(hashes) if hashes else set()
+    self.confirmed += len(existing)
+    return existing
+
+  def state(self: Self) -> dict:
+    return {
+      "enabled": dedup_settings.dedup_enabled,
+      "ready": self.ready,
+      "watermark": self.watermark,
+      "items": self.filter.count,
+      "stages": len(self.filter.stages),
+      "size_bytes": self.filter.nbytes,
+      "lookups": self.lookups,
+      "candidates": self.candidates,
+      "confirmed": self.confirmed,
+    }
+
+  async def _run(self: Self):
+    await asyncio.to_thread(self._load_snapshot)
+    self.snapshot_at = time.monotonic()
+
+    while True:
+      try:
+        await self._refresh()
+        self.ready = True
+      except Exception as e:
+        print(f"Error refreshing dedup index: {e}")
+
+      if self.ready and time.monotonic() - self.snapshot_at >= dedup_settings.dedup_snapshot_seconds:
+        try:
+          await asyncio.to_thread(self._save_snapshot)
+        except OSError as e:
+          print(f"Error saving dedup index snapshot: {e}")
+        self.snapshot_at = time.monotonic()
+
+      await asyncio.sleep(dedup_settings.dedup_refresh_seconds)
+
+  async def _refresh(self: Self):
+    """Add the hashes of rows created since the watermark"""
+    started = datetime.utcnow()
+    added = 0
+    async with AsyncSessionLocal() as session:
+      async for hashes in MessageRepository(session).stream_content_hashes(
+        since=self.watermark, batch_size=dedup_settings.dedup_scan_batch_size
+      ):
+        # Yield every few thousand hashes so the first, full scan does not stall the event loop
+        for start in range(0, len(hashes), UPDATE_CHUNK):
+          self.filter.update(map(content_hash_digest, hashes[start:start + UPDATE_CHUNK]))
+          await asyncio.sleep(0)
+        added += len(hashes)
+
+    # Rows committed after the scan started may carry an earlier created_at
+    self.watermark = started - timedelta(seconds=dedup_settings.dedup_watermark_margin_seconds)
+    if added and not self.ready:
+      print(f"Dedup index loaded {added} content hashes ({self.filter.count} total)")
+
+  def _load_snapshot(self: Self):
+    path = dedup_settings.dedup_snapshot_path
+    if not os.path.exists(path):
+      return
+    try:
+      with open(path, "rb") as f:
+        loaded, metadata = ScalableBloomFilter.load(f)
+    except (OSError, ValueError, KeyError) as e:
+      print(f"Ignoring dedup index snapshot {path}: {e}")
+      return
+
+    # Hashes added before the load were inserted after the snapshot's watermark, the catch-up
+    # scan adds them again
+    self.filter = loaded
+    watermark = metadata.get("watermark")
+    self.watermark = datetime.fromisoformat(watermark) if watermark else None
+
+  def _save_snapshot(self: Self):
+    """Write the filter atomically, so a crash mid-write keeps the previous snapshot"""
+    path = dedup_settings.dedup_snapshot_path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    watermark = self.watermark.isoformat() if self.watermark else None
+    with open(f"{path}.partial", "wb") as f:
+      self.filter.dump(f, {"watermark": watermark})
+    os.replace(f"{path}.partial", path)
+
+
+dedup_index = DedupIndex()
@@ -0,0 +1,112 @@
+"""Streaming decompression of gzip and zstd uploads with decompression-bomb limits.
+
+Output is checked as it is produced: a file is rejected once its decompressed size passes
+upload_max_decompressed_bytes, or once it has expanded more than upload_max_compression_ratio
+times the compressed bytes read so far, long before a bomb could fill memory or disk. Callers
+with other limits, such as the bulk import, pass their own.
+"""
+import gzip
+import os
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from src.services.file_upload.config import file_upload_settings
+
+try:
+    import zstandard
+except ImportError:  # a project dependency, but the module still loads without it
+    zstandard = None
+
+CHUNK_SIZE = 1048576  # 1MB
+GZIP_SUFFIX = ".gz"
+ZSTD_SUFFIX = ".zst"
+
+DECOMPRESSION_ERRORS: Tuple[type, ...] = (OSError, EOFError, zlib.error) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+
+def _open_stream(raw: BinaryIO, compression: str) -> BinaryIO:
+    if compression == GZIP_SUFFIX:
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if compression == ZSTD_SUFFIX:
+        if zstandard is None:
+            raise ValueError("Файлы .zst не поддерживаются: на сервере не установлен пакет zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+    raise ValueError(f"Неподдерживаемый формат сжатия: {compression}")
+
+
+def iter_decompressed(
+    path: Path,
+    compression: str,
+    chunk_size: int = CHUNK_SIZE,
+    max_bytes: Optional[int] = None,
+    max_ratio: Optional[int] = None,
+) -> Iterator[Tuple[bytes, int]]:
+    """Yield decompressed chunks, each with the number of compressed bytes read so far.
+
+    The limits default to the upload ones.
+    """
+    if max_bytes is None:
+        max_bytes = file_upload_settings.upload_max_decompressed_bytes
+    if max_ratio is None:
+        max_ratio = file_upload_settings.upload_max_compression_ratio
+
+    total = 0
+    with open(path, "rb") as raw, _open_stream(raw, compression) as stream:
+        while chunk := stream.read(chunk_size):
+            total += len(chunk)
+            consumed = raw.tell()
+            if total > max_bytes:
+                raise ValueError(
+                    f"Распакованный файл превышает допустимый размер {max_bytes} байт. "
+                    "Решение: разделите файл на несколько частей"
+                )
+            # The first chunk may come from a few compressed bytes of any ordinary file
+            if total > chunk_size and total > consumed * max_ratio:
+                raise ValueError(
+                    f"Файл распаковывается более чем в {max_ratio} раз и похож на zip-бомбу. "
+                    "Решение: загрузите файл без сжатия"
+                )
+            yield chunk, consumed
+
+
+def read_head(path: Path, compression: str, size: int) -> Tuple[bytes, int, bool]:
+    """First size decompressed bytes, the compressed bytes read for them, and whether more follow"""
+    head = bytearray()
+    consumed = 0
+    for chunk, consumed in iter_decompressed(path, compression, chunk_size=min(size, CHUNK_SIZE)):
+        head += chunk
+        if len(head) > size:
+            return bytes(head[:size]), consumed, True
+    return bytes(head), consumed, False
+
+
+def declared_size(path: Path, compression: str) -> Optional[int]:
+    """Decompressed size the compressor recorded in the file, if the format carries one.
+
+    Untrusted, so only good as a hint: gzip keeps it modulo 2**32 and for the last member only.
+    """
+    with open(path, "rb") as f:
+        if compression == GZIP_SUFFIX:
+            f.seek(-4, os.SEEK_END)
+            return int.from_bytes(f.read(4), "little")
+        if compression == ZSTD_SUFFIX and zstandard is not None:
+            try:
+                size = zstandard.frame_content_size(f.read(18))
+            except zstandard.ZstdError:
+                return None
+            return size if size >= 0 else None
+    return None
+
+
+def decompress_file(
+    path: Path,
+    compression: str,
+    out: BinaryIO,
+    max_bytes: Optional[int] = None,
+    max_ratio: Optional[int] = None,
+) -> None:
+    for chunk, _ in iter_decompressed(path, compression, max_bytes=max_bytes, max_ratio=max_ratio):
+        out.write(chunk)
@@ -0,0 +1,33 @@
+import os
+from typing import Optional
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class FileUploadSettings(BaseSettings):
+    upload_sample_rows: int = 1000
+    upload_max_reported_errors: int = 100
+
+    # 0 runs file processing in threads of the API process instead of a process pool
+    upload_process_workers: int = Field(default_factory=lambda: min(os.cpu_count() or 1, 4))
+
+    upload_max_concurrent_jobs: int = 2
+    upload_job_stale_seconds: int = 120
+    upload_job_heartbeat_seconds: int = 30
+    upload_job_rescan_seconds: int = 60
+
+    # Limits for .gz and .zst uploads, applied while they are decompressed
+    upload_max_decompressed_bytes: int = 1073741824  # 1GB
+    upload_max_compression_ratio: int = 100
+
+    upload_memory_budget_bytes: int = 2147483648  # 2GB
+    upload_streaming_memory_bytes: int = 268435456  # 256MB
+    # Within-file dedup of one job; past this its hashes are spilled to sorted runs on disk
+    upload_dedup_memory_bytes: int = 67108864  # 64MB
+    upload_dedup_spill_dir: Optional[str] = None
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+file_upload_settings = FileUploadSettings()
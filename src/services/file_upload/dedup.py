@@ -0,0 +1,170 @@
+"""Within-file dedup of content hashes in a fixed amount of memory.
+
+Hashes are kept as their 16-byte digests in an open-addressing table of NumPy arrays, 17 bytes a
+slot instead of ~150 bytes for a str in a set. When the table is full its keys are written to
+disk as a sorted run, the table is cleared, and later lookups binary-search the memory-mapped
+runs as well as the table.
+"""
+import os
+import shutil
+import tempfile
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+INITIAL_SLOTS = 1 << 16
+MAX_LOAD = 0.5
+# Table slot: two uint64 digest words and a used flag
+SLOT_BYTES = 17
+
+
+def hex_digests(hashes: Sequence[str]) -> np.ndarray:
+    """The 16-byte digest of each hex content hash as a (2, n) array of uint64 words"""
+    raw = bytes.fromhex("".join(content_hash[:32] for content_hash in hashes))
+    return np.frombuffer(raw, dtype=">u8").astype(np.uint64).reshape(-1, 2).T
+
+
+class SeenHashes:
+    """Set of the content hashes already seen in one upload, bounded by memory_bytes.
+
+    Half of the budget is the table itself; the other half covers the copies made while a
+    full table is sorted and spilled.
+    """
+
+    def __init__(self, memory_bytes: int, spill_dir: Optional[str] = None):
+        max_slots = INITIAL_SLOTS
+        while max_slots * 2 * SLOT_BYTES * 2 <= memory_bytes:
+            max_slots *= 2
+        self.max_slots = max_slots
+        self.spill_dir = spill_dir
+        self.runs: List[np.memmap] = []
+        self.count = 0
+        self._run_dir: Optional[str] = None
+        self._allocate(min(INITIAL_SLOTS, max_slots))
+
+    def __enter__(self) -> "SeenHashes":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the table; spilled runs live in the page cache"""
+        return self.hi.nbytes + self.lo.nbytes + self.used.nbytes
+
+    def add_new(self, hashes: Sequence[str]) -> np.ndarray:
+        """Add the hashes, returning a mask of those not seen before.
+
+        Of a hash repeated within the batch only the first occurrence counts as new.
+        """
+        new = np.zeros(len(hashes), dtype=bool)
+        if not len(hashes):
+            return new
+
+        hi, lo = hex_digests(hashes)
+        # Stable sort by key, so the first occurrence of a repeated hash leads its group; the
+        # runs are then probed in key order, which keeps the binary searches cache friendly
+        order = np.lexsort((lo, hi))
+        repeated = (hi[order][1:] == hi[order][:-1]) & (lo[order][1:] == lo[order][:-1])
+        first = order[np.concatenate(([True], ~repeated))]
+
+        # Spill before looking in the runs, so a key is never moved out of the table unchecked
+        self._reserve(len(first))
+        if self.runs:
+            first = first[~self._in_runs(hi[first], lo[first])]
+
+        new[first] = self._insert(hi[first], lo[first])
+        self.count += int(new.sum())
+        return new
+
+    def close(self) -> None:
+        self.runs.clear()
+        if self._run_dir:
+            shutil.rmtree(self._run_dir, ignore_errors=True)
+            self._run_dir = None
+
+    def _allocate(self, slots: int) -> None:
+        self.hi = np.zeros(slots, dtype=np.uint64)
+        self.lo = np.zeros(slots, dtype=np.uint64)
+        self.used = np.zeros(slots, dtype=bool)
+        self.mask = slots - 1
+        self.in_table = 0
+
+    def _reserve(self, n: int) -> None:
+        """Grow the table, or spill it once it is at its size limit, so that n more keys fit"""
+        while self.in_table + n > len(self.used) * MAX_LOAD:
+            if len(self.used) < self.max_slots:
+                hi, lo = self.hi[self.used], self.lo[self.used]
+                self._allocate(len(self.used) * 2)
+                self._insert(hi, lo)
+            elif self.in_table:
+                self._spill()
+            else:
+                # A single batch larger than the table: let it overfill rather than fail
+                self._allocate(len(self.used) * 2)
+
+    def _insert(self, hi: np.ndarray, lo: np.ndarray) -> np.ndarray:
+        """Linear-probing insert of keys distinct among themselves; True where a key was added"""
+        added = np.zeros(len(hi), dtype=bool)
+        slots = (lo & np.uint64(self.mask)).astype(np.intp)
+        pending = np.arange(len(hi))
+
+        while pending.size:
+            at = slots[pending]
+            used = self.used[at]
+            match = used & (self.hi[at] == hi[pending]) & (self.lo[at] == lo[pending])
+
+            # Of several keys probing the same free slot, the first takes it and the rest
+            # see it occupied on the next round
+            free = np.flatnonzero(~used)
+            _, first = np.unique(at[free], return_index=True)
+            claimed = free[first]
+            winners = pending[claimed]
+            self.used[at[claimed]] = True
+            self.hi[at[claimed]] = hi[winners]
+            self.lo[at[claimed]] = lo[winners]
+            added[winners] = True
+
+            collided = used & ~match
+            slots[pending[collided]] = (at[collided] + 1) & self.mask
+            done = match.copy()
+            done[claimed] = True
+            pending = pending[~done]
+
+        self.in_table += int(added.sum())
+        return added
+
+    def _spill(self) -> None:
+        hi, lo = self.hi[self.used], self.lo[self.used]
+        order = np.lexsort((lo, hi))
+
+        if self._run_dir is None:
+            self._run_dir = tempfile.mkdtemp(prefix="upload-dedup-", dir=self.spill_dir)
+        path = os.path.join(self._run_dir, f"run-{len(self.runs)}.u64")
+        run = np.memmap(path, dtype=np.uint64, mode="w+", shape=(2, len(order)))
+        run[0] = hi[order]
+        run[1] = lo[order]
+        run.flush()
+        del run
+
+        self.runs.append(np.memmap(path, dtype=np.uint64, mode="r", shape=(2, len(order))))
+        self.used[:] = False
+        self.in_table = 0
+
+    def _in_runs(self, hi: np.ndarray, lo: np.ndarray) -> np.ndarray:
+        """Membership in the spilled runs of keys sorted by (hi, lo)"""
+        found = np.zeros(len(hi), dtype=bool)
+        for run in self.runs:
+            run_hi, run_lo = run[0], run[1]
+            at = np.minimum(np.searchsorted(run_hi, hi), len(run_hi) - 1)
+            same_hi = run_hi[at] == hi
+            found |= same_hi & (run_lo[at] == lo)
+
+            # Keys sharing their first 64 bits: practically never, checked one by one
+            after = np.minimum(at + 1, len(run_hi) - 1)
+            shared = same_hi & (after != at) & (run_hi[after] == hi)
+            for i in np.flatnonzero(shared & ~found):
+                end = np.searchsorted(run_hi, hi[i], side="right")
+                found[i] = bool((run_lo[at[i]:end] == lo[i]).any())
+        return found
@@ -0,0 +1,55 @@
+import asyncio
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional, TypeVar
+
+from src.services.file_upload.config import file_upload_settings
+
+T = TypeVar("T")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    """Process pool for parsing, validation and hashing; None when upload_process_workers is 0.
+
+    Workers are spawned rather than forked, since the API process runs threads of its own.
+    They import src.api first, because importing src.services on its own runs into the
+    services <-> api import cycle.
+    """
+    global _executor
+    if _executor is None and file_upload_settings.upload_process_workers > 0:
+        _executor = ProcessPoolExecutor(
+            max_workers=file_upload_settings.upload_process_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=importlib.import_module,
+            initargs=("src.api",),
+        )
+    return _executor
+
+
+def concurrency() -> int:
+    return max(file_upload_settings.upload_process_workers, 1)
+
+
+async def run_cpu_bound(func: Callable[..., T], *args) -> T:
+    """Run func off the event loop: in the process pool if configured, in a thread otherwise"""
+    executor = get_executor()
+    if executor is None:
+        return await asyncio.to_thread(func, *args)
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args))
+
+
+def worker_pids() -> List[int]:
+    if _executor is None:
+        return []
+    return list(_executor._processes or {})
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
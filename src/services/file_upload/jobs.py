@@ -0,0 +1,159 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from src.database.database import AsyncSessionLocal
+from src.database.models.upload_job import UploadJob
+from src.database.repositories.upload_job import UploadJobRepository
+from src.services.file_upload.config import file_upload_settings
+from src.services.file_upload.executor import worker_pids
+from src.services.file_upload.memory import memory_budget, process_rss
+
+JobHandler = Callable[[UploadJob, UploadJobRepository], Awaitable[None]]
+
+
+def stale_before() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=file_upload_settings.upload_job_stale_seconds)
+
+
+class UploadJobQueue:
+    """Runs jobs from the upload_jobs table on at most `concurrency` workers of this process.
+
+    A job is claimed by setting its worker_id and is kept alive by a heartbeat task for as long
+    as it runs, also while a large file is being staged. Jobs left behind by a process that
+    died become claimable again once the heartbeat is older than upload_job_stale_seconds. The
+    periodic scan then picks them up, and they resume from their last committed offset.
+    """
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self.handler: Optional[JobHandler] = None
+        self.concurrency = file_upload_settings.upload_max_concurrent_jobs
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.queued: Set[str] = set()
+        self.workers: Dict[int, asyncio.Task] = {}
+        self.running: Dict[int, str] = {}
+        self.scan_task: Optional[asyncio.Task] = None
+
+    def start(self, handler: JobHandler) -> None:
+        self.handler = handler
+        self.resize(self.concurrency)
+        self.scan_task = asyncio.create_task(self._scan_loop(), name="upload-job-scan")
+
+    async def stop(self) -> None:
+        """Cancel running jobs; they keep their offset and are resumed after a restart"""
+        tasks = [*self.workers.values(), *([self.scan_task] if self.scan_task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.scan_task = None
+
+    def submit(self, job_id: str) -> None:
+        if job_id in self.queued or job_id in self.running.values():
+            return
+        self.queued.add(job_id)
+        self.queue.put_nowait(job_id)
+
+    def resize(self, concurrency: int) -> None:
+        """Change how many jobs run at once; busy workers above the limit finish their job first"""
+        self.concurrency = concurrency
+        for slot in range(concurrency):
+            if slot not in self.workers:
+                self.workers[slot] = asyncio.create_task(self._work(slot), name=f"upload-job-{slot}")
+        for slot, task in list(self.workers.items()):
+            if slot >= concurrency and slot not in self.running:
+                task.cancel()
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "queued": len(self.queued),
+            "running": sorted(self.running.values()),
+            "memory": {
+                "budget_bytes": memory_budget.limit,
+                "reserved_bytes": memory_budget.reserved,
+                "waiting_jobs": memory_budget.waiting,
+                "rss_bytes": process_rss(),
+                "worker_rss_bytes": [process_rss(pid) for pid in worker_pids()],
+            },
+        }
+
+    async def _work(self, slot: int) -> None:
+        try:
+            while slot < self.concurrency:
+                job_id = await self.queue.get()
+                self.queued.discard(job_id)
+                self.running[slot] = job_id
+                try:
+                    await self._run(job_id)
+                except Exception as e:
+                    print(f"Upload job {job_id} failed: {e}")
+                finally:
+                    self.running.pop(slot, None)
+        finally:
+            self.workers.pop(slot, None)
+
+    async def _run(self, job_id: str) -> None:
+        async with AsyncSessionLocal() as session:
+            job = await UploadJobRepository(session).get_job(job_id)
+            if job is None:
+                return
+            estimate = job.estimated_memory_bytes
+            if estimate is None:
+                estimate = file_upload_settings.upload_streaming_memory_bytes
+
+        # Wait for memory without holding a connection, then claim with a fresh session
+        async with memory_budget.reserve(estimate):
+            async with AsyncSessionLocal() as session:
+                repo = UploadJobRepository(session)
+                job = await repo.claim_job(job_id, self.worker_id, stale_before())
+                if job is not None:
+                    await self._run_claimed(job, repo)
+
+    async def _run_claimed(self, job: UploadJob, repo: UploadJobRepository) -> None:
+        """Run the handler while a separate task keeps the claim's heartbeat fresh.
+
+        The heartbeat has its own session, since the handler's is busy. If the claim turns out
+        to be lost, because this process stalled past upload_job_stale_seconds and another
+        worker took the job over, the handler is cancelled so the rows are not sent twice.
+        """
+        handler = asyncio.create_task(self.handler(job, repo))
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, handler))
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+    async def _heartbeat(self, job_id: str, handler: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(file_upload_settings.upload_job_heartbeat_seconds)
+            try:
+                async with AsyncSessionLocal() as session:
+                    held = await UploadJobRepository(session).heartbeat(job_id, self.worker_id)
+            except Exception as e:
+                print(f"Error refreshing heartbeat of upload job {job_id}: {e}")
+                continue
+            if not held:
+                print(f"Upload job {job_id} was taken over by another worker, stopping it here")
+                handler.cancel()
+                return
+
+    async def _scan_loop(self) -> None:
+        while True:
+            try:
+                async with AsyncSessionLocal() as session:
+                    job_ids = await UploadJobRepository(session).get_claimable_job_ids(stale_before())
+                for job_id in job_ids:
+                    self.submit(job_id)
+            except Exception as e:
+                print(f"Error scanning upload jobs: {e}")
+            await asyncio.sleep(file_upload_settings.upload_job_rescan_seconds)
+
+
+upload_queue = UploadJobQueue()
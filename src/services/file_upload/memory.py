@@ -0,0 +1,64 @@
+import asyncio
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from src.services.file_upload.config import file_upload_settings
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def process_rss(pid: int | str = "self") -> Optional[int]:
+    """Resident set size in bytes from /proc; None where /proc is not available"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class MemoryBudget:
+    """Admits upload jobs while the sum of their estimated footprints fits the budget.
+
+    Waiting jobs are admitted in arrival order, so a large job is not starved by smaller ones
+    behind it. A job larger than the whole budget runs once nothing else holds a reservation,
+    so it is delayed rather than rejected.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.reserved = 0
+        self._waiters: deque = deque()
+        self._condition = asyncio.Condition()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _admissible(self, ticket: object, nbytes: int) -> bool:
+        if self._waiters[0] is not ticket:
+            return False
+        return self.reserved == 0 or self.reserved + nbytes <= self.limit
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int) -> AsyncIterator[None]:
+        ticket = object()
+        async with self._condition:
+            self._waiters.append(ticket)
+            try:
+                await self._condition.wait_for(lambda: self._admissible(ticket, nbytes))
+            finally:
+                self._waiters.remove(ticket)
+                self._condition.notify_all()
+            self.reserved += nbytes
+
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.reserved -= nbytes
+                self._condition.notify_all()
+
+
+memory_budget = MemoryBudget(file_upload_settings.upload_memory_budget_bytes)
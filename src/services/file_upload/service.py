@@ -1,15 +1,49 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Any
-from datetime import datetime
-import hashlib
-
-from pydantic import ValidationError
-from src.schemas import MessageSchema
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+import io
+import os
+import tempfile
+
+from src.services.file_upload.compression import (
+    DECOMPRESSION_ERRORS,
+    GZIP_SUFFIX,
+    ZSTD_SUFFIX,
+    declared_size,
+    decompress_file,
+    read_head,
+)
+from src.services.file_upload.config import file_upload_settings
+from src.services.file_upload.validation import RowError, find_row_errors, prepare_batch
 import polars as pl
 
+BATCH_SIZE = 2000
+STAGED_SUFFIX = ".arrow"
+SAMPLE_BYTES = 1048576  # 1MB
+
+
+class StagedBatch(NamedTuple):
+    """Result of preparing one slice of a staged file, cheap to send between processes.
+
+    records is an Arrow IPC buffer with content_hash, its version 1 counterpart legacy_hash,
+    user_id and the JSON-encoded message.
+    """
+
+    rows: int
+    invalid: int
+    errors: List[RowError]
+    records: bytes
+
 
 class FileProcessor(ABC):
+    read_error_message = "Ошибка чтения файла: {error}"
+
+    # Decoded bytes per byte on disk, for formats a sample cannot measure
+    expansion_ratio = 4.0
+    # Whether scan_data reads the file incrementally instead of decoding it whole
+    streaming = False
+
     def __init__(self, file_path: Path):
         self.file_path = Path(file_path)
         if not self.file_path.exists():
@@ -19,137 +53,107 @@ class FileProcessor(ABC):
     def read_data(self) -> pl.DataFrame:
         pass
 
-    def validate_structure(self, df: pl.DataFrame) -> None:
+    def scan_data(self) -> pl.LazyFrame:
+        """Lazy view of the file; formats without a lazy reader fall back to an eager read"""
+        return self.read_data().lazy()
+
+    def read_columns(self) -> List[str]:
+        try:
+            return self.scan_data().collect_schema().names()
+        except pl.exceptions.PolarsError as e:
+            raise ValueError(self.read_error_message.format(error=e))
+
+    def read_sample(self, rows: int) -> pl.DataFrame:
+        """The first rows of the file, reading no more of it than needed"""
+        try:
+            return self.scan_data().head(rows).collect()
+        except pl.exceptions.PolarsError as e:
+            raise ValueError(self.read_error_message.format(error=e))
+
+    def iter_batches(self, batch_size: int = BATCH_SIZE) -> Iterator[pl.DataFrame]:
+        """Yield DataFrames of at most batch_size rows while the file is still being read"""
+        try:
+            for chunk in self.scan_data().collect_batches(chunk_size=batch_size):
+                for offset in range(0, chunk.height, batch_size):
+                    yield chunk.slice(offset, batch_size)
+        except pl.exceptions.PolarsError as e:
+            raise ValueError(self.read_error_message.format(error=e))
+
+    def is_streaming(self) -> bool:
+        return self.streaming
+
+    def decoded_size_ratio(self) -> float:
+        """Estimated size of the decoded DataFrame relative to the file size"""
+        return self.expansion_ratio
+
+    def _sampled_text_ratio(self, read: Callable[[io.BytesIO], pl.DataFrame]) -> float:
+        """Decode the first SAMPLE_BYTES of a line-based file and compare the sizes"""
+        with open(self.file_path, "rb") as f:
+            head = f.read(SAMPLE_BYTES)
+        if len(head) == SAMPLE_BYTES:
+            head = head[: head.rfind(b"\n") + 1]
+
+        try:
+            sample = read(io.BytesIO(head))
+        except pl.exceptions.PolarsError:
+            return self.expansion_ratio
+        if not head or sample.is_empty():
+            return self.expansion_ratio
+        return max(sample.estimated_size() / len(head), 1.0)
+
+    def stage(self, target: Path) -> None:
+        """Parse the file once into an uncompressed Arrow IPC file that later stages memory-map"""
+        try:
+            self.scan_data().sink_ipc(target, compression="uncompressed")
+        except pl.exceptions.PolarsError as e:
+            raise ValueError(self.read_error_message.format(error=e))
+
+    def validate_columns(self, columns: List[str]) -> None:
         required_columns = {"text", "user_id", "external_id", "timestamp"}
-        missing = required_columns - set(df.columns)
+        missing = required_columns - set(columns)
         if missing:
             raise ValueError(f"Отсутствуют обязательные колонки: {', '.join(missing)}. Пожалуйста, проверьте структуру файла.")
 
-    def _handle_validation_error(self, row_num: int, error: ValidationError) -> None:
-        messages = []
-        for err in error.errors():
-            loc = err["loc"]
-            field = str(loc[0]) if loc else "unknown"
-            err_type = err["type"]
-            
-            msg = f"Поле '{field}' содержит ошибку"
-            solution = "Проверьте корректность данных"
-
-            if field == "text":
-                if err_type in ("string_type", "missing"):
-                    msg = "Поле 'text' (текст обращения) не заполнено"
-                    solution = "Убедитесь, что в столбце 'text' есть текст обращения"
-                elif "min_length" in err_type or "value_error" in err_type:
-                    msg = "Поле 'text' пустое"
-                    solution = "Текст обращения не может быть пустым"
-            
-            elif field == "timestamp":
-                msg = "Неверный формат даты/времени"
-                solution = "Используйте формат ISO 8601 (например, 2023-12-31T23:59:59)"
-            
-            messages.append(f"{msg}. Решение: {solution}")
-
-        final_msg = f"Ошибка валидации в строке {row_num}: {'; '.join(messages)}"
-        raise ValueError(final_msg)
-
-    def validate_content(self, df: pl.DataFrame) -> None:
-        try:
-            records = df.to_dicts()
-            for i, record in enumerate(records):
-                clean_record = {k: (v if v is not None else None) for k, v in record.items()}
-                
-                if isinstance(clean_record.get("timestamp"), datetime):
-                    clean_record["timestamp"] = clean_record["timestamp"].isoformat()
-                
-                MessageSchema(**clean_record)
-        except ValidationError as e:
-            self._handle_validation_error(i + 1, e)
-        except Exception as e:
-            raise ValueError(f"Ошибка обработки строки {i+1}: {e}")
-
-    def process(self) -> Dict[str, Any]:
-        df = self.read_data()
-        self.validate_structure(df)
-        self.validate_content(df)
-
-        records = df.to_dicts()
-        valid_records = []
-        seen_hashes = set()
-        
-        for record in records:
-            clean_record = {k: (v if v is not None else None) for k, v in record.items()}
-            
-            if isinstance(clean_record.get("timestamp"), datetime):
-                clean_record["timestamp"] = clean_record["timestamp"].isoformat()
-            
-            if not clean_record.get("timestamp"):
-                clean_record["timestamp"] = datetime.now().isoformat()
-
-            text_lower = (clean_record.get("text") or "").lower()
-            timestamp = clean_record.get("timestamp")
-            content_hash = hashlib.sha256(f"{timestamp}_{text_lower}".encode()).hexdigest()
-
-            if content_hash in seen_hashes:
-                continue
-            
-            seen_hashes.add(content_hash)
-            clean_record["content_hash"] = content_hash
-                
-            valid_records.append(MessageSchema(**clean_record))
-
-        return {
-            "data": valid_records,
-            "metadata": {
-                "source_file": str(self.file_path),
-                "processed_at": datetime.now().isoformat(),
-            },
-        }
-
-    def process_batch(self, df_slice: pl.DataFrame) -> List[MessageSchema]:
-        """Process a batch of data without full validation (assumes structure is valid)"""
-        records = df_slice.to_dicts()
-        valid_records = []
-        
-        for record in records:
-            clean_record = {k: (v if v is not None else None) for k, v in record.items()}
-            
-            if isinstance(clean_record.get("timestamp"), datetime):
-                clean_record["timestamp"] = clean_record["timestamp"].isoformat()
-            
-            if not clean_record.get("timestamp"):
-                clean_record["timestamp"] = datetime.now().isoformat()
-
-            text_lower = (clean_record.get("text") or "").lower()
-            timestamp = clean_record.get("timestamp")
-            content_hash = hashlib.sha256(f"{timestamp}_{text_lower}".encode()).hexdigest()
-            
-            clean_record["content_hash"] = content_hash
-            
-            try:
-                valid_records.append(MessageSchema(**clean_record))
-            except ValidationError:
-                continue
-                
-        return valid_records
+    def validate_content(self, df: pl.DataFrame, row_offset: int = 0) -> None:
+        errors = find_row_errors(df, row_offset, limit=1)
+        if errors:
+            raise ValueError(errors[0].message)
 
 
 class CSVProcessor(FileProcessor):
+    read_error_message = (
+        "Ошибка чтения CSV файла: {error}. Убедитесь, что файл имеет корректный формат CSV."
+    )
+    streaming = True
+
     def read_data(self) -> pl.DataFrame:
         try:
             return pl.read_csv(self.file_path, separator=",", ignore_errors=False)
         except Exception as e:
-            raise ValueError(f"Ошибка чтения CSV файла: {e}. Убедитесь, что файл имеет корректный формат CSV.")
+            raise ValueError(self.read_error_message.format(error=e))
+
+    def scan_data(self) -> pl.LazyFrame:
+        return pl.scan_csv(self.file_path, separator=",", ignore_errors=False)
+
+    def decoded_size_ratio(self) -> float:
+        return self._sampled_text_ratio(lambda head: pl.read_csv(head, separator=","))
 
 
 class ExcelProcessor(FileProcessor):
+    read_error_message = "Ошибка чтения Excel файла: {error}. Убедитесь, что файл не поврежден."
+    # xlsx is zipped XML; cells decode to roughly ten times the compressed size
+    expansion_ratio = 10.0
+
     def read_data(self) -> pl.DataFrame:
         try:
             return pl.read_excel(self.file_path)
         except Exception as e:
-            raise ValueError(f"Ошибка чтения Excel файла: {e}. Убедитесь, что файл не поврежден.")
+            raise ValueError(self.read_error_message.format(error=e))
 
 
 class JSONProcessor(FileProcessor):
+    read_error_message = "Ошибка чтения JSON файла: {error}. Проверьте синтаксис JSON."
+
     def read_data(self) -> pl.DataFrame:
         try:
             return pl.read_json(self.file_path)
@@ -157,15 +161,193 @@ class JSONProcessor(FileProcessor):
             try:
                 return pl.read_ndjson(self.file_path)
             except Exception as e:
-                raise ValueError(f"Ошибка чтения JSON файла: {e}. Проверьте синтаксис JSON.")
+                raise ValueError(self.read_error_message.format(error=e))
+
+    def is_streaming(self) -> bool:
+        with open(self.file_path, "rb") as f:
+            return not f.read(1024).lstrip().startswith(b"[")
+
+    def decoded_size_ratio(self) -> float:
+        if not self.is_streaming():
+            return self.expansion_ratio
+        return self._sampled_text_ratio(pl.read_ndjson)
+
+    def scan_data(self) -> pl.LazyFrame:
+        """NDJSON is scanned lazily; a JSON array or a multi-line object has to be read whole"""
+        if self.is_streaming():
+            lf = pl.scan_ndjson(self.file_path)
+            try:
+                lf.collect_schema()
+                return lf
+            except pl.exceptions.PolarsError:
+                pass
+
+        return self.read_data().lazy()
 
 
 class ParquetProcessor(FileProcessor):
+    read_error_message = "Ошибка чтения Parquet файла: {error}. Убедитесь, что файл не поврежден."
+    streaming = True
+
     def read_data(self) -> pl.DataFrame:
         try:
             return pl.read_parquet(self.file_path)
         except Exception as e:
-            raise ValueError(f"Ошибка чтения Parquet файла: {e}. Убедитесь, что файл не поврежден.")
+            raise ValueError(self.read_error_message.format(error=e))
+
+    def scan_data(self) -> pl.LazyFrame:
+        return pl.scan_parquet(self.file_path)
+
+    def decoded_size_ratio(self) -> float:
+        """Row count from the footer times the decoded size per row of the first row group"""
+        try:
+            lf = self.scan_data()
+            rows = lf.select(pl.len()).collect().item()
+            sample = lf.head(BATCH_SIZE).collect()
+        except pl.exceptions.PolarsError:
+            return self.expansion_ratio
+        if sample.is_empty():
+            return self.expansion_ratio
+        decoded = sample.estimated_size() / sample.height * rows
+        return decoded / max(os.path.getsize(self.file_path), 1)
+
+
+class IPCProcessor(FileProcessor):
+    """Reads files produced by FileProcessor.stage; memory-mapped, so there is nothing to parse"""
+
+    read_error_message = "Ошибка чтения Arrow IPC файла: {error}. Убедитесь, что файл не поврежден."
+    expansion_ratio = 1.0
+    streaming = True
+
+    def read_data(self) -> pl.DataFrame:
+        try:
+            return pl.read_ipc(self.file_path, memory_map=True)
+        except Exception as e:
+            raise ValueError(self.read_error_message.format(error=e))
+
+    def scan_data(self) -> pl.LazyFrame:
+        return pl.scan_ipc(self.file_path, memory_map=True)
+
+
+class CompressedProcessor(FileProcessor):
+    """gzip or zstd compressed CSV and NDJSON, decompressed as a stream.
+
+    The polars scanners need a file, so staging and iter_batches decompress into a temporary
+    file, next to the upload unless temp_dir is set, and read that through the processor of the
+    inner format. The sample and the memory estimate only decompress the head of the file.
+    """
+
+    streaming = True
+    inner_processors = {".csv": CSVProcessor, ".ndjson": JSONProcessor, ".jsonl": JSONProcessor}
+
+    def __init__(self, file_path: Path):
+        super().__init__(file_path)
+        self.inner_suffix, self.compression = (
+            suffix.lower() for suffix in self.file_path.suffixes[-2:]
+        )
+        self.inner = self.inner_processors[self.inner_suffix]
+        self.read_error_message = self.inner.read_error_message
+        # None keeps the upload limits
+        self.max_decompressed_bytes: Optional[int] = None
+        self.max_compression_ratio: Optional[int] = None
+        self.temp_dir: Optional[str] = None
+
+    def set_limits(
+        self, max_decompressed_bytes: int, max_compression_ratio: int, temp_dir: Optional[str] = None
+    ) -> None:
+        """Decompression limits and temporary directory for callers other than uploads"""
+        self.max_decompressed_bytes = max_decompressed_bytes
+        self.max_compression_ratio = max_compression_ratio
+        self.temp_dir = temp_dir
+
+    @contextmanager
+    def decompressed(self) -> Iterator[FileProcessor]:
+        """Processor of a decompressed copy of the file, removed on exit"""
+        fd, name = tempfile.mkstemp(
+            suffix=self.inner_suffix,
+            prefix=f"{self.file_path.name}.",
+            dir=self.temp_dir or self.file_path.parent,
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                decompress_file(
+                    self.file_path,
+                    self.compression,
+                    f,
+                    max_bytes=self.max_decompressed_bytes,
+                    max_ratio=self.max_compression_ratio,
+                )
+            yield self.inner(Path(name))
+        except DECOMPRESSION_ERRORS as e:
+            raise ValueError(self.read_error_message.format(error=e))
+        finally:
+            Path(name).unlink(missing_ok=True)
+
+    def _parse(self, data: bytes) -> pl.DataFrame:
+        try:
+            if self.inner_suffix == ".csv":
+                return pl.read_csv(io.BytesIO(data), separator=",", ignore_errors=False)
+            return pl.read_ndjson(io.BytesIO(data))
+        except pl.exceptions.PolarsError as e:
+            raise ValueError(self.read_error_message.format(error=e))
+
+    def _read_head(self) -> Tuple[bytes, int]:
+        """Decompressed head cut at a line end, and the compressed bytes it took"""
+        try:
+            head, consumed, truncated = read_head(self.file_path, self.compression, SAMPLE_BYTES)
+        except DECOMPRESSION_ERRORS as e:
+            raise ValueError(self.read_error_message.format(error=e))
+        if truncated:
+            head = head[: head.rfind(b"\n") + 1]
+        return head, consumed
+
+    def read_data(self) -> pl.DataFrame:
+        buffer = io.BytesIO()
+        try:
+            decompress_file(
+                self.file_path,
+                self.compression,
+                buffer,
+                max_bytes=self.max_decompressed_bytes,
+                max_ratio=self.max_compression_ratio,
+            )
+        except DECOMPRESSION_ERRORS as e:
+            raise ValueError(self.read_error_message.format(error=e))
+        return self._parse(buffer.getvalue())
+
+    def iter_batches(self, batch_size: int = BATCH_SIZE) -> Iterator[pl.DataFrame]:
+        """Batches scanned from a decompressed copy, instead of one eager read in memory"""
+        with self.decompressed() as inner:
+            yield from inner.iter_batches(batch_size)
+
+    def read_sample(self, rows: int) -> pl.DataFrame:
+        return self._parse(self._read_head()[0]).head(rows)
+
+    def read_columns(self) -> List[str]:
+        return self.read_sample(0).columns
+
+    def decoded_size_ratio(self) -> float:
+        """Decoded size of the head per decompressed byte, times the compression ratio.
+
+        The ratio measured on the head understates it for data that compresses better further
+        in, so the size recorded in the file is used when that is larger.
+        """
+        head, consumed = self._read_head()
+        sample = self._parse(head)
+        if not head or sample.is_empty():
+            return self.expansion_ratio
+
+        compressed = max(os.path.getsize(self.file_path), 1)
+        try:
+            declared = declared_size(self.file_path, self.compression) or 0
+        except OSError:
+            declared = 0
+        compression_ratio = max(len(head) / max(consumed, 1), declared / compressed)
+        return max(sample.estimated_size() / len(head) * compression_ratio, 1.0)
+
+    def stage(self, target: Path) -> None:
+        with self.decompressed() as inner:
+            inner.stage(target)
 
 
 class FileProcessorFactory:
@@ -174,25 +356,97 @@ class FileProcessorFactory:
         ".xlsx": ExcelProcessor,
         ".xls": ExcelProcessor,
         ".json": JSONProcessor,
+        ".ndjson": JSONProcessor,
+        ".jsonl": JSONProcessor,
         ".parquet": ParquetProcessor,
+        f".csv{GZIP_SUFFIX}": CompressedProcessor,
+        f".csv{ZSTD_SUFFIX}": CompressedProcessor,
+        f".ndjson{GZIP_SUFFIX}": CompressedProcessor,
+        f".jsonl{ZSTD_SUFFIX}": CompressedProcessor,
+        STAGED_SUFFIX: IPCProcessor,
     }
 
     @classmethod
     def create(cls, file_path: Path) -> FileProcessor:
-        ext = file_path.suffix.lower()
+        ext = "".join(file_path.suffixes[-2:]).lower()
+        if ext not in cls._processors:
+            ext = file_path.suffix.lower()
         processor = cls._processors.get(ext)
         if not processor:
             raise ValueError(f"Неподдерживаемый формат файла: {ext}. Поддерживаемые форматы: {', '.join(cls._processors.keys())}")
         return processor(file_path)
 
 
-def process_file(file_path: str) -> Dict[str, Any]:
-    return FileProcessorFactory.create(Path(file_path)).process()
+def validate_file_sample(file_path: str, sample_rows: int) -> None:
+    """Check the columns and the first sample_rows rows, leaving the rest to processing"""
+    processor = FileProcessorFactory.create(Path(file_path))
+    processor.validate_columns(processor.read_columns())
+    processor.validate_content(processor.read_sample(sample_rows))
 
 
-def validate_file_structure(file_path: str) -> None:
+def estimate_memory(file_path: str) -> int:
+    """Bytes an upload is expected to hold in memory while it is staged and processed.
+
+    Formats read whole need their full decoded size; streamed formats need at most
+    upload_streaming_memory_bytes for the batches in flight. The within-file dedup table
+    comes on top, bounded by the file itself and by upload_dedup_memory_bytes.
+    """
     processor = FileProcessorFactory.create(Path(file_path))
-    df = processor.read_data()
-    processor.validate_structure(df)
-    processor.validate_content(df)
+    decoded = int(os.path.getsize(file_path) * processor.decoded_size_ratio())
+    dedup = min(decoded, file_upload_settings.upload_dedup_memory_bytes)
+    if processor.is_streaming():
+        return min(decoded, file_upload_settings.upload_streaming_memory_bytes) + dedup
+    return decoded + dedup
+
+
+def staged_path_for(file_path: str) -> str:
+    return file_path + STAGED_SUFFIX
+
+
+def stage_file(file_path: str) -> str:
+    """Parse an upload once, returning the path of its Arrow IPC copy.
+
+    The copy is written under a temporary name and renamed when complete, so an existing
+    staged file is always whole. The original file is removed afterwards.
+    """
+    source = Path(file_path)
+    staged_path = Path(staged_path_for(file_path))
+    if staged_path.exists():
+        source.unlink(missing_ok=True)
+        return str(staged_path)
+
+    processor = FileProcessorFactory.create(source)
+
+    partial_path = staged_path.with_name(staged_path.name + ".partial")
+    try:
+        processor.stage(partial_path)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        raise
+
+    partial_path.replace(staged_path)
+    source.unlink()
+    return str(staged_path)
+
+
+def count_staged_rows(staged_path: str) -> int:
+    return pl.scan_ipc(staged_path, memory_map=True).select(pl.len()).collect().item()
+
+
+def prepare_staged_batch(staged_path: str, offset: int, length: int, max_errors: int) -> StagedBatch:
+    """Validate, hash and encode rows [offset, offset + length) of a staged file.
+
+    Runs in the upload process pool: the slice is memory-mapped from the staged file and the
+    result goes back as Arrow rather than as pickled Python objects.
+    """
+    df = pl.scan_ipc(staged_path, memory_map=True).slice(offset, length).collect()
+    report = prepare_batch(df, offset, max_errors, legacy_hashes=True)
 
+    records = report.records.select(
+        "content_hash",
+        report.legacy_hashes.alias("legacy_hash"),
+        "user_id",
+        pl.struct(pl.all()).struct.json_encode().cast(pl.Binary).alias("message"),
+    )
+    buffer = records.write_ipc(None, compression="uncompressed")
+    return StagedBatch(df.height, report.invalid, report.errors, buffer.getvalue())
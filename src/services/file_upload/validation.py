@@ -0,0 +1,230 @@
+"""Columnar equivalent of MessageSchema validation and content hashing for upload batches.
+
+The rules mirror MessageSchema field by field, and the error kinds use the pydantic error
+type names, so reports read exactly as when each row was validated through the model.
+"""
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+import polars as pl
+
+from src.schemas.content_hash import HASH_VERSION, HEXDIGESTS, LEGACY_HASH_VERSION
+
+FIELDS = ("text", "user_id", "external_id", "timestamp")
+
+# Characters str.strip() removes; Rust's notion of whitespace is slightly narrower
+_WHITESPACE = "".join(chr(c) for c in range(0x3001) if chr(c).isspace())
+
+# Subset of datetime.fromisoformat input recognised without calling into Python;
+# any other non-empty value is checked with fromisoformat itself
+_ISO_DATETIME = (
+    r"^(\d{4})-(\d{2})-(\d{2})"
+    r"(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.\d{1,6})?)?(?:Z|[+-](\d{2}):(\d{2}))?)?$"
+)
+
+
+class RowError(NamedTuple):
+    row: int
+    message: str
+
+
+class BatchReport(NamedTuple):
+    records: pl.DataFrame
+    invalid: int
+    errors: List[RowError]
+    # Version 1 hash of each record, when asked for
+    legacy_hashes: Optional[pl.Series] = None
+
+
+def describe_error(field: str, err_type: str) -> str:
+    msg = f"Поле '{field}' содержит ошибку"
+    solution = "Проверьте корректность данных"
+
+    if field == "text":
+        if err_type in ("string_type", "missing"):
+            msg = "Поле 'text' (текст обращения) не заполнено"
+            solution = "Убедитесь, что в столбце 'text' есть текст обращения"
+        elif "min_length" in err_type or "value_error" in err_type:
+            msg = "Поле 'text' пустое"
+            solution = "Текст обращения не может быть пустым"
+
+    elif field == "timestamp":
+        msg = "Неверный формат даты/времени"
+        solution = "Используйте формат ISO 8601 (например, 2023-12-31T23:59:59)"
+
+    return f"{msg}. Решение: {solution}"
+
+
+def format_row_error(row_num: int, errors: List[Tuple[str, str]]) -> str:
+    messages = [describe_error(field, err_type) for field, err_type in errors]
+    return f"Ошибка валидации в строке {row_num}: {'; '.join(messages)}"
+
+
+def _is_iso_datetime(value: str) -> bool:
+    try:
+        datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return True
+    except ValueError:
+        return False
+
+
+def _null_strings(height: int) -> pl.Series:
+    return pl.Series([None] * height, dtype=pl.String)
+
+
+def _error_where(mask: pl.Series, err_type: str) -> pl.Series:
+    return pl.select(pl.when(mask).then(pl.lit(err_type))).to_series()
+
+
+def _check_text(column: pl.Series) -> Tuple[pl.Series, pl.Series]:
+    if column.dtype != pl.String:
+        return _null_strings(len(column)), pl.Series(["string_type"] * len(column), dtype=pl.String)
+
+    stripped = column.str.strip_chars(_WHITESPACE)
+    errors = pl.select(
+        pl.when(column.is_null()).then(pl.lit("string_type"))
+        .when(column.str.len_chars() == 0).then(pl.lit("string_too_short"))
+        .when(stripped.str.len_chars() == 0).then(pl.lit("value_error"))
+    ).to_series()
+    return stripped, errors
+
+
+def _check_optional_string(column: pl.Series) -> Tuple[pl.Series, pl.Series]:
+    if column.dtype in (pl.String, pl.Null):
+        return column.cast(pl.String), _null_strings(len(column))
+    return _null_strings(len(column)), _error_where(column.is_not_null(), "string_type")
+
+
+def isoformat(column: pl.Series) -> pl.Series:
+    """datetime.isoformat() for a Datetime column: fractional seconds only when non-zero"""
+    offset = "%:z" if column.dtype.time_zone else ""
+    return pl.select(
+        pl.when(column.dt.microsecond() == 0)
+        .then(column.dt.strftime(f"%Y-%m-%dT%H:%M:%S{offset}"))
+        .otherwise(column.dt.strftime(f"%Y-%m-%dT%H:%M:%S%.6f{offset}"))
+    ).to_series()
+
+
+def _check_timestamp(column: pl.Series) -> Tuple[pl.Series, pl.Series]:
+    if column.dtype == pl.Null:
+        return _null_strings(len(column)), _null_strings(len(column))
+    if isinstance(column.dtype, pl.Datetime):
+        return isoformat(column), _null_strings(len(column))
+    if column.dtype != pl.String:
+        return _null_strings(len(column)), _error_where(column.is_not_null(), "string_type")
+
+    values = pl.select(pl.when(column != "").then(column)).to_series()
+    parts = values.str.extract_groups(_ISO_DATETIME)
+    fields = {name: parts.struct.field(str(i)) for i, name in enumerate(
+        ("year", "month", "day", "hour", "minute", "second", "offset_hour", "offset_minute"), 1
+    )}
+    recognised = pl.select(
+        values.str.contains(_ISO_DATETIME)
+        & values.str.slice(0, 10).str.to_date("%Y-%m-%d", strict=False).is_not_null()
+        & (fields["hour"].cast(pl.Int32).fill_null(0) < 24)
+        & (fields["minute"].cast(pl.Int32).fill_null(0) < 60)
+        & (fields["second"].cast(pl.Int32).fill_null(0) < 60)
+        & (fields["offset_hour"].cast(pl.Int32).fill_null(0) < 24)
+        & (fields["offset_minute"].cast(pl.Int32).fill_null(0) < 60)
+    ).to_series().fill_null(False)
+
+    valid = recognised.to_list()
+    for i in (values.is_not_null() & ~recognised).arg_true().to_list():
+        valid[i] = _is_iso_datetime(values[i])
+
+    invalid = pl.Series(valid, dtype=pl.Boolean).not_() & values.is_not_null()
+    errors = _error_where(invalid, "value_error")
+    return values, errors
+
+
+_CHECKS = {
+    "text": _check_text,
+    "user_id": _check_optional_string,
+    "external_id": _check_optional_string,
+    "timestamp": _check_timestamp,
+}
+
+
+def check_batch(df: pl.DataFrame) -> pl.DataFrame:
+    """Normalised MessageSchema fields plus "<field>_error" columns, null where the field is valid.
+
+    "raw_text" keeps the unstripped text because content_hash has always been computed from it.
+    """
+    columns = {"raw_text": df["text"] if df["text"].dtype == pl.String else _null_strings(df.height)}
+    for field in FIELDS:
+        columns[field], columns[f"{field}_error"] = _CHECKS[field](df[field])
+    return pl.DataFrame(columns)
+
+
+def _has_error() -> pl.Expr:
+    return pl.any_horizontal(pl.col(f"{field}_error").is_not_null() for field in FIELDS)
+
+
+def _row_errors(checked: pl.DataFrame) -> List[RowError]:
+    return [
+        RowError(
+            record["row"],
+            format_row_error(
+                record["row"],
+                [(field, record[f"{field}_error"]) for field in FIELDS if record[f"{field}_error"]],
+            ),
+        )
+        for record in checked.iter_rows(named=True)
+    ]
+
+
+def find_row_errors(
+    df: pl.DataFrame, row_offset: int = 0, limit: Optional[int] = None
+) -> List[RowError]:
+    """Report rows that fail MessageSchema validation, numbered from row_offset + 1"""
+    checked = check_batch(df).with_row_index("row", offset=row_offset + 1).filter(_has_error())
+    if limit is not None:
+        checked = checked.head(limit)
+    return _row_errors(checked)
+
+
+def content_hashes(timestamps: pl.Series, texts: pl.Series, version: int = HASH_VERSION) -> pl.Series:
+    """Hash of "{timestamp}_{text lowercased}", built as content_hash_key does.
+
+    The keys are built, lowercased and UTF-8 encoded as whole columns. Neither xxhash nor
+    hashlib hashes more than one buffer per call, so only the digest is taken key by key.
+    """
+    keys = pl.select(
+        pl.concat_str(timestamps, pl.lit("_"), texts.str.to_lowercase()).cast(pl.Binary)
+    ).to_series()
+    return pl.Series(list(map(HEXDIGESTS[version], keys.to_list())), dtype=pl.String)
+
+
+def prepare_batch(
+    df: pl.DataFrame, row_offset: int = 0, max_errors: int = 0, legacy_hashes: bool = False
+) -> BatchReport:
+    """Valid rows normalised for sending, plus the number of invalid rows.
+
+    Missing timestamps are set to now before content_hash is computed. Error messages are
+    formatted for at most max_errors of the invalid rows. With legacy_hashes the version 1
+    hash of every record comes along, for deduplicating against rows stored before version 2.
+    """
+    checked = check_batch(df).with_row_index("row", offset=row_offset + 1)
+    failed = checked.select(_has_error()).to_series()
+    invalid = failed.sum()
+
+    errors = _row_errors(checked.filter(failed).head(max_errors)) if invalid and max_errors else []
+    checked = checked.filter(~failed) if invalid else checked
+
+    timestamps = checked["timestamp"]
+    if timestamps.null_count():
+        missing = timestamps.is_null().arg_true()
+        now = [datetime.now().isoformat() for _ in range(len(missing))]
+        timestamps = timestamps.scatter(missing, now)
+
+    records = pl.DataFrame({
+        "text": checked["text"],
+        "user_id": checked["user_id"],
+        "external_id": checked["external_id"],
+        "timestamp": timestamps,
+        "content_hash": content_hashes(timestamps, checked["raw_text"]),
+    })
+    legacy = None
+    if legacy_hashes:
+        legacy = content_hashes(timestamps, checked["raw_text"], LEGACY_HASH_VERSION)
+    return BatchReport(records, invalid, errors, legacy)
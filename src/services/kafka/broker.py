@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+from functools import cache
+from typing import Self
+from aiokafka import AIOKafkaProducer, AIOKafkaConsumer
+from aiokafka.admin import AIOKafkaAdminClient
+
+
+class Broker(ABC):
+  """Creates the producer, consumer and admin clients KafkaService talks to"""
+
+  @abstractmethod
+  def create_producer(self: Self, **config) -> AIOKafkaProducer:
+    pass
+
+  @abstractmethod
+  def create_consumer(self: Self, *topics: str, **config) -> AIOKafkaConsumer:
+    pass
+
+  @abstractmethod
+  def create_admin(self: Self, **config) -> AIOKafkaAdminClient:
+    pass
+
+
+class KafkaBroker(Broker):
+  def create_producer(self: Self, **config) -> AIOKafkaProducer:
+    return AIOKafkaProducer(**config)
+
+  def create_consumer(self: Self, *topics: str, **config) -> AIOKafkaConsumer:
+    return AIOKafkaConsumer(*topics, **config)
+
+  def create_admin(self: Self, **config) -> AIOKafkaAdminClient:
+    return AIOKafkaAdminClient(**config)
+
+
+@cache
+def get_broker(name: str) -> Broker:
+  """One broker per name, so every client of an in-memory broker shares its topics"""
+  if name == "kafka":
+    return KafkaBroker()
+  if name == "memory":
+    from src.services.kafka.memory_broker import InMemoryBroker
+
+    return InMemoryBroker()
+  raise ValueError(f"Unknown broker: {name}")
@@ -0,0 +1,123 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Optional, Self
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+try:
+  import msgpack
+except ImportError:
+  msgpack = None
+
+
+FORMAT_HEADER = "content-format"
+
+Headers = list[tuple[str, bytes]]
+
+
+class Codec(ABC):
+  name: str
+
+  @abstractmethod
+  def encode(self: Self, value: Any) -> bytes:
+    pass
+
+  @abstractmethod
+  def decode(self: Self, data: bytes) -> Any:
+    pass
+
+
+class JSONCodec(Codec):
+  name = "json"
+
+  def encode(self: Self, value: Any) -> bytes:
+    return json.dumps(value, default=str).encode("utf-8")
+
+  def decode(self: Self, data: bytes) -> Any:
+    return json.loads(data)
+
+
+class OrjsonCodec(Codec):
+  """Wire compatible with JSONCodec, only faster"""
+
+  name = "json"
+
+  def encode(self: Self, value: Any) -> bytes:
+    return orjson.dumps(value, default=str)
+
+  def decode(self: Self, data: bytes) -> Any:
+    return orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+  name = "msgpack"
+
+  def encode(self: Self, value: Any) -> bytes:
+    return msgpack.packb(value, use_bin_type=True, default=str)
+
+  def decode(self: Self, data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False)
+
+
+def get_codec(name: str) -> Codec:
+  """Resolve a codec by setting name: json (stdlib), orjson or msgpack"""
+  if name == "json":
+    return JSONCodec()
+  if name == "orjson":
+    if orjson is None:
+      raise RuntimeError("orjson codec requested but orjson is not installed")
+    return OrjsonCodec()
+  if name == "msgpack":
+    if msgpack is None:
+      raise RuntimeError("msgpack codec requested but msgpack is not installed")
+    return MsgpackCodec()
+  raise ValueError(f"Unknown Kafka message format: {name}")
+
+
+def _fastest_codec(name: str) -> Codec:
+  if name == "json" and orjson is not None:
+    return OrjsonCodec()
+  return get_codec(name)
+
+
+class MessageCodec:
+  """Encodes outgoing values once and decodes incoming ones once, based on the format header"""
+
+  def __init__(self: Self, message_format: str):
+    self.codec = get_codec(message_format)
+    self.decoders: dict[str, Codec] = {}
+
+  def encode(self: Self, value: Any, raw_format: str = "json") -> tuple[bytes, Headers]:
+    """Encode a value; bytes are treated as already serialized in raw_format and passed through"""
+    if isinstance(value, bytes):
+      return value, [(FORMAT_HEADER, raw_format.encode())]
+    return self.codec.encode(value), [(FORMAT_HEADER, self.codec.name.encode())]
+
+  def decode(self: Self, data: bytes, headers: Optional[Headers] = None) -> Any:
+    message_format = None
+    for key, header_value in headers or ():
+      if key == FORMAT_HEADER:
+        message_format = header_value.decode()
+        break
+
+    if message_format is None:
+      return self._decode_legacy(data)
+
+    decoder = self.decoders.get(message_format)
+    if decoder is None:
+      decoder = self.decoders[message_format] = _fastest_codec(message_format)
+    return decoder.decode(data)
+
+  def _decode_legacy(self: Self, data: bytes) -> Any:
+    """Producers without the format header send JSON, sometimes a JSON encoded JSON string"""
+    decoder = self.decoders.get("json")
+    if decoder is None:
+      decoder = self.decoders["json"] = _fastest_codec("json")
+
+    value = decoder.decode(data)
+    if isinstance(value, str):
+      value = decoder.decode(value)
+    return value
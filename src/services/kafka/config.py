@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import SecretStr
+from typing import Literal, Optional
 
 
 class KafkaSettings(BaseSettings):
@@ -14,6 +15,35 @@ class KafkaSettings(BaseSettings):
   topic_in: str
   topic_out: str
 
+  broker: Literal["kafka", "memory"] = "kafka"
+  message_format: str = "json"
+
+  producer_linger_ms: int = 20
+  producer_max_batch_size: int = 262144
+  producer_compression_type: Optional[Literal["gzip", "snappy", "lz4", "zstd"]] = None
+  producer_acks: Literal["0", "1", "all"] = "1"
+
+  consumer_batch_size: int = 5000
+  consumer_batch_linger_ms: int = 200
+  consumer_idle_poll_ms: int = 1000
+  consumer_queue_size: int = 10000
+
+  ingest_target_latency_ms: int = 1000
+  ingest_max_pool_wait_ms: int = 50
+  ingest_max_queue_depth: int = 50000
+  ingest_min_pause_ms: int = 500
+
+  dlq_topic: Optional[str] = None
+  retry_max_attempts: int = 5
+  retry_backoff_initial_ms: int = 200
+  retry_backoff_max_ms: int = 10000
+
+  def get_dlq_topic(self) -> str:
+    return self.dlq_topic or f"{self.topic_in}.dlq"
+
+  def get_producer_acks(self) -> int | str:
+    return self.producer_acks if self.producer_acks == "all" else int(self.producer_acks)
+
   model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
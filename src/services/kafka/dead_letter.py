@@ -0,0 +1,146 @@
+import asyncio
+import random
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Awaitable, Callable, Self, TypeVar
+from aiokafka import TopicPartition
+from aiokafka.structs import ConsumerRecord
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from src.services.kafka.config import kafka_settings
+
+if TYPE_CHECKING:
+  from src.services.kafka.service import KafkaService
+
+T = TypeVar("T")
+
+DLQ_HEADER_PREFIX = "x-dlq-"
+
+
+def is_transient_error(error: BaseException) -> bool:
+  """Errors worth retrying: lost connections, pool timeouts, database restarts"""
+  if isinstance(error, (OperationalError, InterfaceError, ConnectionError, TimeoutError)):
+    return True
+  return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+async def retry_transient(operation: Callable[[], Awaitable[T]]) -> T:
+  """Run operation, retrying transient errors with exponential backoff and jitter"""
+  delay = kafka_settings.retry_backoff_initial_ms / 1000
+  max_delay = kafka_settings.retry_backoff_max_ms / 1000
+
+  for attempt in range(1, kafka_settings.retry_max_attempts + 1):
+    try:
+      return await operation()
+    except Exception as e:
+      if not is_transient_error(e) or attempt == kafka_settings.retry_max_attempts:
+        raise
+      print(f"Transient error (attempt {attempt}/{kafka_settings.retry_max_attempts}): {e}")
+      await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+      delay = min(delay * 2, max_delay)
+
+
+class DeadLetterQueue:
+  """Isolates records that cannot be ingested in <topic_in>.dlq and replays them on demand"""
+
+  def __init__(self: Self, service: "KafkaService"):
+    self.service = service
+
+  @property
+  def topic(self: Self) -> str:
+    return kafka_settings.get_dlq_topic()
+
+  async def send(self: Self, failures: list[tuple[ConsumerRecord, BaseException]], attempts: int = 1):
+    """Publish failed records with error metadata; raises if the DLQ itself is unavailable"""
+    if not failures:
+      return
+    if not self.service.producer:
+      raise RuntimeError("Producer not initialized. Call start_producer() first.")
+
+    failed_at = datetime.now(timezone.utc).isoformat().encode()
+    deliveries = []
+    for record, error in failures:
+      headers = [
+        *(record.headers or ()),
+        (f"{DLQ_HEADER_PREFIX}topic", record.topic.encode()),
+        (f"{DLQ_HEADER_PREFIX}partition", str(record.partition).encode()),
+        (f"{DLQ_HEADER_PREFIX}offset", str(record.offset).encode()),
+        (f"{DLQ_HEADER_PREFIX}error-type", type(error).__name__.encode()),
+        (f"{DLQ_HEADER_PREFIX}error-message", str(error)[:1000].encode()),
+        (f"{DLQ_HEADER_PREFIX}attempts", str(attempts).encode()),
+        (f"{DLQ_HEADER_PREFIX}failed-at", failed_at),
+      ]
+      deliveries.append(
+        await self.service.producer.send(self.topic, record.value, key=record.key, headers=headers)
+      )
+
+    await asyncio.gather(*deliveries)
+    print(f"Sent {len(failures)} records to '{self.topic}': {failures[0][1]}")
+
+  async def replay(self: Self, limit: int) -> int:
+    """Re-publish up to limit dead-lettered records to their original topic.
+
+    Only records present when the replay starts are read, so records failing again are not
+    picked up by the same replay. Offsets are committed once the re-publish is acknowledged.
+    """
+    if not self.service.producer:
+      raise RuntimeError("Producer not initialized. Call start_producer() first.")
+
+    consumer = self.service.broker.create_consumer(
+      **self.service._get_connection_config(),
+      group_id=f"{kafka_settings.consumer_group_id}.dlq-replay",
+      auto_offset_reset="earliest",
+      enable_auto_commit=False,
+    )
+    await consumer.start()
+    try:
+      await consumer.topics()
+      partitions = [
+        TopicPartition(self.topic, partition)
+        for partition in consumer.partitions_for_topic(self.topic) or ()
+      ]
+      if not partitions:
+        return 0
+
+      consumer.assign(partitions)
+      end_offsets = await consumer.end_offsets(partitions)
+      remaining = {tp for tp in partitions if await consumer.position(tp) < end_offsets[tp]}
+
+      replayed = 0
+      while remaining and replayed < limit:
+        polled = await consumer.getmany(
+          *remaining, timeout_ms=1000, max_records=min(limit - replayed, 5000)
+        )
+        if not polled:
+          break
+
+        deliveries = []
+        offsets: dict[TopicPartition, int] = {}
+        for tp, records in polled.items():
+          for record in records:
+            if record.offset >= end_offsets[tp]:
+              remaining.discard(tp)
+              break
+            deliveries.append(await self._republish(record))
+            offsets[tp] = record.offset + 1
+            if offsets[tp] >= end_offsets[tp]:
+              remaining.discard(tp)
+
+        await asyncio.gather(*deliveries)
+        if offsets:
+          await consumer.commit(offsets)
+        replayed += len(deliveries)
+
+      return replayed
+    finally:
+      await consumer.stop()
+
+  async def _republish(self: Self, record: ConsumerRecord) -> asyncio.Future:
+    topic = kafka_settings.topic_in
+    headers = []
+    for key, value in record.headers or ():
+      if key == f"{DLQ_HEADER_PREFIX}topic":
+        topic = value.decode()
+      elif not key.startswith(DLQ_HEADER_PREFIX):
+        headers.append((key, value))
+
+    return await self.service.producer.send(topic, record.value, key=record.key, headers=headers)
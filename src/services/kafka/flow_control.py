@@ -0,0 +1,95 @@
+import time
+from typing import Optional, Self
+from aiokafka import AIOKafkaConsumer
+
+from src.database.database import engine
+from src.services.kafka.config import kafka_settings
+from src.services.kafka.workers import PartitionWorkerPool
+
+EWMA_ALPHA = 0.3
+
+
+def _ewma(current: Optional[float], sample: float) -> float:
+  return sample if current is None else current + EWMA_ALPHA * (sample - current)
+
+
+class FlowController:
+  """Pauses ingest while the database is the bottleneck so interactive requests keep the pool.
+
+  Workers report pool checkout wait and insert latency per batch. When either smoothed value
+  exceeds its target, or too many records are queued, every assigned partition is paused. The
+  partitions resume after ingest_min_pause_ms once the signals are back under target, or as soon
+  as the queues have drained, since the measurements that caused the pause are then stale.
+  """
+
+  def __init__(self: Self, workers: PartitionWorkerPool):
+    self.workers = workers
+    self.insert_latency_ms: Optional[float] = None
+    self.pool_wait_ms: Optional[float] = None
+    self.throttled = False
+    self.throttled_since: Optional[float] = None
+    self.throttle_count = 0
+
+  def record_batch(self: Self, pool_wait: float, insert_latency: float):
+    self.pool_wait_ms = _ewma(self.pool_wait_ms, pool_wait * 1000)
+    self.insert_latency_ms = _ewma(self.insert_latency_ms, insert_latency * 1000)
+
+  def queue_depth(self: Self) -> int:
+    return sum(worker.queue.qsize() for worker in self.workers.workers.values())
+
+  def _overloaded(self: Self) -> bool:
+    return (
+      (self.insert_latency_ms or 0) > kafka_settings.ingest_target_latency_ms
+      or (self.pool_wait_ms or 0) > kafka_settings.ingest_max_pool_wait_ms
+      or self.queue_depth() > kafka_settings.ingest_max_queue_depth
+    )
+
+  def update(self: Self, consumer: AIOKafkaConsumer):
+    """Pause or resume assigned partitions according to the current signals"""
+    now = time.monotonic()
+
+    if not self.throttled:
+      if self._overloaded():
+        self.throttled = self.workers.throttled = True
+        self.throttled_since = now
+        self.throttle_count += 1
+        consumer.pause(*consumer.assignment())
+      return
+
+    if (now - self.throttled_since) * 1000 < kafka_settings.ingest_min_pause_ms:
+      return
+    if self._overloaded() and self.queue_depth() > 0:
+      return
+
+    self.throttled = self.workers.throttled = False
+    self.throttled_since = None
+    consumer.resume(*(tp for tp, worker in self.workers.workers.items() if not worker.paused))
+
+  def state(self: Self, consumer: Optional[AIOKafkaConsumer]) -> dict:
+    pool = engine.pool
+    return {
+      "throttled": self.throttled,
+      "throttled_for_ms": (
+        (time.monotonic() - self.throttled_since) * 1000 if self.throttled_since else 0.0
+      ),
+      "throttle_count": self.throttle_count,
+      "insert_latency_ms": self.insert_latency_ms,
+      "pool_wait_ms": self.pool_wait_ms,
+      "target_latency_ms": kafka_settings.ingest_target_latency_ms,
+      "max_pool_wait_ms": kafka_settings.ingest_max_pool_wait_ms,
+      "pool": {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+      },
+      "partitions": [
+        {
+          "topic": tp.topic,
+          "partition": tp.partition,
+          "queue_depth": worker.queue.qsize(),
+          "queue_full": worker.paused,
+          "paused": consumer is not None and tp in consumer.paused(),
+        }
+        for tp, worker in sorted(self.workers.workers.items())
+      ],
+    }
@@ -0,0 +1,366 @@
+import asyncio
+import itertools
+import time
+import zlib
+from typing import Iterable, Optional, Self
+from aiokafka import ConsumerRebalanceListener, TopicPartition
+from aiokafka.admin import NewTopic
+from aiokafka.errors import TopicAlreadyExistsError
+from aiokafka.structs import ConsumerRecord, OffsetAndTimestamp, RecordMetadata
+
+from src.services.kafka.broker import Broker
+
+DEFAULT_PARTITIONS = 3
+
+
+class _Group:
+  def __init__(self: Self):
+    self.members: list["InMemoryConsumer"] = []
+    self.committed: dict[TopicPartition, int] = {}
+    self.lock = asyncio.Lock()
+
+
+class InMemoryBroker(Broker):
+  """In-process stand-in for a Kafka cluster: partitioned topics, consumer groups and offsets.
+
+  Implements the subset of the aiokafka client API KafkaService uses, so the same producer and
+  consumer code runs against it for offline load testing. Nothing is persisted.
+  """
+
+  def __init__(self: Self, default_partitions: int = DEFAULT_PARTITIONS):
+    self.default_partitions = default_partitions
+    self.topics: dict[str, list[list[ConsumerRecord]]] = {}
+    self.groups: dict[str, _Group] = {}
+    self._changed = asyncio.Event()
+    self._member_ids = itertools.count()
+
+  def create_producer(self: Self, **config) -> "InMemoryProducer":
+    return InMemoryProducer(self)
+
+  def create_consumer(self: Self, *topics: str, **config) -> "InMemoryConsumer":
+    return InMemoryConsumer(self, *topics, **config)
+
+  def create_admin(self: Self, **config) -> "InMemoryAdmin":
+    return InMemoryAdmin(self)
+
+  def create_topic(self: Self, topic: str, num_partitions: Optional[int] = None) -> bool:
+    if topic in self.topics:
+      return False
+    self.topics[topic] = [[] for _ in range(num_partitions or self.default_partitions)]
+    return True
+
+  def partitions(self: Self, topic: str) -> list[list[ConsumerRecord]]:
+    self.create_topic(topic)
+    return self.topics[topic]
+
+  def group(self: Self, group_id: str) -> _Group:
+    if group_id not in self.groups:
+      self.groups[group_id] = _Group()
+    return self.groups[group_id]
+
+  def notify(self: Self):
+    """Wake every consumer waiting in getmany"""
+    self._changed.set()
+    self._changed = asyncio.Event()
+
+  async def wait_for_change(self: Self, timeout: float):
+    try:
+      await asyncio.wait_for(self._changed.wait(), timeout)
+    except TimeoutError:
+      pass
+
+  def append(
+    self: Self,
+    topic: str,
+    value: Optional[bytes],
+    key: Optional[bytes],
+    partition: Optional[int],
+    timestamp_ms: Optional[int],
+    headers: Optional[list[tuple[str, bytes]]],
+  ) -> RecordMetadata:
+    partitions = self.partitions(topic)
+    if partition is None:
+      if key is not None:
+        partition = zlib.crc32(key) % len(partitions)
+      else:
+        partition = min(range(len(partitions)), key=lambda p: len(partitions[p]))
+
+    log = partitions[partition]
+    timestamp = timestamp_ms if timestamp_ms is not None else int(time.time() * 1000)
+    log.append(
+      ConsumerRecord(
+        topic=topic,
+        partition=partition,
+        offset=len(log),
+        timestamp=timestamp,
+        timestamp_type=0,
+        key=key,
+        value=value,
+        checksum=None,
+        serialized_key_size=len(key) if key is not None else -1,
+        serialized_value_size=len(value) if value is not None else -1,
+        headers=tuple(headers or ()),
+      )
+    )
+    self.notify()
+
+    tp = TopicPartition(topic, partition)
+    return RecordMetadata(
+      topic=topic,
+      partition=partition,
+      topic_partition=tp,
+      offset=len(log) - 1,
+      timestamp=timestamp,
+      timestamp_type=0,
+      log_start_offset=0,
+    )
+
+  async def join(self: Self, consumer: "InMemoryConsumer"):
+    group = self.group(consumer.group_id)
+    group.members.append(consumer)
+    await self.rebalance(group)
+
+  async def leave(self: Self, consumer: "InMemoryConsumer"):
+    group = self.group(consumer.group_id)
+    if consumer in group.members:
+      group.members.remove(consumer)
+      consumer._assignment = set()
+      await self.rebalance(group)
+
+  async def rebalance(self: Self, group: _Group):
+    """Revoke everything, then spread each subscribed topic's partitions across its members"""
+    async with group.lock:
+      for member in group.members:
+        await member._revoke()
+
+      assignments: dict[InMemoryConsumer, set[TopicPartition]] = {m: set() for m in group.members}
+      topics = sorted({topic for member in group.members for topic in member._subscription})
+      for topic in topics:
+        members = [member for member in group.members if topic in member._subscription]
+        for partition in range(len(self.partitions(topic))):
+          assignments[members[partition % len(members)]].add(TopicPartition(topic, partition))
+
+      for member, partitions in assignments.items():
+        await member._assign(partitions)
+
+
+class InMemoryProducer:
+  def __init__(self: Self, broker: InMemoryBroker):
+    self.broker = broker
+
+  async def start(self: Self):
+    pass
+
+  async def stop(self: Self):
+    pass
+
+  async def flush(self: Self):
+    pass
+
+  async def send(
+    self: Self,
+    topic: str,
+    value: Optional[bytes] = None,
+    key: Optional[bytes] = None,
+    partition: Optional[int] = None,
+    timestamp_ms: Optional[int] = None,
+    headers: Optional[list[tuple[str, bytes]]] = None,
+  ) -> asyncio.Future:
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(self.broker.append(topic, value, key, partition, timestamp_ms, headers))
+    return future
+
+  async def send_and_wait(self: Self, topic: str, *args, **kwargs) -> RecordMetadata:
+    return await (await self.send(topic, *args, **kwargs))
+
+
+class InMemoryConsumer:
+  def __init__(
+    self: Self,
+    broker: InMemoryBroker,
+    *topics: str,
+    group_id: Optional[str] = None,
+    auto_offset_reset: str = "latest",
+    **config,
+  ):
+    self.broker = broker
+    self.group_id = group_id
+    self.auto_offset_reset = auto_offset_reset
+    self.member_id = next(broker._member_ids)
+
+    self._subscription: set[str] = set(topics)
+    self._listener: Optional[ConsumerRebalanceListener] = None
+    self._assignment: set[TopicPartition] = set()
+    self._positions: dict[TopicPartition, int] = {}
+    self._paused: set[TopicPartition] = set()
+    self._started = False
+
+  def subscribe(
+    self: Self, topics: Iterable[str], listener: Optional[ConsumerRebalanceListener] = None
+  ):
+    self._subscription = set(topics)
+    self._listener = listener
+
+  def assign(self: Self, partitions: Iterable[TopicPartition]):
+    self._subscription = set()
+    self._assignment = set(partitions)
+    for tp in self._assignment:
+      self._positions[tp] = self._initial_position(tp)
+
+  async def start(self: Self):
+    self._started = True
+    if self._subscription:
+      for topic in self._subscription:
+        self.broker.partitions(topic)
+      await self.broker.join(self)
+
+  async def stop(self: Self):
+    if self._started and self._subscription:
+      await self.broker.leave(self)
+    self._started = False
+
+  async def _revoke(self: Self):
+    if self._listener and self._assignment:
+      await self._listener.on_partitions_revoked(set(self._assignment))
+    self._assignment = set()
+    self._paused = set()
+
+  async def _assign(self: Self, partitions: set[TopicPartition]):
+    self._assignment = partitions
+    for tp in partitions:
+      self._positions[tp] = self._initial_position(tp)
+    if self._listener:
+      await self._listener.on_partitions_assigned(set(partitions))
+    self.broker.notify()
+
+  def _initial_position(self: Self, tp: TopicPartition) -> int:
+    if self.group_id is not None:
+      committed = self.broker.group(self.group_id).committed.get(tp)
+      if committed is not None:
+        return committed
+    if self.auto_offset_reset == "earliest":
+      return 0
+    return len(self.broker.partitions(tp.topic)[tp.partition])
+
+  def _fetch(self: Self, partitions: Iterable[TopicPartition], max_records: Optional[int]):
+    result: dict[TopicPartition, list[ConsumerRecord]] = {}
+    budget = max_records
+
+    for tp in sorted(partitions):
+      if budget is not None and budget <= 0:
+        break
+      if tp in self._paused or tp not in self._assignment:
+        continue
+
+      log = self.broker.partitions(tp.topic)[tp.partition]
+      position = self._positions[tp]
+      records = log[position : None if budget is None else position + budget]
+      if records:
+        result[tp] = records
+        self._positions[tp] = position + len(records)
+        if budget is not None:
+          budget -= len(records)
+
+    return result
+
+  async def getmany(
+    self: Self, *partitions: TopicPartition, timeout_ms: int = 0, max_records: Optional[int] = None
+  ) -> dict[TopicPartition, list[ConsumerRecord]]:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_ms / 1000
+
+    while True:
+      result = self._fetch(partitions or self._assignment, max_records)
+      remaining = deadline - loop.time()
+      if result or remaining <= 0:
+        return result
+      await self.broker.wait_for_change(remaining)
+
+  def __aiter__(self: Self):
+    return self
+
+  async def __anext__(self: Self) -> ConsumerRecord:
+    while True:
+      polled = await self.getmany(timeout_ms=1000, max_records=1)
+      for records in polled.values():
+        return records[0]
+
+  async def commit(self: Self, offsets: Optional[dict[TopicPartition, int]] = None):
+    if self.group_id is None:
+      raise RuntimeError("Commit requires a group_id")
+    if offsets is None:
+      offsets = {tp: self._positions[tp] for tp in self._assignment}
+    self.broker.group(self.group_id).committed.update(offsets)
+
+  async def committed(self: Self, tp: TopicPartition) -> Optional[int]:
+    if self.group_id is None:
+      return None
+    return self.broker.group(self.group_id).committed.get(tp)
+
+  async def position(self: Self, tp: TopicPartition) -> int:
+    return self._positions[tp]
+
+  def seek(self: Self, tp: TopicPartition, offset: int):
+    self._positions[tp] = offset
+    self.broker.notify()
+
+  async def seek_to_beginning(self: Self, *partitions: TopicPartition):
+    for tp in partitions or self._assignment:
+      self.seek(tp, 0)
+
+  def pause(self: Self, *partitions: TopicPartition):
+    self._paused.update(partitions)
+
+  def resume(self: Self, *partitions: TopicPartition):
+    self._paused.difference_update(partitions)
+    self.broker.notify()
+
+  def paused(self: Self) -> set[TopicPartition]:
+    return set(self._paused)
+
+  def assignment(self: Self) -> set[TopicPartition]:
+    return set(self._assignment)
+
+  def subscription(self: Self) -> set[str]:
+    return set(self._subscription)
+
+  async def topics(self: Self) -> set[str]:
+    return set(self.broker.topics)
+
+  def partitions_for_topic(self: Self, topic: str) -> Optional[set[int]]:
+    if topic not in self.broker.topics:
+      return None
+    return set(range(len(self.broker.topics[topic])))
+
+  async def beginning_offsets(self: Self, partitions: Iterable[TopicPartition]):
+    return {tp: 0 for tp in partitions}
+
+  async def end_offsets(self: Self, partitions: Iterable[TopicPartition]):
+    return {tp: len(self.broker.partitions(tp.topic)[tp.partition]) for tp in partitions}
+
+  async def offsets_for_times(self: Self, timestamps: dict[TopicPartition, int]):
+    result: dict[TopicPartition, Optional[OffsetAndTimestamp]] = {}
+    for tp, timestamp in timestamps.items():
+      log = self.broker.partitions(tp.topic)[tp.partition]
+      match = next((record for record in log if record.timestamp >= timestamp), None)
+      result[tp] = OffsetAndTimestamp(match.offset, match.timestamp) if match else None
+    return result
+
+
+class InMemoryAdmin:
+  def __init__(self: Self, broker: InMemoryBroker):
+    self.broker = broker
+
+  async def start(self: Self):
+    pass
+
+  async def close(self: Self):
+    pass
+
+  async def list_topics(self: Self) -> list[str]:
+    return list(self.broker.topics)
+
+  async def create_topics(self: Self, new_topics: list[NewTopic], **kwargs):
+    for topic in new_topics:
+      if not self.broker.create_topic(topic.name, topic.num_partitions):
+        raise TopicAlreadyExistsError(f"Topic '{topic.name}' already exists")
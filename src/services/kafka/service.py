@@ -1,20 +1,61 @@
-import json
-from typing import AsyncGenerator, Optional, Self
-from aiokafka import AIOKafkaProducer, AIOKafkaConsumer, TopicPartition
+import asyncio
+from typing import AsyncGenerator, NamedTuple, Optional, Self
+from aiokafka import AIOKafkaProducer, AIOKafkaConsumer
 from aiokafka.admin import AIOKafkaAdminClient, NewTopic
 from aiokafka.errors import TopicAlreadyExistsError
-from src.database.database import AsyncSessionLocal
+from aiokafka.structs import ConsumerRecord
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.api.message.service import MessageService
 from src.api.message.schemas import MessageCreate
+from src.schemas import compute_content_hash, content_hash_key
 
 from src.services import kafka_settings
+from src.services.dedup import dedup_index
+from src.services.kafka.broker import Broker, get_broker
+from src.services.kafka.codec import MessageCodec
+from src.services.kafka.flow_control import FlowController
+from src.services.kafka.dead_letter import DeadLetterQueue, is_transient_error, retry_transient
+from src.services.kafka.workers import IngestRebalanceListener, PartitionWorkerPool
+
+
+class DeliveryStats(NamedTuple):
+  sent: int
+  failed: int
+  errors: list[str]
+  # Positions in the sent list of the messages that were not delivered
+  failed_indexes: list[int]
+
+  @property
+  def ok(self) -> bool:
+    return self.failed == 0
+
+
+def message_from_payload(payload: dict) -> MessageCreate:
+  """Validate a decoded record, filling in content_hash when the producer left it out.
+
+  The hash is built as the upload pipeline builds it, from event_date as sent, so a redelivered
+  record conflicts with its first insert instead of being stored again.
+  """
+  message = MessageCreate(**payload)
+  if message.content_hash is None:
+    event_date = payload["event_date"]
+    timestamp = event_date if isinstance(event_date, str) else message.event_date.isoformat()
+    message.content_hash = compute_content_hash(content_hash_key(timestamp, message.text))
+  return message
 
 
 class KafkaService:
-  def __init__(self: Self):
+  def __init__(self: Self, broker: Optional[Broker] = None):
+    self.broker = broker or get_broker(kafka_settings.broker)
     self.producer: Optional[AIOKafkaProducer] = None
     self.consumer: Optional[AIOKafkaConsumer] = None
     self.admin: Optional[AIOKafkaAdminClient] = None
+    self.codec = MessageCodec(kafka_settings.message_format)
+    self.dlq = DeadLetterQueue(self)
+    self.workers = PartitionWorkerPool(self._save_batch)
+    self.flow = FlowController(self.workers)
+    self.ingest_task: Optional[asyncio.Task] = None
 
   def _get_connection_config(self: Self) -> dict:
     """Get common connection config for Kafka clients"""
@@ -29,7 +70,7 @@ class KafkaService:
   async def _ensure_admin(self: Self):
     """Ensure admin client is started"""
     if not self.admin:
-      self.admin = AIOKafkaAdminClient(**self._get_connection_config())
+      self.admin = self.broker.create_admin(**self._get_connection_config())
       await self.admin.start()
 
   async def ensure_topic_exists(
@@ -58,80 +99,189 @@ class KafkaService:
       print(f"Error creating topic '{topic}': {e}")
     finally:
       await self.admin.close()
+      self.admin = None
 
   async def start_producer(self: Self):
     producer_config = {
       **self._get_connection_config(),
-      "value_serializer": lambda v: json.dumps(v).encode("utf-8"),
+      "linger_ms": kafka_settings.producer_linger_ms,
+      "max_batch_size": kafka_settings.producer_max_batch_size,
+      "compression_type": kafka_settings.producer_compression_type,
+      "acks": kafka_settings.get_producer_acks(),
     }
 
-    self.producer = AIOKafkaProducer(**producer_config)
+    self.producer = self.broker.create_producer(**producer_config)
     await self.producer.start()
 
   async def start_consumer(self: Self, topics: list[str]):
-    for topic in topics:
+    for topic in [*topics, kafka_settings.get_dlq_topic()]:
       await self.ensure_topic_exists(topic)
 
     consumer_config = {
       **self._get_connection_config(),
       "group_id": kafka_settings.consumer_group_id,
       "auto_offset_reset": "earliest",
-      "enable_auto_commit": True,
-      "value_deserializer": lambda v: json.loads(v.decode("utf-8")),
+      "enable_auto_commit": False,
     }
 
-    self.consumer = AIOKafkaConsumer(*topics, **consumer_config)
+    self.consumer = self.broker.create_consumer(**consumer_config)
+    self.workers.bind(self.consumer)
+    self.consumer.subscribe(topics, listener=IngestRebalanceListener(self.workers))
     await self.consumer.start()
 
-  async def send_message(self: Self, topic: str, message: dict):
+  async def send_message(self: Self, topic: str, message: dict | bytes):
+    """Send one message; bytes are sent as pre-serialized JSON without re-encoding"""
     if not self.producer:
       raise RuntimeError("Producer not initialized. Call start_producer() first.")
 
-    await self.producer.send_and_wait(topic, message)
+    value, headers = self.codec.encode(message)
+    await self.producer.send_and_wait(topic, value, headers=headers)
+
+  async def send_messages(
+    self: Self,
+    topic: str,
+    messages: list[dict | bytes],
+    keys: Optional[list[Optional[str]]] = None,
+  ) -> DeliveryStats:
+    """Enqueue all messages at once and wait for every delivery together.
 
-  async def send_messages(self: Self, topic: str, messages: list[str]):
-    """Send multiple messages to Kafka efficiently"""
+    Messages are keyed by user_id (taken from dict messages unless keys are given), so each
+    user's messages stay ordered on one partition.
+    """
     if not self.producer:
       raise RuntimeError("Producer not initialized. Call start_producer() first.")
 
-    for message in messages:
-        # If message is already a string (JSON), we might want to bypass serializer or pass it as is if serializer handles it.
-        # But serializer is fixed to json.dumps.
-        # If we pass a dict, it works.
-        # If FilesService passes strings, we should probably parse them back or change FilesService to pass dicts.
-        await self.producer.send(topic, message)
-    
-    await self.producer.flush()
+    if keys is None:
+      keys = [message.get("user_id") if isinstance(message, dict) else None for message in messages]
+
+    deliveries = []
+    enqueued: list[int] = []
+    errors: list[str] = []
+    failed_indexes: list[int] = []
+    for index, (message, key) in enumerate(zip(messages, keys)):
+      value, headers = self.codec.encode(message)
+      try:
+        deliveries.append(
+          await self.producer.send(
+            topic, value, key=key.encode() if key is not None else None, headers=headers
+          )
+        )
+        enqueued.append(index)
+      except Exception as e:
+        errors.append(str(e))
+        failed_indexes.append(index)
+
+    results = await asyncio.gather(*deliveries, return_exceptions=True)
+    for index, result in zip(enqueued, results):
+      if isinstance(result, BaseException):
+        errors.append(str(result))
+        failed_indexes.append(index)
+
+    return DeliveryStats(
+      sent=len(messages) - len(errors),
+      failed=len(errors),
+      errors=errors,
+      failed_indexes=sorted(failed_indexes),
+    )
 
   async def consume_messages(self: Self) -> AsyncGenerator[dict, None]:
     if not self.consumer:
       raise RuntimeError("Consumer not initialized. Call start_consumer() first.")
 
     async for message in self.consumer:
-      yield message.value
+      yield self.codec.decode(message.value, message.headers)
+
+  def start_ingest(self: Self):
+    self.ingest_task = asyncio.create_task(self.consume_and_save_messages())
 
   async def consume_and_save_messages(self: Self):
-    """Consume messages and save them to the database"""
+    """Fetch records and dispatch them to the per-partition ingest workers"""
     if not self.consumer:
       raise RuntimeError("Consumer not initialized. Call start_consumer() first.")
 
-    async for message in self.consumer:
-      if message.topic != kafka_settings.topic_in:
+    while True:
+      timeout_ms = kafka_settings.consumer_idle_poll_ms
+      if self.flow.throttled:
+        timeout_ms = min(timeout_ms, kafka_settings.ingest_min_pause_ms)
+
+      polled = await self.consumer.getmany(
+        timeout_ms=timeout_ms, max_records=kafka_settings.consumer_batch_size
+      )
+      for tp, records in polled.items():
+        self.workers.dispatch(tp, records)
+
+      self.flow.update(self.consumer)
+
+  def get_flow_state(self: Self) -> dict:
+    return self.flow.state(self.consumer)
+
+  async def _save_batch(self: Self, session: AsyncSession, records: list[ConsumerRecord]):
+    """Validate records as a group and insert them in one statement.
+
+    Records that cannot be decoded or validated go to the DLQ. Transient database errors are
+    retried with backoff and then raised, so the partition worker keeps retrying the batch
+    without committing it; a batch rejected for any other reason is split up so only the
+    offending rows are dead-lettered. Nothing is dead-lettered until the batch is through, so a
+    retried batch does not publish its bad records twice.
+    """
+    messages: list[MessageCreate] = []
+    sources: list[ConsumerRecord] = []
+    failures: list[tuple[ConsumerRecord, BaseException]] = []
+
+    for record in records:
+      if record.topic != kafka_settings.topic_in:
         continue
 
-      tp = TopicPartition(message.topic, message.partition)
       try:
-        message_data = json.loads(message.value)
-        async with AsyncSessionLocal() as session:
-          msg_create = MessageCreate(**message_data)
-          print(message_data)
-          await MessageService.create_message(session, msg_create)
+        messages.append(message_from_payload(self.codec.decode(record.value, record.headers)))
+        sources.append(record)
+      except (ValueError, TypeError, ValidationError) as e:
+        failures.append((record, e))
+
+    if messages:
+      try:
+        await retry_transient(lambda: self._insert_messages(session, messages))
+      except Exception as e:
+        if is_transient_error(e):
+          raise
+        failures.extend(await self._insert_isolated(session, messages, sources))
+
+    await self.dlq.send(failures)
+
+  async def _insert_messages(self: Self, session: AsyncSession, messages: list[MessageCreate]):
+    loop = asyncio.get_running_loop()
+    try:
+      started = loop.time()
+      await session.connection()
+      acquired = loop.time()
+
+      result = await MessageService.create_messages(session, messages)
+      self.flow.record_batch(pool_wait=acquired - started, insert_latency=loop.time() - acquired)
+      dedup_index.add(message.content_hash for message in messages)
+      return result
+    except Exception:
+      await session.rollback()
+      raise
 
-          await self.consumer.commit({tp: message.offset + 1})
+  async def _insert_isolated(
+    self: Self, session: AsyncSession, messages: list[MessageCreate], sources: list[ConsumerRecord]
+  ) -> list[tuple[ConsumerRecord, BaseException]]:
+    """Insert a rejected batch row by row, returning the rows that fail for bad data"""
+    failures: list[tuple[ConsumerRecord, BaseException]] = []
+    for message, record in zip(messages, sources):
+      try:
+        await retry_transient(lambda message=message: self._insert_messages(session, [message]))
       except Exception as e:
-        print(f"Error processing Kafka message: {e}")
+        if is_transient_error(e):
+          raise
+        failures.append((record, e))
+
+    return failures
 
   async def close(self: Self):
+    if self.ingest_task:
+      self.ingest_task.cancel()
+    await self.workers.stop_all()
     if self.producer:
       await self.producer.stop()
     if self.consumer:
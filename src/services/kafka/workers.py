@@ -0,0 +1,193 @@
+import asyncio
+from typing import Awaitable, Callable, Optional, Self
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener, TopicPartition
+from aiokafka.structs import ConsumerRecord
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database.database import AsyncSessionLocal
+
+from src.services.kafka.config import kafka_settings
+
+BatchHandler = Callable[[AsyncSession, list[ConsumerRecord]], Awaitable[None]]
+
+_STOP = object()
+
+
+class PartitionWorker:
+  """Owns one assigned partition: a bounded queue, a DB session and its offset commits"""
+
+  def __init__(
+    self: Self,
+    tp: TopicPartition,
+    consumer: AIOKafkaConsumer,
+    handler: BatchHandler,
+    is_throttled: Callable[[], bool],
+  ):
+    self.tp = tp
+    self.consumer = consumer
+    self.handler = handler
+    self.is_throttled = is_throttled
+    self.queue: asyncio.Queue = asyncio.Queue(maxsize=kafka_settings.consumer_queue_size)
+    self.paused = False
+    self.stopping = False
+    self.task: Optional[asyncio.Task] = None
+
+  def start(self: Self):
+    self.task = asyncio.create_task(self._run(), name=f"ingest-{self.tp.topic}-{self.tp.partition}")
+
+  async def stop(self: Self):
+    """Flush everything already queued, commit its offsets and stop the worker.
+
+    A batch that fails at this point ends the flush, leaving it and the records after it
+    uncommitted.
+    """
+    if not self.task:
+      return
+    self.stopping = True
+    await self.queue.put(_STOP)
+    await self.task
+    self.task = None
+
+  def offer(self: Self, records: list[ConsumerRecord]) -> int:
+    """Queue as many records as fit, return how many were accepted"""
+    accepted = 0
+    for record in records:
+      try:
+        self.queue.put_nowait(record)
+      except asyncio.QueueFull:
+        break
+      accepted += 1
+    return accepted
+
+  def _resume_if_drained(self: Self):
+    if self.paused and self.queue.qsize() <= self.queue.maxsize // 2:
+      self.paused = False
+      if not self.is_throttled():
+        self.consumer.resume(self.tp)
+
+  async def _next_batch(self: Self) -> tuple[list[ConsumerRecord], bool]:
+    """Wait for the first record, then collect until the batch is full or the linger expires"""
+    loop = asyncio.get_running_loop()
+
+    record = await self.queue.get()
+    if record is _STOP:
+      return [], True
+
+    records = [record]
+    deadline = loop.time() + kafka_settings.consumer_batch_linger_ms / 1000
+
+    while len(records) < kafka_settings.consumer_batch_size:
+      try:
+        record = self.queue.get_nowait()
+      except asyncio.QueueEmpty:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+          break
+        try:
+          record = await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+          break
+
+      if record is _STOP:
+        return records, True
+      records.append(record)
+
+    return records, False
+
+  async def _run(self: Self):
+    async with AsyncSessionLocal() as session:
+      stopping = False
+      while not stopping:
+        records, stopping = await self._next_batch()
+        self._resume_if_drained()
+        if not records:
+          continue
+
+        if not await self._flush(session, records):
+          # Committing any later batch would move the offset past this one
+          self._discard_queued()
+          return
+
+  def _discard_queued(self: Self):
+    """Drop the records still queued; they are fetched again from the committed offset"""
+    while not self.queue.empty():
+      self.queue.get_nowait()
+
+  async def _flush(self: Self, session: AsyncSession, records: list[ConsumerRecord]) -> bool:
+    """Handle and commit a batch, retrying it until it succeeds or the worker is stopped.
+
+    The handler dead-letters bad records itself, so a failure here means the database or the
+    DLQ is unavailable. Only this partition waits; on stop the batch is left uncommitted for
+    the next owner of the partition, and False tells the worker to stop without handling the
+    rest of its queue.
+    """
+    delay = kafka_settings.retry_backoff_initial_ms / 1000
+    while True:
+      try:
+        await self.handler(session, records)
+        await self.consumer.commit({self.tp: records[-1].offset + 1})
+        return True
+      except Exception as e:
+        await session.rollback()
+        print(
+          f"Error processing Kafka batch of {len(records)} messages "
+          f"from {self.tp.topic}:{self.tp.partition}: {e}"
+        )
+        if self.stopping:
+          return False
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, kafka_settings.retry_backoff_max_ms / 1000)
+
+
+class PartitionWorkerPool:
+  """Routes fetched records to one worker per assigned partition"""
+
+  def __init__(self: Self, handler: BatchHandler):
+    self.handler = handler
+    self.consumer: Optional[AIOKafkaConsumer] = None
+    self.workers: dict[TopicPartition, PartitionWorker] = {}
+    self.throttled = False
+
+  def bind(self: Self, consumer: AIOKafkaConsumer):
+    self.consumer = consumer
+
+  def start(self: Self, partitions: set[TopicPartition]):
+    for tp in partitions:
+      if tp not in self.workers:
+        worker = PartitionWorker(tp, self.consumer, self.handler, lambda: self.throttled)
+        worker.start()
+        self.workers[tp] = worker
+
+  async def stop(self: Self, partitions: set[TopicPartition]):
+    workers = [self.workers.pop(tp) for tp in partitions if tp in self.workers]
+    await asyncio.gather(*(worker.stop() for worker in workers))
+
+  async def stop_all(self: Self):
+    await self.stop(set(self.workers))
+
+  def dispatch(self: Self, tp: TopicPartition, records: list[ConsumerRecord]):
+    """Hand records to the partition worker, pausing the partition when its queue is full.
+
+    Records that did not fit are re-fetched after resume by seeking back to the first of them.
+    """
+    worker = self.workers.get(tp)
+    if worker is None:
+      return
+
+    accepted = worker.offer(records)
+    if accepted < len(records):
+      self.consumer.seek(tp, records[accepted].offset)
+      self.consumer.pause(tp)
+      worker.paused = True
+
+
+class IngestRebalanceListener(ConsumerRebalanceListener):
+  """Starts workers for assigned partitions and flushes workers of revoked ones"""
+
+  def __init__(self: Self, pool: PartitionWorkerPool):
+    self.pool = pool
+
+  async def on_partitions_revoked(self: Self, revoked: set[TopicPartition]):
+    await self.pool.stop(revoked)
+
+  async def on_partitions_assigned(self: Self, assigned: set[TopicPartition]):
+    self.pool.start(assigned)
@@ -0,0 +1,3 @@
+from .service import RebuildResult, TableRebuild
+
+__all__ = ["RebuildResult", "TableRebuild"]
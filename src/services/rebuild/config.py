@@ -0,0 +1,15 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class RebuildSettings(BaseSettings):
+  rebuild_batch_size: int = 50000
+  rebuild_fetch_timeout_ms: int = 1000
+  rebuild_progress_seconds: int = 10
+  # Indexes built at once at the end, each on its own connection
+  rebuild_index_workers: int = 4
+  rebuild_maintenance_work_mem: str = "1GB"
+
+  model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+rebuild_settings = RebuildSettings()
@@ -0,0 +1,226 @@
+"""Rebuild of the messages table from the topic_in history.
+
+Records from the start point up to the end offsets seen at startup are validated column-wise
+like a bulk import and COPYed into an unindexed shadow table. Afterwards the shadow is
+deduplicated by content_hash, indexed and swapped in for messages. Live rows whose
+content_hash the topic does not have, such as bulk imports, are copied into the shadow before
+it is indexed, and rows the live consumer inserted meanwhile are carried over during the swap.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Self
+
+import polars as pl
+from aiokafka.structs import ConsumerRecord, TopicPartition
+
+from src.database.database import engine
+from src.services.bulk_import.validation import ImportBatch, missing_fields, prepare_import_batch
+from src.services.kafka.config import kafka_settings
+from src.services.kafka.service import kafka_service
+from src.services.rebuild.config import rebuild_settings
+from src.services.rebuild.shadow import ShadowTable
+
+MAX_REPORTED_ERRORS = 100
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionProgress:
+  def __init__(self: Self, tp: TopicPartition, start: int, end: int):
+    self.tp = tp
+    self.start = start
+    self.end = end
+    self.position = start
+
+  @property
+  def done(self: Self) -> bool:
+    return self.position >= self.end
+
+  def eta(self: Self, elapsed: float) -> Optional[float]:
+    """Seconds left at the partition's average rate so far"""
+    consumed = self.position - self.start
+    if self.done:
+      return 0.0
+    if not consumed or not elapsed:
+      return None
+    return (self.end - self.position) / (consumed / elapsed)
+
+  def describe(self: Self, elapsed: float) -> str:
+    total = self.end - self.start
+    percent = 100 * (self.position - self.start) / total if total else 100
+    eta = self.eta(elapsed)
+    left = "done" if self.done else "ETA ?" if eta is None else f"ETA {eta:.0f}s"
+    return f"{self.tp.topic}[{self.tp.partition}] {self.position}/{self.end} ({percent:.1f}%) {left}"
+
+
+class RebuildResult(NamedTuple):
+  records: int
+  loaded: int
+  rejected: int
+  duplicates: int
+  preserved: int
+  carried_over: int
+  errors: List[str]
+  seconds: float
+
+
+def _prepare(records: List[ConsumerRecord], row_offset: int, max_errors: int) -> ImportBatch:
+  """Decode a fetch into import rows; undecodable records are rejected like invalid ones"""
+  messages, created_at, errors = [], [], []
+  for record in records:
+    try:
+      message = kafka_service.codec.decode(record.value, record.headers)
+      if not isinstance(message, dict):
+        raise ValueError("not an object")
+    except (ValueError, TypeError) as e:
+      if len(errors) < max_errors:
+        errors.append(f"{record.topic}[{record.partition}]@{record.offset}: {e}")
+      continue
+    messages.append(message)
+    created_at.append(
+      datetime.fromtimestamp(record.timestamp / 1000, timezone.utc).replace(tzinfo=None)
+    )
+
+  if not messages:
+    return ImportBatch(len(records), len(records), errors, b"")
+
+  df = pl.DataFrame(messages, infer_schema_length=None, strict=False)
+  # Records missing a field fail the checks of its null column
+  df = df.with_columns(pl.lit(None).alias(field) for field in missing_fields(df.columns))
+  batch = prepare_import_batch(
+    df,
+    row_offset,
+    max_errors - len(errors),
+    extra=[pl.Series("created_at", created_at, dtype=pl.Datetime("us"))],
+  )
+  return ImportBatch(
+    len(records), batch.rejected + len(records) - len(messages), errors + batch.errors, batch.csv
+  )
+
+
+class TableRebuild:
+  def __init__(self: Self, topic: str = kafka_settings.topic_in):
+    self.topic = topic
+    self.shadow = ShadowTable()
+    self.partitions: Dict[TopicPartition, PartitionProgress] = {}
+    self.started = time.monotonic()
+
+  async def _assign(
+    self: Self, consumer, from_offset: Optional[int], from_timestamp: Optional[datetime]
+  ):
+    await consumer.topics()
+    partitions = [
+      TopicPartition(self.topic, partition)
+      for partition in sorted(consumer.partitions_for_topic(self.topic) or ())
+    ]
+    if not partitions:
+      raise ValueError(f"Topic '{self.topic}' does not exist")
+    consumer.assign(partitions)
+
+    beginning = await consumer.beginning_offsets(partitions)
+    end = await consumer.end_offsets(partitions)
+    if from_timestamp is not None:
+      if from_timestamp.tzinfo is None:
+        from_timestamp = from_timestamp.replace(tzinfo=timezone.utc)
+      found = await consumer.offsets_for_times(
+        {tp: int(from_timestamp.timestamp() * 1000) for tp in partitions}
+      )
+      start = {tp: found[tp].offset if found[tp] else end[tp] for tp in partitions}
+    else:
+      start = {tp: min(max(from_offset or 0, beginning[tp]), end[tp]) for tp in partitions}
+
+    for tp in partitions:
+      consumer.seek(tp, start[tp])
+      self.partitions[tp] = PartitionProgress(tp, start[tp], end[tp])
+
+  def report(self: Self, records: int):
+    elapsed = time.monotonic() - self.started
+    logger.info(
+      "Loaded %d records in %.0fs (%s/s)",
+      records, elapsed, f"{records / elapsed if elapsed else 0:,.0f}",
+    )
+    for progress in self.partitions.values():
+      logger.info("  %s", progress.describe(elapsed))
+
+  async def run(
+    self: Self,
+    from_offset: Optional[int] = None,
+    from_timestamp: Optional[datetime] = None,
+    keep_old: bool = False,
+  ) -> RebuildResult:
+    since = datetime.utcnow()
+    self.started = time.monotonic()
+    records = loaded = rejected = 0
+    errors: List[str] = []
+
+    consumer = kafka_service.broker.create_consumer(
+      **kafka_service._get_connection_config(),
+      group_id=None,
+      auto_offset_reset="earliest",
+      enable_auto_commit=False,
+    )
+    await consumer.start()
+    async with engine.connect() as conn:
+      pg = (await conn.get_raw_connection()).driver_connection
+      try:
+        await self._assign(consumer, from_offset, from_timestamp)
+        await self.shadow.create(pg)
+
+        reported = time.monotonic()
+        while remaining := [tp for tp, progress in self.partitions.items() if not progress.done]:
+          polled = await consumer.getmany(
+            *remaining,
+            timeout_ms=rebuild_settings.rebuild_fetch_timeout_ms,
+            max_records=rebuild_settings.rebuild_batch_size,
+          )
+          fetched = []
+          for tp, tp_records in polled.items():
+            progress = self.partitions[tp]
+            tp_records = [record for record in tp_records if record.offset < progress.end]
+            fetched.extend(tp_records)
+            progress.position = tp_records[-1].offset + 1 if tp_records else progress.end
+          for tp in remaining:
+            # Offsets of transaction markers or compacted records never come as records
+            if tp not in polled and await consumer.position(tp) >= self.partitions[tp].end:
+              self.partitions[tp].position = self.partitions[tp].end
+
+          if fetched:
+            batch = await asyncio.to_thread(
+              _prepare, fetched, records, MAX_REPORTED_ERRORS - len(errors)
+            )
+            if batch.csv:
+              await self.shadow.copy(pg, batch.csv)
+            records += batch.rows
+            rejected += batch.rejected
+            loaded += batch.rows - batch.rejected
+            errors.extend(batch.errors)
+
+          if time.monotonic() - reported >= rebuild_settings.rebuild_progress_seconds:
+            reported = time.monotonic()
+            self.report(records)
+      finally:
+        await consumer.stop()
+
+      self.report(records)
+      logger.info("Keeping live rows that are not in %s", self.topic)
+      preserved = await self.shadow.preserve(pg)
+      logger.info("Removing duplicate content hashes")
+      duplicates = await self.shadow.deduplicate(pg)
+      indexes = await self.shadow.indexes(pg)
+      logger.info("Building %d indexes", len(indexes))
+      await self.shadow.build_indexes(indexes)
+      logger.info("Swapping %s in for %s", self.shadow.name, self.shadow.table)
+      carried_over = await self.shadow.swap(pg, indexes, since, keep_old)
+
+    return RebuildResult(
+      records=records,
+      loaded=loaded - duplicates,
+      rejected=rejected,
+      duplicates=duplicates,
+      preserved=preserved,
+      carried_over=carried_over,
+      errors=errors,
+      seconds=time.monotonic() - self.started,
+    )
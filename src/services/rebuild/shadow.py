@@ -0,0 +1,134 @@
+"""Shadow copy of the messages table for rebuilds.
+
+The shadow starts without any index, so loading it is plain appends. Its indexes are then
+created from the live table's own definitions, all at once on separate connections, and the
+two tables trade names in one short transaction.
+"""
+import asyncio
+import io
+import logging
+import re
+from datetime import datetime
+from typing import List, NamedTuple, Self
+
+from asyncpg import Connection
+
+from src.database.database import engine
+from src.database.models.message import Message
+from src.services.bulk_import.validation import STAGED_FIELDS
+from src.services.rebuild.config import rebuild_settings
+
+SHADOW_SUFFIX = "_rebuild"
+OLD_SUFFIX = "_old"
+
+logger = logging.getLogger(__name__)
+
+_INDEX_TARGET = re.compile(r"^(CREATE (?:UNIQUE )?INDEX) (\S+) ON (?:ONLY )?(\S+) ")
+
+
+class IndexDefinition(NamedTuple):
+  name: str
+  definition: str
+  primary: bool
+
+
+class ShadowTable:
+  def __init__(self: Self, table: str = Message.__tablename__):
+    self.table = table
+    self.name = f"{table}{SHADOW_SUFFIX}"
+    self.old = f"{table}{OLD_SUFFIX}"
+    # The CSV rows of prepare_import_batch, followed by the record's created_at
+    self.columns = [*STAGED_FIELDS, "created_at"]
+
+  async def create(self: Self, pg: Connection):
+    await pg.execute(f"DROP TABLE IF EXISTS {self.name}")
+    await pg.execute(f"CREATE TABLE {self.name} (LIKE {self.table} INCLUDING DEFAULTS)")
+    # id is generated in Python on the normal path; only the shadow load needs a default
+    await pg.execute(f"ALTER TABLE {self.name} ALTER COLUMN id SET DEFAULT gen_random_uuid()::text")
+
+  async def copy(self: Self, pg: Connection, csv: bytes):
+    await pg.copy_to_table(self.name, source=io.BytesIO(csv), columns=self.columns, format="csv")
+
+  async def preserve(self: Self, pg: Connection) -> int:
+    """Copy over the live rows whose content_hash the shadow lacks.
+
+    These are messages that never went through topic_in, such as bulk imports and messages
+    created through the API, or ones from before the rebuild's start point. Rows without a
+    content_hash cannot be matched; only those created during the rebuild are kept, by swap.
+    """
+    status = await pg.execute(
+      f"INSERT INTO {self.name} SELECT * FROM {self.table} m WHERE m.content_hash IS NOT NULL "
+      f"AND NOT EXISTS (SELECT 1 FROM {self.name} s WHERE s.content_hash = m.content_hash)"
+    )
+    return int(status.split()[-1])
+
+  async def deduplicate(self: Self, pg: Connection) -> int:
+    """Delete all but the earliest row of each content_hash, as the unique index requires"""
+    await pg.execute(f"ALTER TABLE {self.name} ALTER COLUMN id DROP DEFAULT")
+    status = await pg.execute(
+      f"DELETE FROM {self.name} WHERE ctid IN ("
+      "SELECT ctid FROM ("
+      "SELECT ctid, row_number() OVER (PARTITION BY content_hash ORDER BY created_at, ctid) AS n "
+      f"FROM {self.name} WHERE content_hash IS NOT NULL"
+      ") ranked WHERE n > 1)"
+    )
+    return int(status.split()[-1])
+
+  async def indexes(self: Self, pg: Connection) -> List[IndexDefinition]:
+    rows = await pg.fetch(
+      "SELECT i.relname, pg_get_indexdef(x.indexrelid), x.indisprimary "
+      "FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid "
+      "WHERE x.indrelid = $1::regclass ORDER BY i.relname",
+      self.table,
+    )
+    return [IndexDefinition(*row) for row in rows]
+
+  async def build_indexes(self: Self, indexes: List[IndexDefinition]):
+    """Create the live table's indexes on the shadow, rebuild_index_workers at a time"""
+    workers = asyncio.Semaphore(rebuild_settings.rebuild_index_workers)
+
+    async def build(index: IndexDefinition):
+      async with workers, engine.connect() as conn:
+        pg = (await conn.get_raw_connection()).driver_connection
+        await pg.execute(
+          f"SET maintenance_work_mem = '{rebuild_settings.rebuild_maintenance_work_mem}'"
+        )
+        started = asyncio.get_running_loop().time()
+        await pg.execute(
+          _INDEX_TARGET.sub(rf"\1 {index.name}{SHADOW_SUFFIX} ON {self.name} ", index.definition)
+        )
+        if index.primary:
+          await pg.execute(
+            f"ALTER TABLE {self.name} ADD CONSTRAINT {index.name}{SHADOW_SUFFIX} "
+            f"PRIMARY KEY USING INDEX {index.name}{SHADOW_SUFFIX}"
+          )
+        logger.info("Built %s in %.0fs", index.name, asyncio.get_running_loop().time() - started)
+
+    await asyncio.gather(*(build(index) for index in indexes))
+
+  async def swap(
+    self: Self, pg: Connection, indexes: List[IndexDefinition], since: datetime, keep_old: bool
+  ) -> int:
+    """Take the live table's place, carrying over the rows it gained since the rebuild began.
+
+    Renaming a constraint's index renames the constraint with it.
+    """
+    await pg.execute(f"ANALYZE {self.name}")
+    async with pg.transaction():
+      await pg.execute(f"LOCK TABLE {self.table} IN ACCESS EXCLUSIVE MODE")
+      status = await pg.execute(
+        f"INSERT INTO {self.name} SELECT * FROM {self.table} WHERE created_at >= $1 "
+        "ON CONFLICT DO NOTHING",
+        since,
+      )
+      await pg.execute(f"DROP TABLE IF EXISTS {self.old}")
+      await pg.execute(f"ALTER TABLE {self.table} RENAME TO {self.old}")
+      for index in indexes:
+        await pg.execute(f"ALTER INDEX {index.name} RENAME TO {index.name}{OLD_SUFFIX}")
+      await pg.execute(f"ALTER TABLE {self.name} RENAME TO {self.table}")
+      for index in indexes:
+        await pg.execute(f"ALTER INDEX {index.name}{SHADOW_SUFFIX} RENAME TO {index.name}")
+
+    if not keep_old:
+      await pg.execute(f"DROP TABLE {self.old}")
+    return int(status.split()[-1])
@@ -0,0 +1,64 @@
+import io
+import os
+
+from src.services.dedup.bloom import ScalableBloomFilter
+
+
+def digests(n: int) -> list:
+  return [os.urandom(16) for _ in range(n)]
+
+
+def test_added_keys_are_always_found():
+  bloom = ScalableBloomFilter(1000, 0.01)
+  keys = digests(5000)
+  bloom.update(keys[:2500])
+  for key in keys[2500:]:
+    bloom.add(key)
+  assert all(key in bloom for key in keys)
+  assert len(bloom.stages) > 1
+
+
+def test_false_positive_rate_stays_within_twice_the_error_rate():
+  error_rate = 0.01
+  bloom = ScalableBloomFilter(10000, error_rate)
+  bloom.update(digests(100000))
+  false_positives = sum(key in bloom for key in digests(100000))
+  assert false_positives / 100000 < error_rate * 2
+
+
+def test_update_sets_the_same_bits_as_add():
+  keys = digests(3000)
+  keys += keys[:100]
+  one_by_one = ScalableBloomFilter(10000, 0.01)
+  for key in keys:
+    one_by_one.add(key)
+  batched = ScalableBloomFilter(10000, 0.01)
+  batched.update(keys[:1000])
+  batched.update(keys[1000:])
+
+  assert len(batched.stages) == len(one_by_one.stages) == 1
+  assert batched.stages[0].bits == one_by_one.stages[0].bits
+  assert batched.count >= one_by_one.count
+
+
+def test_update_grows_stages_as_they_fill():
+  bloom = ScalableBloomFilter(1000, 0.01)
+  bloom.update(digests(6000))
+  assert [stage.capacity for stage in bloom.stages] == [1000, 2000, 4000]
+  assert bloom.count == 6000
+  assert all(stage.count <= stage.capacity for stage in bloom.stages)
+
+
+def test_snapshot_round_trip():
+  bloom = ScalableBloomFilter(1000, 0.01)
+  keys = digests(3000)
+  bloom.update(keys)
+  snapshot = io.BytesIO()
+  bloom.dump(snapshot, {"max_id": "abc"})
+  snapshot.seek(0)
+
+  loaded, metadata = ScalableBloomFilter.load(snapshot)
+  assert metadata == {"max_id": "abc"}
+  assert loaded.count == bloom.count
+  assert [stage.bits for stage in loaded.stages] == [stage.bits for stage in bloom.stages]
+  assert all(key in loaded for key in keys)
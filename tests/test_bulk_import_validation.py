@@ -0,0 +1,108 @@
+import io
+
+import polars as pl
+import pytest
+
+from src.schemas import compute_content_hash, content_hash_key
+from src.schemas.content_hash import LEGACY_HASH_VERSION
+from src.services.bulk_import.validation import STAGED_FIELDS, missing_fields, prepare_import_batch
+
+VALID = {
+  "external_id": "ext-1",
+  "source": "site",
+  "user_id": "user-1",
+  "text": "Рейс задержали",
+  "cleaned_text": "рейс задержали",
+  "lang_code": "ru",
+  "event_date": "2026-01-01T10:00:00",
+  "lang_score": 0.9,
+  "sentiment_score": 0.8,
+  "emotion_score": 0.7,
+  "sentiment_label": "negative",
+  "emotion_label": "anger",
+  "category_level_1": "before_flight",
+  "category_level_2": "booking,payment",
+}
+
+
+def frame(*overrides: dict) -> pl.DataFrame:
+  return pl.DataFrame([{**VALID, **override} for override in overrides])
+
+
+def staged(batch, columns=STAGED_FIELDS) -> pl.DataFrame:
+  return pl.read_csv(
+    io.BytesIO(batch.csv), has_header=False, new_columns=list(columns), infer_schema=False
+  )
+
+
+def test_valid_rows_in_staging_form():
+  batch = prepare_import_batch(
+    frame({}, {"category_level_2": '["Booking"]', "event_date": "2026-01-01"})
+  )
+  assert (batch.rows, batch.rejected, batch.errors) == (2, 0, [])
+
+  rows = staged(batch)
+  assert rows["sentiment_label"].to_list() == ["NEGATIVE", "NEGATIVE"]
+  assert rows["category_level_1"].to_list() == ["BEFORE_FLIGHT", "BEFORE_FLIGHT"]
+  assert rows["category_level_2"].to_list() == ["{BOOKING,PAYMENT}", "{BOOKING}"]
+  assert rows["event_date"].to_list() == [
+    "2026-01-01 10:00:00.000000", "2026-01-01 00:00:00.000000"
+  ]
+
+  content_hash = compute_content_hash(content_hash_key(VALID["event_date"], VALID["text"]))
+  assert rows["content_hash"][0] == f"\\x{content_hash}"
+  assert rows["hash_version"].to_list() == ["2", "2"]
+
+
+@pytest.mark.parametrize(
+  "field, value",
+  [
+    ("user_id", None),
+    ("text", None),
+    ("event_date", "yesterday"),
+    ("lang_score", 1.5),
+    ("sentiment_score", "high"),
+    ("sentiment_label", "furious"),
+    ("emotion_label", None),
+    ("category_level_1", "in_space"),
+    ("category_level_2", "booking,unknown"),
+    ("content_hash", "not-a-hash"),
+  ],
+)
+def test_rejects_invalid_rows(field, value):
+  batch = prepare_import_batch(frame({}, {field: value}, {}), row_offset=10, max_errors=10)
+  assert (batch.rows, batch.rejected) == (3, 1)
+  assert batch.errors == [f"Row 12: invalid or missing {field}"]
+  assert staged(batch).height == 2
+
+
+def test_reports_at_most_max_errors():
+  batch = prepare_import_batch(frame(*({"text": None} for _ in range(5))), max_errors=2)
+  assert batch.rejected == 5
+  assert batch.errors == ["Row 1: invalid or missing text", "Row 2: invalid or missing text"]
+  assert batch.csv == b""
+
+
+def test_given_content_hash_is_kept():
+  legacy = compute_content_hash("key", LEGACY_HASH_VERSION)
+  batch = prepare_import_batch(frame({"content_hash": legacy.upper()}, {"content_hash": None}))
+  rows = staged(batch)
+  assert rows["content_hash"][0] == f"\\x{legacy[:32]}"
+  assert rows["hash_version"].to_list() == ["1", "2"]
+
+
+def test_legacy_hash_only_for_computed_hashes():
+  given = compute_content_hash("key")
+  batch = prepare_import_batch(
+    frame({"content_hash": given}, {"content_hash": None}), legacy_hashes=True
+  )
+  rows = staged(batch, (*STAGED_FIELDS, "legacy_hash"))
+  legacy = compute_content_hash(
+    content_hash_key(VALID["event_date"], VALID["text"]), LEGACY_HASH_VERSION
+  )
+  # Empty, which the import reads as NULL through COPY's FORCE_NULL
+  assert rows["legacy_hash"].to_list() == ["", f"\\x{legacy[:32]}"]
+
+
+def test_missing_fields():
+  assert missing_fields([field for field in VALID if field != "text"]) == ["text"]
@@ -0,0 +1,91 @@
+import gzip
+import os
+from pathlib import Path
+
+import pytest
+
+from src.services.file_upload.compression import (
+  CHUNK_SIZE,
+  GZIP_SUFFIX,
+  ZSTD_SUFFIX,
+  decompress_file,
+  iter_decompressed,
+  read_head,
+)
+from src.services.file_upload.service import CompressedProcessor
+
+
+def write_gzip(path: Path, data: bytes) -> Path:
+  path.write_bytes(gzip.compress(data))
+  return path
+
+
+def decompressed(path: Path, compression: str, **limits) -> bytes:
+  return b"".join(chunk for chunk, _ in iter_decompressed(path, compression, **limits))
+
+
+def test_round_trip(tmp_path):
+  data = os.urandom(CHUNK_SIZE * 3 + 17)
+  path = write_gzip(tmp_path / "data.csv.gz", data)
+  assert decompressed(path, GZIP_SUFFIX) == data
+  head, consumed, truncated = read_head(path, GZIP_SUFFIX, 100)
+  assert (head, truncated) == (data[:100], True)
+  assert 0 < consumed < os.path.getsize(path)
+
+
+def test_rejects_an_expansion_past_the_ratio(tmp_path):
+  path = write_gzip(tmp_path / "bomb.csv.gz", bytes(CHUNK_SIZE * 64))
+  with pytest.raises(ValueError, match="zip-бомбу"):
+    decompressed(path, GZIP_SUFFIX)
+  # The same file is fine under a looser limit
+  assert len(decompressed(path, GZIP_SUFFIX, max_ratio=10000)) == CHUNK_SIZE * 64
+
+
+def test_first_chunk_is_not_held_to_the_ratio(tmp_path):
+  path = write_gzip(tmp_path / "small.csv.gz", bytes(CHUNK_SIZE))
+  assert len(decompressed(path, GZIP_SUFFIX)) == CHUNK_SIZE
+
+
+def test_rejects_output_past_the_size_limit(tmp_path):
+  path = write_gzip(tmp_path / "large.csv.gz", os.urandom(CHUNK_SIZE * 2))
+  with pytest.raises(ValueError, match="превышает допустимый размер"):
+    decompressed(path, GZIP_SUFFIX, max_bytes=CHUNK_SIZE)
+
+
+def test_zstd_bomb(tmp_path):
+  zstandard = pytest.importorskip("zstandard")
+  path = tmp_path / "bomb.csv.zst"
+  path.write_bytes(zstandard.ZstdCompressor().compress(bytes(CHUNK_SIZE * 64)))
+  with pytest.raises(ValueError, match="zip-бомбу"):
+    decompressed(path, ZSTD_SUFFIX)
+
+
+def test_limit_errors_stop_decompress_file_early(tmp_path):
+  path = write_gzip(tmp_path / "bomb.csv.gz", bytes(CHUNK_SIZE * 64))
+  out = tmp_path / "out.csv"
+  with open(out, "wb") as f, pytest.raises(ValueError):
+    decompress_file(path, GZIP_SUFFIX, f)
+  assert os.path.getsize(out) < CHUNK_SIZE * 64
+
+
+def test_processor_removes_its_temporary_copy(tmp_path):
+  rows = b"text,user_id,external_id,timestamp\n" + b"hello,1,a,2026-01-01T00:00:00\n" * 1000
+  path = write_gzip(tmp_path / "upload.csv.gz", rows)
+  processor = CompressedProcessor(path)
+  assert sum(batch.height for batch in processor.iter_batches()) == 1000
+  assert os.listdir(tmp_path) == ["upload.csv.gz"]
+
+  bomb = write_gzip(tmp_path / "bomb.csv.gz", bytes(CHUNK_SIZE * 64))
+  processor = CompressedProcessor(bomb)
+  with pytest.raises(ValueError):
+    list(processor.iter_batches())
+  assert sorted(os.listdir(tmp_path)) == ["bomb.csv.gz", "upload.csv.gz"]
+
+
+def test_processor_limits_can_be_overridden(tmp_path):
+  bomb = write_gzip(tmp_path / "bomb.csv.gz", bytes(CHUNK_SIZE * 64))
+  processor = CompressedProcessor(bomb)
+  processor.set_limits(max_decompressed_bytes=CHUNK_SIZE * 128, max_compression_ratio=100000)
+  with processor.decompressed() as inner:
+    assert os.path.getsize(inner.file_path) == CHUNK_SIZE * 64
+  assert os.listdir(tmp_path) == ["bomb.csv.gz"]
@@ -0,0 +1,124 @@
+from hashlib import sha256
+
+import polars as pl
+import pytest
+from pydantic import ValidationError
+from xxhash import xxh3_128_hexdigest
+
+from src.api.message.schemas import MessageCreate
+from src.database.models.message import ContentHash
+from src.schemas import (
+  compute_content_hash,
+  content_hash_digest,
+  content_hash_key,
+  content_hash_version,
+)
+from src.schemas.content_hash import HASH_VERSION, LEGACY_HASH_VERSION
+from src.services.file_upload.validation import content_hashes, prepare_batch
+from src.services.kafka.service import message_from_payload
+
+KEY = content_hash_key("2026-01-01T10:00:00", "Привет, Мир")
+
+
+def test_versions_hash_the_same_key():
+  assert KEY == "2026-01-01T10:00:00_привет, мир"
+  assert compute_content_hash(KEY, LEGACY_HASH_VERSION) == sha256(KEY.encode()).hexdigest()
+  assert compute_content_hash(KEY) == xxh3_128_hexdigest(KEY.encode())
+
+
+def test_version_is_told_by_length():
+  assert content_hash_version(compute_content_hash(KEY, LEGACY_HASH_VERSION)) == LEGACY_HASH_VERSION
+  assert content_hash_version(compute_content_hash(KEY, HASH_VERSION)) == HASH_VERSION
+
+
+def test_stored_digest():
+  legacy = compute_content_hash(KEY, LEGACY_HASH_VERSION)
+  current = compute_content_hash(KEY)
+  assert content_hash_digest(legacy) == bytes.fromhex(legacy)[:16]
+  assert content_hash_digest(current) == bytes.fromhex(current)
+
+  column = ContentHash()
+  # A version 1 hash reads back as its stored prefix, which is what lookups compare against
+  for content_hash in (legacy, current):
+    stored = column.process_bind_param(content_hash, None)
+    assert len(stored) == 16
+    assert column.process_result_value(stored, None) == content_hash[:32]
+  assert column.process_bind_param(None, None) is None
+
+
+def test_column_hashes_match_compute_content_hash():
+  timestamps = pl.Series(["2026-01-01T10:00:00", "2026-01-02", "2026-01-03T00:00:00Z"])
+  texts = pl.Series(["Привет, Мир", "ÄÖÜ straße", "plain"])
+  for version in (LEGACY_HASH_VERSION, HASH_VERSION):
+    expected = [
+      compute_content_hash(content_hash_key(timestamp, text), version)
+      for timestamp, text in zip(timestamps, texts)
+    ]
+    assert content_hashes(timestamps, texts, version).to_list() == expected
+
+
+def test_prepare_batch_legacy_hashes_follow_the_records():
+  df = pl.DataFrame({
+    "text": ["Первое", "", "Третье"],
+    "user_id": ["1", "2", "3"],
+    "external_id": ["a", "b", "c"],
+    "timestamp": ["2026-01-01T10:00:00", "2026-01-01T11:00:00", "2026-01-01T12:00:00"],
+  })
+  report = prepare_batch(df, legacy_hashes=True)
+  assert report.records["external_id"].to_list() == ["a", "c"]
+  assert report.legacy_hashes.to_list() == [
+    compute_content_hash(content_hash_key(timestamp, text), LEGACY_HASH_VERSION)
+    for timestamp, text in zip(report.records["timestamp"], ["Первое", "Третье"])
+  ]
+  assert prepare_batch(df).legacy_hashes is None
+
+
+MESSAGE = {
+  "external_id": "ext-1",
+  "event_date": "2026-01-01T10:00:00",
+  "source": "site",
+  "user_id": "user-1",
+  "text": "text",
+  "cleaned_text": "text",
+  "lang_code": "ru",
+  "lang_score": 0.9,
+  "sentiment_label": "neutral",
+  "sentiment_score": 0.5,
+  "emotion_label": "anger",
+  "emotion_score": 0.5,
+  "category_level_1": "before_flight",
+  "category_level_2": ["booking"],
+}
+
+
+def test_message_accepts_hashes_of_either_version():
+  hashes = (None, compute_content_hash(KEY, LEGACY_HASH_VERSION), compute_content_hash(KEY))
+  for content_hash in hashes:
+    assert MessageCreate(**MESSAGE, content_hash=content_hash).content_hash == content_hash
+
+
+@pytest.mark.parametrize(
+  "content_hash",
+  [
+    "",
+    "abc",
+    "z" * 32,
+    "a" * 48,
+    compute_content_hash(KEY).upper(),
+    compute_content_hash(KEY)[:30],
+    compute_content_hash(KEY) + "\n",
+  ],
+)
+def test_message_rejects_other_hashes(content_hash):
+  with pytest.raises(ValidationError):
+    MessageCreate(**MESSAGE, content_hash=content_hash)
+
+
+def test_consumer_fills_in_a_missing_hash():
+  expected = compute_content_hash(content_hash_key(MESSAGE["event_date"], MESSAGE["text"]))
+  assert message_from_payload(MESSAGE).content_hash == expected
+  # Redelivered, the record gets the same hash, which ON CONFLICT DO NOTHING then skips
+  assert message_from_payload(dict(MESSAGE)).content_hash == expected
+
+  given = compute_content_hash(KEY, LEGACY_HASH_VERSION)
+  assert message_from_payload({**MESSAGE, "content_hash": given}).content_hash == given
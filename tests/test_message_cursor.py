@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from src.api.message.service import MessageService
+from src.api.message.utils import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from src.app.main import app
+from src.database import get_db
+
+
+def test_round_trip():
+  event_date = datetime(2026, 1, 1, 10, 0, 0, 123456)
+  cursor = encode_cursor(event_date, "0b6f6f0e-5ad4-4d55-9c55-1f1d2f1f7a11")
+  assert decode_cursor(cursor) == (event_date, "0b6f6f0e-5ad4-4d55-9c55-1f1d2f1f7a11")
+  # URL-safe and unpadded, so it can go in a query string as it is
+  assert all(c.isalnum() or c in "-_" for c in cursor)
+
+
+def test_aware_event_date_decodes_to_naive_utc():
+  event_date = datetime(2026, 1, 1, 13, 0, tzinfo=timezone(timedelta(hours=3)))
+  assert decode_cursor(encode_cursor(event_date, "id")) == (datetime(2026, 1, 1, 10, 0), "id")
+
+
+@pytest.mark.parametrize(
+  "cursor", ["", "not a cursor", "e30", encode_cursor(datetime(2026, 1, 1), "id")[:-4]]
+)
+def test_invalid_cursor_is_a_bad_request(cursor):
+  with pytest.raises(HTTPException) as error:
+    decode_cursor(cursor)
+  assert error.value.status_code == 400
+
+
+def test_next_cursor_is_sent_in_a_header(monkeypatch):
+  pages = iter([([], "next-page"), ([], None)])
+
+  async def get_messages(db, params):
+    return next(pages)
+
+  monkeypatch.setattr(MessageService, "get_messages", get_messages)
+  app.dependency_overrides[get_db] = lambda: None
+  try:
+    client = TestClient(app)
+    first = client.get("/messages/", params={"limit": 10})
+    assert first.json() == []
+    assert first.headers[NEXT_CURSOR_HEADER] == "next-page"
+    last = client.get("/messages/", params={"cursor": "next-page"})
+    assert NEXT_CURSOR_HEADER not in last.headers
+  finally:
+    app.dependency_overrides.clear()
@@ -0,0 +1,59 @@
+import asyncio
+
+from aiokafka import TopicPartition
+
+from src.services.kafka.config import kafka_settings
+from src.services.kafka.memory_broker import InMemoryBroker
+from src.services.kafka.workers import PartitionWorker
+
+TP = TopicPartition("in", 0)
+
+
+def run_worker(monkeypatch, failing: set, stop_after: int) -> tuple[int, list]:
+  """Queue 9 records in batches of 3, stop the worker after stop_after handler calls"""
+  monkeypatch.setattr(kafka_settings, "consumer_batch_size", 3)
+  monkeypatch.setattr(kafka_settings, "consumer_batch_linger_ms", 1)
+  monkeypatch.setattr(kafka_settings, "retry_backoff_initial_ms", 1)
+  monkeypatch.setattr(kafka_settings, "retry_backoff_max_ms", 1)
+
+  broker = InMemoryBroker(default_partitions=1)
+  for i in range(9):
+    broker.append("in", f"{i}".encode(), None, 0, None, None)
+  consumer = broker.create_consumer(group_id="test")
+  handled = []
+  calls = asyncio.Event()
+
+  async def handler(session, records):
+    handled.append([record.offset for record in records])
+    if len(handled) >= stop_after:
+      calls.set()
+    if records[0].offset in failing:
+      raise RuntimeError("database unavailable")
+
+  async def main():
+    worker = PartitionWorker(TP, consumer, handler, lambda: False)
+    worker.offer(broker.partitions("in")[0])
+    worker.start()
+    await calls.wait()
+    await worker.stop()
+    return await consumer.committed(TP)
+
+  return asyncio.run(main()), handled
+
+
+def test_stop_flushes_and_commits_queued_batches(monkeypatch):
+  committed, handled = run_worker(monkeypatch, failing=set(), stop_after=1)
+  assert committed == 9
+  assert handled == [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+
+
+def test_batch_failing_on_stop_is_not_skipped(monkeypatch):
+  committed, handled = run_worker(monkeypatch, failing={0}, stop_after=2)
+  assert committed is None
+  assert all(batch == [0, 1, 2] for batch in handled)
+
+
+def test_later_failure_keeps_the_commits_before_it(monkeypatch):
+  committed, handled = run_worker(monkeypatch, failing={3}, stop_after=3)
+  assert committed == 3
+  assert [6, 7, 8] not in handled
@@ -0,0 +1,67 @@
+import numpy as np
+
+from src.schemas import compute_content_hash, content_hash_key
+from src.services.file_upload.dedup import INITIAL_SLOTS, SLOT_BYTES, SeenHashes
+
+
+def hashes(start: int, stop: int) -> list:
+  return [
+    compute_content_hash(content_hash_key("2026-01-01 00:00:00", f"message {i}"))
+    for i in range(start, stop)
+  ]
+
+
+def test_first_occurrence_within_a_batch_is_new():
+  batch = hashes(0, 10)
+  batch = batch + batch[:3]
+  with SeenHashes(1 << 20) as seen:
+    assert seen.add_new(batch).tolist() == [True] * 10 + [False] * 3
+    assert seen.count == 10
+
+
+def test_hashes_seen_in_earlier_batches_are_not_new():
+  with SeenHashes(1 << 20) as seen:
+    seen.add_new(hashes(0, 100))
+    assert seen.add_new(hashes(50, 150)).tolist() == [False] * 50 + [True] * 50
+    assert seen.count == 150
+
+
+def test_spilled_runs_are_checked_along_with_the_table(tmp_path):
+  # The smallest budget keeps INITIAL_SLOTS slots, so every batch below forces a spill
+  batch = int(INITIAL_SLOTS * 0.5)
+  with SeenHashes(INITIAL_SLOTS * SLOT_BYTES * 2, spill_dir=str(tmp_path)) as seen:
+    for start in range(0, batch * 3, batch):
+      assert seen.add_new(hashes(start, start + batch)).all()
+    assert len(seen.runs) == 2
+    assert seen.nbytes <= INITIAL_SLOTS * SLOT_BYTES
+
+    # Hashes from both runs and from the table, mixed with new ones
+    mixed = hashes(0, 10) + hashes(batch + 5, batch + 10) + hashes(batch * 2, batch * 2 + 5)
+    fresh = hashes(batch * 3, batch * 3 + 5)
+    assert not seen.add_new(mixed).any()
+    assert seen.add_new(fresh + mixed).tolist() == [True] * 5 + [False] * len(mixed)
+    assert seen.count == batch * 3 + 5
+
+
+def test_close_removes_the_spilled_runs(tmp_path):
+  seen = SeenHashes(0, spill_dir=str(tmp_path))
+  batch = int(INITIAL_SLOTS * 0.5)
+  seen.add_new(hashes(0, batch))
+  seen.add_new(hashes(batch, batch * 2))
+  assert any(tmp_path.iterdir())
+  seen.close()
+  assert not any(tmp_path.iterdir())
+
+
+def test_matches_a_set():
+  rng = np.random.default_rng(0)
+  pool = hashes(0, 5000)
+  reference = set()
+  with SeenHashes(0) as seen:
+    for _ in range(20):
+      batch = [pool[i] for i in rng.integers(0, len(pool), 2000)]
+      expected = []
+      for content_hash in batch:
+        expected.append(content_hash not in reference)
+        reference.add(content_hash)
+      assert seen.add_new(batch).tolist() == expected
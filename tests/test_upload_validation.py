@@ -0,0 +1,190 @@
+"""The columnar upload validation against MessageSchema and the row-by-row error reports it
+replaced: the same rows must pass, with the same normalised values, and the same rows must fail
+with the same messages.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+import polars as pl
+import pytest
+from pydantic import ValidationError
+
+from src.schemas import MessageSchema
+from src.services.file_upload.validation import find_row_errors, prepare_batch
+
+
+def baseline_error(row_num: int, error: ValidationError) -> str:
+  """FileProcessor._handle_validation_error as it was before the columnar validation"""
+  messages = []
+  for err in error.errors():
+    loc = err["loc"]
+    field = str(loc[0]) if loc else "unknown"
+    err_type = err["type"]
+
+    msg = f"Поле '{field}' содержит ошибку"
+    solution = "Проверьте корректность данных"
+
+    if field == "text":
+      if err_type in ("string_type", "missing"):
+        msg = "Поле 'text' (текст обращения) не заполнено"
+        solution = "Убедитесь, что в столбце 'text' есть текст обращения"
+      elif "min_length" in err_type or "value_error" in err_type:
+        msg = "Поле 'text' пустое"
+        solution = "Текст обращения не может быть пустым"
+
+    elif field == "timestamp":
+      msg = "Неверный формат даты/времени"
+      solution = "Используйте формат ISO 8601 (например, 2023-12-31T23:59:59)"
+
+    messages.append(f"{msg}. Решение: {solution}")
+
+  return f"Ошибка валидации в строке {row_num}: {'; '.join(messages)}"
+
+
+def baseline(df: pl.DataFrame) -> tuple[List[str], List[Optional[MessageSchema]]]:
+  """Error reports and validated models of every row, as FileProcessor.validate_content did it"""
+  errors, models = [], []
+  for i, record in enumerate(df.to_dicts()):
+    if isinstance(record.get("timestamp"), datetime):
+      record["timestamp"] = record["timestamp"].isoformat()
+    try:
+      models.append(MessageSchema(**record))
+    except ValidationError as e:
+      errors.append(baseline_error(i + 1, e))
+      models.append(None)
+  return errors, models
+
+
+def frame(text: pl.Series, timestamp: pl.Series, user_id: Optional[pl.Series] = None) -> pl.DataFrame:
+  height = len(text)
+  return pl.DataFrame({
+    "text": text,
+    "user_id": user_id if user_id is not None else pl.Series([f"user-{i}" for i in range(height)]),
+    "external_id": pl.Series([f"ext-{i}" for i in range(height)]),
+    "timestamp": timestamp,
+  })
+
+
+def assert_matches_baseline(df: pl.DataFrame):
+  expected_errors, models = baseline(df)
+  assert [error.message for error in find_row_errors(df)] == expected_errors
+
+  report = prepare_batch(df, max_errors=len(df))
+  assert [error.message for error in report.errors] == expected_errors
+  assert report.invalid == len(expected_errors)
+
+  valid = [model for model in models if model is not None]
+  assert report.records["text"].to_list() == [model.text for model in valid]
+  assert report.records["user_id"].to_list() == [model.user_id for model in valid]
+  # Missing timestamps are filled in with the current time afterwards
+  assert [
+    timestamp for timestamp, model in zip(report.records["timestamp"], valid) if model.timestamp
+  ] == [model.timestamp for model in valid if model.timestamp]
+
+
+TEXTS = [
+  "Обычный текст",
+  "  с пробелами по краям \n",
+  "",
+  " ",
+  "\t\n",
+  "\u3000",
+  "\xa0\u2003",
+  "\x1c\x1f\x85",
+  # Not whitespace to str.strip()
+  "\u200b",
+  None,
+]
+
+
+def test_text_strings():
+  timestamps = pl.Series(["2023-12-31T23:59:59"] * len(TEXTS))
+  assert_matches_baseline(frame(pl.Series(TEXTS, dtype=pl.String), timestamps))
+
+
+@pytest.mark.parametrize(
+  "text",
+  [
+    pl.Series([1, None, 3], dtype=pl.Int64),
+    pl.Series([True, False, None], dtype=pl.Boolean),
+    pl.Series([1.5, None, 0.0], dtype=pl.Float64),
+    pl.Series([None, None, None], dtype=pl.Null),
+  ],
+)
+def test_text_of_another_dtype(text):
+  assert_matches_baseline(frame(text, pl.Series(["2023-12-31"] * 3)))
+
+
+def test_optional_string_of_another_dtype():
+  assert_matches_baseline(
+    frame(pl.Series(["a", "b", "c"]), pl.Series([None] * 3, dtype=pl.String), pl.Series([1, None, 3]))
+  )
+
+
+TIMESTAMPS = [
+  "2023-12-31T23:59:59",
+  "2023-12-31 23:59:59",
+  "2023-12-31",
+  "2023-12-31T23:59",
+  "2023-12-31T23",
+  "2023-12-31T23:59:59Z",
+  "2023-12-31T23:59:59+03:00",
+  "2023-12-31T23:59:59-09:30",
+  "2023-12-31T23:59:59.5",
+  "2023-12-31T23:59:59.123",
+  "2023-12-31T23:59:59.123456",
+  "2023-12-31T23:59:59.123456Z",
+  "2023-12-31T23:59:59.123456+05:30",
+  "2024-02-29T00:00:00",
+  "2023-02-30",
+  "2023-02-30T10:00:00",
+  "2023-13-01",
+  "2023-00-10",
+  "2023-12-31T24:00:00",
+  "2023-12-31T23:60:00",
+  "2023-12-31T23:59:60",
+  "2023-12-31T23:59:59+24:00",
+  "20231231",
+  "20231231T235959",
+  "2023-W01-1",
+  "2023-12-31T23:59:59,5",
+  "2023",
+  "31.12.2023",
+  "not a date",
+  " 2023-12-31",
+  "",
+  None,
+]
+
+
+def test_timestamp_strings():
+  texts = pl.Series([f"text {i}" for i in range(len(TIMESTAMPS))])
+  assert_matches_baseline(frame(texts, pl.Series(TIMESTAMPS, dtype=pl.String)))
+
+
+@pytest.mark.parametrize(
+  "timestamp",
+  [
+    pl.Series([datetime(2023, 12, 31, 23, 59, 59), datetime(2023, 1, 1, 0, 0, 0, 5), None]),
+    pl.Series([datetime(2023, 12, 31, 23, 59, 59, 120000)] * 3, dtype=pl.Datetime("ms")),
+    pl.Series(
+      [datetime(2023, 12, 31, 23, 59, 59, tzinfo=timezone.utc)] * 2 + [None],
+      dtype=pl.Datetime("us", "UTC"),
+    ),
+    pl.Series(
+      [datetime(2023, 6, 1, 12, 0, 0, 250, tzinfo=timezone(timedelta(hours=3)))] * 3,
+      dtype=pl.Datetime("us", "Europe/Moscow"),
+    ),
+    pl.Series([date(2023, 12, 31), None, date(2024, 2, 29)], dtype=pl.Date),
+    pl.Series([None, None, None], dtype=pl.Null),
+    pl.Series([20231231, None, 1], dtype=pl.Int64),
+  ],
+)
+def test_timestamp_of_another_dtype(timestamp):
+  assert_matches_baseline(frame(pl.Series(["a", " b ", "c"]), timestamp))
+
+
+def test_several_errors_in_a_row_and_row_numbers():
+  df = frame(pl.Series(["ok", " ", None, "ok"]), pl.Series(["2023-12-31", "bad", "2023-02-30", None]))
+  assert_matches_baseline(df)
+  assert [error.row for error in find_row_errors(df, row_offset=100)] == [102, 103]